@@ -1,6 +1,38 @@
+from beanie_batteries_queue.backends import (
+    Backend,
+    MemoryBackend,
+    MongoBackend,
+    init_memory_backend,
+)
+from beanie_batteries_queue.dag import DAG, CycleError
+from beanie_batteries_queue.max_depth import (
+    MaxDepth,
+    OverflowPolicy,
+    QueueFull,
+)
+from beanie_batteries_queue.memoize import Memoize
+from beanie_batteries_queue.options import OperationOptions
 from beanie_batteries_queue.queue import Queue
+from beanie_batteries_queue.rate_limit import RateLimit
+from beanie_batteries_queue.results import (
+    TaskHandle,
+    TaskFailed,
+    TaskTimeout,
+)
+from beanie_batteries_queue.retry import RetryPolicy
 from beanie_batteries_queue.runner import Runner
-from beanie_batteries_queue.task import Task, State, Priority, DependencyType
+from beanie_batteries_queue.tracing import (
+    Tracer,
+    OpenTelemetryTracer,
+    trace_context,
+)
+from beanie_batteries_queue.task import (
+    Task,
+    State,
+    Priority,
+    DependencyType,
+    ClaimStrategy,
+)
 from beanie_batteries_queue.worker import Worker
 
 __all__ = [
@@ -11,5 +43,25 @@ __all__ = [
     "State",
     "Priority",
     "DependencyType",
+    "ClaimStrategy",
+    "RateLimit",
+    "Memoize",
+    "TaskHandle",
+    "TaskFailed",
+    "TaskTimeout",
+    "Tracer",
+    "OpenTelemetryTracer",
+    "trace_context",
+    "RetryPolicy",
+    "Backend",
+    "MongoBackend",
+    "MemoryBackend",
+    "init_memory_backend",
+    "DAG",
+    "CycleError",
+    "OperationOptions",
+    "MaxDepth",
+    "OverflowPolicy",
+    "QueueFull",
 ]
 __version__ = "0.4.0"
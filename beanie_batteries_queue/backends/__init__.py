@@ -0,0 +1,13 @@
+from beanie_batteries_queue.backends.base import Backend
+from beanie_batteries_queue.backends.memory import (
+    MemoryBackend,
+    init_memory_backend,
+)
+from beanie_batteries_queue.backends.mongo import MongoBackend
+
+__all__ = [
+    "Backend",
+    "MemoryBackend",
+    "MongoBackend",
+    "init_memory_backend",
+]
@@ -0,0 +1,248 @@
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    AsyncIterator,
+    Dict,
+    List,
+    Mapping,
+    Optional,
+    Tuple,
+    Type,
+)
+
+if TYPE_CHECKING:
+    from beanie_batteries_queue.task import State, Task
+
+
+class Backend:
+    """
+    Storage of the tasks. Task classes call it to push, claim
+    and update the tasks, so the queue works the same way
+    with any storage.
+    """
+
+    # if the backend supports MongoDB change streams for the results
+    supports_change_streams: bool = False
+    # if the backend can wake the queues of the other processes
+    supports_wakeups: bool = False
+
+    async def init_model(self, task_model: Type["Task"]):
+        """
+        Prepare the storage of the task model, like the indexes
+        of the claim orders it opts in to
+        :param task_model: Task model class
+        :return:
+        """
+        raise NotImplementedError()
+
+    async def push(self, task: "Task") -> Any:
+        """
+        Save the new task, unless a task with the same active dedup key
+        is already enqueued
+        :param task: Task prepared for the push
+        :return: Id of the saved task or of the already enqueued one
+        """
+        raise NotImplementedError()
+
+    async def push_many(
+        self, task_model: Type["Task"], tasks: List["Task"]
+    ) -> List[Any]:
+        """
+        Save multiple new tasks at once
+        :param task_model: Task model class
+        :param tasks: Tasks prepared for the push, with ids set
+        :return: Ids of the saved tasks or of the already enqueued ones
+        """
+        raise NotImplementedError()
+
+    async def claim(
+        self, task_model: Type["Task"], partitions: Optional[List[int]]
+    ) -> Optional["Task"]:
+        """
+        Mark the first ready task as running. A task with a group key
+        is claimed only if it is the oldest created task of its group
+        and no other task of the group is running
+        :param task_model: Task model class
+        :param partitions: Claim only from these partitions
+        :return: Claimed task or None if there are no ready tasks
+        """
+        raise NotImplementedError()
+
+    async def claim_many(
+        self,
+        task_model: Type["Task"],
+        partitions: Optional[List[int]],
+        limit: int,
+    ) -> List["Task"]:
+        """
+        Mark up to limit ready tasks as running
+        :param task_model: Task model class
+        :param partitions: Claim only from these partitions
+        :param limit: Max number of the tasks
+        :return: Claimed tasks, empty if there are no ready tasks
+        """
+        tasks = []
+        for _ in range(limit):
+            task = await self.claim(task_model, partitions)
+            if task is None:
+                break
+            tasks.append(task)
+        return tasks
+
+    async def save(self, task: "Task", *args: Any, **kwargs: Any) -> "Task":
+        """
+        Save the whole task
+        :param task: Task to save
+        :return: Saved task
+        """
+        raise NotImplementedError()
+
+    async def update(
+        self,
+        task: "Task",
+        update: Dict[str, Any],
+        expected_state: Optional["State"] = None,
+    ) -> bool:
+        """
+        Save the changed fields of the task
+        :param task: Task with the fields changed already
+        :param update: MongoDB update of the changed fields
+        :param expected_state: Skip the update if the stored task
+            is not in this state
+        :return: True if the stored task was updated
+        """
+        raise NotImplementedError()
+
+    async def update_many(
+        self,
+        task_model: Type["Task"],
+        updates: List[Tuple["Task", Dict[str, Any]]],
+    ):
+        """
+        Save the changed fields of multiple tasks at once
+        :param task_model: Task model class
+        :param updates: Pairs of the task and its MongoDB update
+        :return:
+        """
+        raise NotImplementedError()
+
+    async def get(
+        self, task_model: Type["Task"], task_id: Any
+    ) -> Optional["Task"]:
+        """
+        Get the task by id
+        :param task_model: Task model class
+        :param task_id: Id of the task
+        :return: Task or None if it does not exist
+        """
+        raise NotImplementedError()
+
+    async def find_done(
+        self, task_model: Type["Task"], task_ids: List[Any]
+    ) -> List[Mapping[str, Any]]:
+        """
+        Get the raw documents of the tasks which are done
+        :param task_model: Task model class
+        :param task_ids: Ids of the tasks to check
+        :return: Documents with the id, the state and the result
+        """
+        raise NotImplementedError()
+
+    async def count(self, task_model: Type["Task"], state: "State") -> int:
+        """
+        Count the tasks in the state
+        :param task_model: Task model class
+        :param state: State of the tasks
+        :return:
+        """
+        raise NotImplementedError()
+
+    async def is_empty(self, task_model: Type["Task"]) -> bool:
+        """
+        Check if there are no created tasks
+        :param task_model: Task model class
+        :return:
+        """
+        raise NotImplementedError()
+
+    async def release_group(self, task: "Task"):
+        """
+        Unlock the group of the task which is not running anymore,
+        so the next task of the group can be claimed
+        :param task: Task with a group key
+        :return:
+        """
+        raise NotImplementedError()
+
+    async def save_dag(
+        self,
+        task_model: Type["Task"],
+        dag_id: Any,
+        nodes: List[Mapping[str, Any]],
+    ):
+        """
+        Save the graph of the tasks pushed together,
+        keeping the failures recorded already
+        :param task_model: Task model class of any task of the DAG
+        :param dag_id: Id of the DAG
+        :param nodes: Tasks of the DAG with their dependencies
+        :return:
+        """
+        raise NotImplementedError()
+
+    async def add_dag_failure(
+        self, task_model: Type["Task"], dag_id: Any, task_id: Any
+    ) -> Optional[Mapping[str, Any]]:
+        """
+        Record the failed task of the DAG
+        :param task_model: Task model class of the failed task
+        :param dag_id: Id of the DAG
+        :param task_id: Id of the failed task
+        :return: DAG with the nodes and the ids of all the failed tasks
+            or None if it does not exist
+        """
+        raise NotImplementedError()
+
+    async def cancel(
+        self,
+        task_model: Type["Task"],
+        collection_name: str,
+        task_ids: List[Any],
+    ) -> int:
+        """
+        Mark the created tasks of the collection as cancelled
+        :param task_model: Task model class of any task of the backend
+        :param collection_name: Collection of the tasks
+        :param task_ids: Ids of the tasks
+        :return: Number of the cancelled tasks
+        """
+        raise NotImplementedError()
+
+    async def find_ready_dependents(self, task: "Task") -> List[str]:
+        """
+        Find the dependents of the finished task which can run now
+        :param task: Finished task
+        :return: Collections of the ready dependents
+        """
+        raise NotImplementedError()
+
+    async def publish_wakeup(
+        self, task_model: Type["Task"], collection_names: List[str]
+    ):
+        """
+        Wake the queues of the collections in the other processes
+        :param task_model: Task model class of any task of the backend
+        :param collection_names: Collections with the ready tasks
+        :return:
+        """
+        raise NotImplementedError()
+
+    def watch_wakeups(
+        self, task_model: Type["Task"]
+    ) -> AsyncIterator[List[str]]:
+        """
+        Get the wakeups published by the other processes
+        :param task_model: Task model class of any task of the backend
+        :return: Iterator of the collections with the ready tasks
+        """
+        raise NotImplementedError()
@@ -0,0 +1,451 @@
+import heapq
+from collections import Counter, defaultdict
+from datetime import datetime
+from itertools import count
+from typing import (
+    Any,
+    Dict,
+    Iterator,
+    List,
+    Mapping,
+    Optional,
+    Sequence,
+    Set,
+    Tuple,
+    Type,
+)
+
+from beanie import Document, PydanticObjectId
+from beanie.odm.utils.init import Initializer
+from beanie.odm.utils.pydantic import IS_PYDANTIC_V2
+from motor.motor_asyncio import AsyncIOMotorClient
+
+from beanie_batteries_queue.backends.base import Backend
+from beanie_batteries_queue.task import DependencyType, State, Task
+
+
+def copy_task(task: Task) -> Task:
+    if IS_PYDANTIC_V2:
+        return task.model_copy()
+    return task.copy()
+
+
+class MemoryCollection:
+    def __init__(self):
+        self.tasks: Dict[Any, Task] = {}
+        # heaps of the ready tasks per partition, in the queue order
+        self.ready: Dict[int, List[Tuple[Tuple, int, Any]]] = defaultdict(list)
+        # heap of the tasks which are not ready yet, by the ready time
+        self.delayed: List[Tuple[datetime, int, Any]] = []
+        # created tasks waiting for their dependencies
+        self.blocked: Set[Any] = set()
+        # sequence number of the heap entry of each created task.
+        # Entries with other numbers are stale and skipped
+        self.entries: Dict[Any, int] = {}
+        self.active_dedup_keys: Dict[str, Any] = {}
+        self.counts: Counter = Counter()
+        # heaps of the created tasks per group, by the creation time.
+        # Only the first task of a group which is not running is scheduled
+        self.groups: Dict[str, List[Tuple[datetime, int, Any]]] = defaultdict(
+            list
+        )
+        self.running_groups: Set[str] = set()
+
+
+class MemoryBackend(Backend):
+    """
+    Stores the tasks in the memory of the process.
+    Ready tasks are kept in a heap per partition, so claims take O(log n).
+    Tasks waiting for dependencies are indexed by the dependency ids and
+    become ready when one of the dependencies is finished.
+    """
+
+    def __init__(self):
+        self.collections: Dict[str, MemoryCollection] = {}
+        self.locations: Dict[Any, MemoryCollection] = {}
+        # ids of the tasks waiting for the task
+        self.dependents: Dict[Any, Set[Any]] = defaultdict(set)
+        self.sequence: Iterator[int] = count()
+        self.dags: Dict[Any, Dict[str, Any]] = {}
+        # collections of the dependents released by the finished tasks
+        self.released: Dict[Any, Set[str]] = {}
+
+    def get_collection(self, task_model: Type[Task]) -> MemoryCollection:
+        name = task_model.get_collection_name()
+        if name not in self.collections:
+            self.collections[name] = MemoryCollection()
+        return self.collections[name]
+
+    async def init_model(self, task_model: Type[Task]):
+        # the heaps need no indexes
+        return None
+
+    async def push(self, task: Task) -> Any:
+        collection = self.get_collection(type(task))
+        if task.active_dedup_key is not None:
+            existing_id = collection.active_dedup_keys.get(
+                task.active_dedup_key
+            )
+            if existing_id is not None:
+                return existing_id
+        if task.id is None:
+            task.id = PydanticObjectId()
+        for _, dependency_ids in task.get_dependencies():
+            for dependency_id in dependency_ids:
+                self.dependents[dependency_id].add(task.id)
+        self.store(collection, task)
+        return task.id
+
+    async def push_many(
+        self, task_model: Type[Task], tasks: List[Task]
+    ) -> List[Any]:
+        return [await self.push(task) for task in tasks]
+
+    async def claim(
+        self, task_model: Type[Task], partitions: Optional[List[int]]
+    ) -> Optional[Task]:
+        collection = self.get_collection(task_model)
+        now = datetime.utcnow()
+        while collection.delayed and collection.delayed[0][0] <= now:
+            _, sequence, task_id = heapq.heappop(collection.delayed)
+            if collection.entries.get(task_id) == sequence:
+                self.schedule(collection, collection.tasks[task_id], now)
+
+        if partitions is None:
+            heaps = list(collection.ready.values())
+        else:
+            heaps = [
+                collection.ready[partition]
+                for partition in partitions
+                if partition in collection.ready
+            ]
+        while True:
+            first: Optional[List[Tuple[Tuple, int, Any]]] = None
+            for heap in heaps:
+                while (
+                    heap and collection.entries.get(heap[0][2]) != heap[0][1]
+                ):
+                    heapq.heappop(heap)
+                if heap and (first is None or heap[0] < first[0]):
+                    first = heap
+            if first is None:
+                return None
+
+            _, _, task_id = heapq.heappop(first)
+            stored = collection.tasks[task_id]
+            if stored.group_key is not None and not self.is_group_head(
+                collection, stored
+            ):
+                # scheduled again when it is the first task of a free group
+                collection.entries.pop(task_id, None)
+                continue
+            if stored.group_key is not None:
+                collection.running_groups.add(stored.group_key)
+            task = copy_task(stored)
+            task.state = State.RUNNING
+            self.store(collection, task)
+            return task
+
+    async def save(self, task: Task, *args: Any, **kwargs: Any) -> Task:
+        if task.id is None:
+            task.id = PydanticObjectId()
+        self.store(self.get_collection(type(task)), task)
+        return task
+
+    async def update(
+        self,
+        task: Task,
+        update: Dict[str, Any],
+        expected_state: Optional[State] = None,
+    ) -> bool:
+        collection = self.get_collection(type(task))
+        stored = collection.tasks.get(task.id)
+        if stored is None:
+            return False
+        if expected_state is not None and stored.state != expected_state:
+            return False
+        self.store(collection, task)
+        return True
+
+    async def update_many(
+        self,
+        task_model: Type[Task],
+        updates: List[Tuple[Task, Dict[str, Any]]],
+    ):
+        for task, update in updates:
+            await self.update(task, update)
+
+    async def get(
+        self, task_model: Type[Task], task_id: Any
+    ) -> Optional[Task]:
+        task = self.get_collection(task_model).tasks.get(task_id)
+        if task is None:
+            return None
+        return copy_task(task)
+
+    async def find_done(
+        self, task_model: Type[Task], task_ids: List[Any]
+    ) -> List[Mapping[str, Any]]:
+        tasks = self.get_collection(task_model).tasks
+        done_states = task_model.get_done_states()
+        documents = []
+        for task_id in task_ids:
+            task = tasks.get(task_id)
+            if task is not None and task.state in done_states:
+                documents.append(
+                    {
+                        "_id": task_id,
+                        "state": task.state.value,
+                        "result": task.result,
+                    }
+                )
+        return documents
+
+    async def count(self, task_model: Type[Task], state: State) -> int:
+        return self.get_collection(task_model).counts[state]
+
+    async def is_empty(self, task_model: Type[Task]) -> bool:
+        return await self.count(task_model, State.CREATED) == 0
+
+    async def release_group(self, task: Task):
+        collection = self.get_collection(type(task))
+        collection.running_groups.discard(task.group_key)
+        self.schedule_group(collection, task.group_key, datetime.utcnow())
+
+    async def save_dag(
+        self,
+        task_model: Type[Task],
+        dag_id: Any,
+        nodes: List[Mapping[str, Any]],
+    ):
+        dag = self.dags.setdefault(dag_id, {"_id": dag_id, "failed": []})
+        dag["nodes"] = nodes
+
+    async def add_dag_failure(
+        self, task_model: Type[Task], dag_id: Any, task_id: Any
+    ) -> Optional[Mapping[str, Any]]:
+        dag = self.dags.get(dag_id)
+        if dag is None:
+            return None
+        if task_id not in dag["failed"]:
+            dag["failed"].append(task_id)
+        return dag
+
+    async def cancel(
+        self, task_model: Type[Task], collection_name: str, task_ids: List[Any]
+    ) -> int:
+        collection = self.collections.get(collection_name)
+        if collection is None:
+            return 0
+        cancelled = 0
+        for task_id in task_ids:
+            stored = collection.tasks.get(task_id)
+            if stored is None or stored.state != State.CREATED:
+                continue
+            task = copy_task(stored)
+            task.state = State.CANCELLED
+            task.active_dedup_key = None
+            self.store(collection, task)
+            cancelled += 1
+        return cancelled
+
+    async def find_ready_dependents(self, task: Task) -> List[str]:
+        return sorted(self.released.pop(task.id, set()))
+
+    def store(self, collection: MemoryCollection, task: Task):
+        """
+        Save a copy of the task and update the indexes
+        :param collection: Collection of the task
+        :param task: Task to save
+        :return:
+        """
+        previous = collection.tasks.get(task.id)
+        if previous is not None:
+            collection.counts[previous.state] -= 1
+            if (
+                previous.active_dedup_key is not None
+                and collection.active_dedup_keys.get(previous.active_dedup_key)
+                == task.id
+            ):
+                del collection.active_dedup_keys[previous.active_dedup_key]
+        stored = copy_task(task)
+        collection.tasks[task.id] = stored
+        self.locations[task.id] = collection
+        collection.counts[stored.state] += 1
+        if stored.active_dedup_key is not None:
+            collection.active_dedup_keys[stored.active_dedup_key] = task.id
+        collection.entries.pop(task.id, None)
+        collection.blocked.discard(task.id)
+        if stored.group_key is not None:
+            if stored.state == State.CREATED:
+                heapq.heappush(
+                    collection.groups[stored.group_key],
+                    (stored.created_at, next(self.sequence), task.id),
+                )
+            # the first task of the group could change
+            self.schedule_group(
+                collection, stored.group_key, datetime.utcnow()
+            )
+        elif stored.state == State.CREATED:
+            self.schedule(collection, stored, datetime.utcnow())
+        if stored.state == State.FINISHED:
+            for dependent_id in self.dependents.pop(task.id, set()):
+                dependent_collection = self.locations[dependent_id]
+                if dependent_id in dependent_collection.blocked:
+                    dependent_collection.blocked.discard(dependent_id)
+                    dependent = dependent_collection.tasks[dependent_id]
+                    self.schedule(
+                        dependent_collection, dependent, datetime.utcnow()
+                    )
+                    if dependent_id in dependent_collection.entries:
+                        self.released.setdefault(task.id, set()).add(
+                            dependent.get_collection_name()
+                        )
+
+    def schedule(
+        self, collection: MemoryCollection, task: Task, now: datetime
+    ):
+        """
+        Put the created task to the ready or the delayed heap,
+        or block it until its dependencies are finished
+        :param collection: Collection of the task
+        :param task: Stored task
+        :param now: Current time
+        :return:
+        """
+        sequence = next(self.sequence)
+        ready_time = task.get_ready_time()
+        if ready_time is not None and ready_time > now:
+            collection.entries[task.id] = sequence
+            heapq.heappush(collection.delayed, (ready_time, sequence, task.id))
+        elif not self.are_dependencies_finished(task):
+            collection.entries.pop(task.id, None)
+            collection.blocked.add(task.id)
+        else:
+            collection.entries[task.id] = sequence
+            heapq.heappush(
+                collection.ready[task.partition],
+                (task.get_sort_key(), sequence, task.id),
+            )
+
+    def get_group_head(
+        self, collection: MemoryCollection, group_key: str
+    ) -> Optional[Task]:
+        """
+        Get the oldest created task of the group
+        :param collection: Collection of the group
+        :param group_key: Group key
+        :return:
+        """
+        heap = collection.groups.get(group_key)
+        while heap and collection.tasks[heap[0][2]].state != State.CREATED:
+            heapq.heappop(heap)
+        if not heap:
+            collection.groups.pop(group_key, None)
+            return None
+        return collection.tasks[heap[0][2]]
+
+    def is_group_head(self, collection: MemoryCollection, task: Task) -> bool:
+        if task.group_key in collection.running_groups:
+            return False
+        head = self.get_group_head(collection, task.group_key)
+        return head is not None and head.id == task.id
+
+    def schedule_group(
+        self, collection: MemoryCollection, group_key: str, now: datetime
+    ):
+        """
+        Schedule the oldest created task of the group
+        if no task of the group is running
+        :param collection: Collection of the group
+        :param group_key: Group key
+        :param now: Current time
+        :return:
+        """
+        if group_key in collection.running_groups:
+            return
+        head = self.get_group_head(collection, group_key)
+        if (
+            head is None
+            or head.id in collection.entries
+            or head.id in collection.blocked
+        ):
+            return
+        self.schedule(collection, head, now)
+
+    def is_finished(self, task_id: Any) -> bool:
+        collection = self.locations.get(task_id)
+        return (
+            collection is not None
+            and collection.tasks[task_id].state == State.FINISHED
+        )
+
+    def are_dependencies_finished(self, task: Task) -> bool:
+        for dependency_type, dependency_ids in task.get_dependencies():
+            if not dependency_ids:
+                continue
+            finished = [self.is_finished(i) for i in dependency_ids]
+            if dependency_type == DependencyType.ANY_OF:
+                if not any(finished):
+                    return False
+            elif not all(finished):
+                return False
+        return True
+
+
+class MemoryInitializer(Initializer):
+    """
+    Initializes the document models without a database connection.
+    Runs the steps of the Beanie init_document which need no database,
+    so the indexes are not created either
+    """
+
+    def __init__(self, document_models: Sequence[Type[Document]]):
+        # the database is never connected to
+        super().__init__(
+            database=AsyncIOMotorClient(connect=False)["memory"],
+            document_models=document_models,
+        )
+
+    async def init_document(self, cls: Type[Document]):
+        if cls is Document or cls in self.inited_classes:
+            return None
+        self.set_default_class_vars(cls)
+        self.init_settings(cls)
+        settings = cls.get_settings()
+        if not settings.name:
+            settings.name = cls.__name__
+        self.init_document_fields(cls)
+        self.init_cache(cls)
+        self.init_actions(cls)
+        self.inited_classes.append(cls)
+        return None
+
+
+async def init_memory_backend(
+    document_models: Sequence[Type[Task]],
+    backend: Optional[MemoryBackend] = None,
+) -> MemoryBackend:
+    """
+    Initialize the task models to store the tasks in memory
+    instead of MongoDB
+    :param document_models: Task model classes
+    :param backend: Backend to use. New one if not set
+    :return: Backend of the models
+    :raises ValueError: if a model has a rate limit, memoization
+        or max depth, which keep their state in MongoDB
+    """
+    for model in document_models:
+        for option in ("rate_limit", "memoize", "max_depth"):
+            if getattr(model, option) is not None:
+                raise ValueError(
+                    f"{model.__name__} has {option}, "
+                    f"which is not supported by the in-memory backend"
+                )
+    if backend is None:
+        backend = MemoryBackend()
+    # set before the init, which initializes the models with their backend
+    for model in document_models:
+        model.backend = backend
+    await MemoryInitializer(document_models)
+    return backend
@@ -0,0 +1,611 @@
+import asyncio
+from datetime import datetime, timedelta
+from typing import (
+    Any,
+    AsyncIterator,
+    Dict,
+    List,
+    Mapping,
+    Optional,
+    Tuple,
+    Type,
+)
+
+from beanie import Document, PydanticObjectId
+from beanie.odm.utils.dump import get_dict
+from pymongo import (
+    ASCENDING,
+    CursorType,
+    ReadPreference,
+    ReturnDocument,
+    UpdateOne,
+)
+from pymongo.errors import (
+    BulkWriteError,
+    CollectionInvalid,
+    DuplicateKeyError,
+)
+
+from beanie_batteries_queue.backends.base import Backend
+from beanie_batteries_queue.options import OperationOptions
+from beanie_batteries_queue.task import ClaimStrategy, State, Task
+
+
+class MongoBackend(Backend):
+    """
+    Stores the tasks in the MongoDB collections of the task models.
+    The writes with the operation options set are made with Motor
+    directly, so the event-based actions of the documents
+    are not run for them.
+    """
+
+    supports_change_streams = True
+    supports_wakeups = True
+
+    def __init__(
+        self,
+        dag_collection_name: str = "task_dags",
+        dag_ttl: int = 86400,
+        wakeup_collection_name: str = "task_wakeups",
+        wakeup_collection_size: int = 1024 * 1024,
+        wakeup_retry_interval: float = 1.0,
+        group_lock_collection_name: str = "task_group_locks",
+    ):
+        """
+        Initialize the MongoBackend.
+
+        :param dag_collection_name: Collection to store the DAGs in
+        :param dag_ttl: Seconds to keep the DAGs for
+        :param wakeup_collection_name: Capped collection to publish
+            the wakeups of the queues through
+        :param wakeup_collection_size: Size of the wakeup collection in bytes
+        :param wakeup_retry_interval: Seconds to wait before reopening
+            the wakeup cursor
+        :param group_lock_collection_name: Collection to store the locks
+            of the groups with running tasks in
+        """
+        self.dag_collection_name = dag_collection_name
+        self.dag_ttl = dag_ttl
+        self.dag_index_created = False
+        self.wakeup_collection_name = wakeup_collection_name
+        self.wakeup_collection_size = wakeup_collection_size
+        self.wakeup_retry_interval = wakeup_retry_interval
+        self.wakeup_collection_created = False
+        self.group_lock_collection_name = group_lock_collection_name
+        self.group_lock_indexes_created = False
+
+    def get_dag_collection(self, task_model: Type[Task]):
+        return task_model.get_motor_collection().database[
+            self.dag_collection_name
+        ]
+
+    @staticmethod
+    def get_collection(
+        task_model: Type[Task], options: Optional[OperationOptions]
+    ):
+        collection = task_model.get_motor_collection()
+        if options is None:
+            return collection
+        return options.apply(collection)
+
+    async def init_model(self, task_model: Type[Task]):
+        indexes = task_model.get_claim_indexes()
+        if indexes:
+            await task_model.get_motor_collection().create_indexes(indexes)
+
+    async def push(self, task: Task) -> Any:
+        while True:
+            task_id = task.id
+            try:
+                await self.insert(task)
+                return task.id
+            except DuplicateKeyError as e:
+                if not self.is_dedup_error(e.details):
+                    raise
+                task.id = task_id
+            existing_id = await self.find_active_id(type(task), task.dedup_key)
+            # the existing task could be done already, then push again
+            if existing_id is not None:
+                return existing_id
+
+    async def insert(self, task: Task):
+        options = task.push_options
+        if options is None:
+            await Document.save(task)
+            return
+        if task.id is None:
+            task.id = PydanticObjectId()
+        await options.apply(task.get_motor_collection()).insert_one(
+            get_dict(task, to_db=True)
+        )
+
+    async def push_many(
+        self, task_model: Type[Task], tasks: List[Task]
+    ) -> List[Any]:
+        if not tasks:
+            return []
+        ids = [task.id for task in tasks]
+        options = task_model.push_options
+        try:
+            if options is None:
+                await task_model.insert_many(tasks, ordered=False)
+            else:
+                await options.apply(
+                    task_model.get_motor_collection()
+                ).insert_many(
+                    [get_dict(task, to_db=True) for task in tasks],
+                    ordered=False,
+                )
+        except BulkWriteError as e:
+            duplicates = []
+            for error in e.details["writeErrors"]:
+                if not self.is_dedup_error(error):
+                    raise
+                duplicates.append(error["index"])
+            for index in duplicates:
+                tasks[index].id = None
+                ids[index] = await self.push(tasks[index])
+        return ids
+
+    @staticmethod
+    def is_dedup_error(details: Optional[Dict[str, Any]]) -> bool:
+        return (
+            details is not None
+            and details.get("code") == 11000
+            and "active_dedup_key" in details.get("errmsg", "")
+        )
+
+    @staticmethod
+    async def find_active_id(
+        task_model: Type[Task], dedup_key: Optional[str]
+    ) -> Optional[Any]:
+        """
+        Get the id of the created or running task with the dedup key
+        :param task_model: Task model class
+        :param dedup_key:
+        :return:
+        """
+        task = await task_model.get_motor_collection().find_one(
+            {"active_dedup_key": dedup_key}, projection={"_id": 1}
+        )
+        if task is None:
+            return None
+        return task["_id"]
+
+    async def claim(
+        self, task_model: Type[Task], partitions: Optional[List[int]]
+    ) -> Optional[Task]:
+        find_query = task_model.make_find_query()
+        if partitions is not None:
+            find_query["$and"].append({"partition": {"$in": partitions}})
+        limit = 1
+        if task_model.claim_strategy == ClaimStrategy.RELAXED:
+            limit = task_model.claim_candidates
+        collection = self.get_collection(task_model, task_model.claim_options)
+        # candidates read from a secondary could be claimed already,
+        # so the claims read from the primary whatever the options say
+        collection = collection.with_options(
+            read_preference=ReadPreference.PRIMARY
+        )
+        # groups with running tasks, loaded when the first grouped
+        # candidate is found. Their number is bounded by the workers
+        locked_groups: Optional[List[str]] = None
+        while True:
+            query = find_query
+            if locked_groups:
+                query = {
+                    "$and": find_query["$and"]
+                    + [{"group_key": {"$nin": locked_groups}}]
+                }
+            candidates = await self.find_candidates(
+                task_model, collection, query, limit
+            )
+            if not candidates:
+                return None
+            candidate = task_model.choose_candidate(candidates)
+            group_key = candidate.get("group_key")
+            if group_key is None:
+                task = await self.claim_candidate(
+                    task_model, collection, candidate["_id"]
+                )
+                # check if this task was not taken by another worker
+                if task is not None:
+                    return task
+                task_model.get_stats().increment("claim_conflicts")
+                continue
+
+            if locked_groups is None:
+                locked_groups = await self.find_locked_groups(task_model)
+                if group_key in locked_groups:
+                    continue
+            task = await self.claim_group(
+                task_model, collection, find_query, group_key
+            )
+            if task is not None:
+                return task
+            locked_groups.append(group_key)
+
+    async def claim_many(
+        self,
+        task_model: Type[Task],
+        partitions: Optional[List[int]],
+        limit: int,
+    ) -> List[Task]:
+        find_query = task_model.make_find_query()
+        # the tasks of the groups are claimed one by one
+        find_query["$and"].append({"group_key": None})
+        if partitions is not None:
+            find_query["$and"].append({"partition": {"$in": partitions}})
+        collection = self.get_collection(task_model, task_model.claim_options)
+        collection = collection.with_options(
+            read_preference=ReadPreference.PRIMARY
+        )
+        candidates = await self.find_candidates(
+            task_model, collection, find_query, limit
+        )
+        if not candidates:
+            return []
+        task_ids = [candidate["_id"] for candidate in candidates]
+        claim_id = PydanticObjectId()
+        result = await collection.update_many(
+            {"_id": {"$in": task_ids}, "state": State.CREATED.value},
+            {
+                "$set": {
+                    "state": State.RUNNING.value,
+                    "claim_id": claim_id,
+                }
+            },
+        )
+        conflicts = len(task_ids) - result.modified_count
+        if conflicts:
+            task_model.get_stats().increment("claim_conflicts", conflicts)
+        if result.modified_count == 0:
+            return []
+        # the tasks taken by other workers have other claim ids
+        documents = await collection.find(
+            {"_id": {"$in": task_ids}, "claim_id": claim_id}
+        ).to_list(length=len(task_ids))
+        order = {
+            task_id: position for position, task_id in enumerate(task_ids)
+        }
+        documents.sort(key=lambda document: order[document["_id"]])
+        return [task_model.parse_document(document) for document in documents]
+
+    @staticmethod
+    async def find_candidates(
+        task_model: Type[Task],
+        collection,
+        find_query: Dict[str, Any],
+        limit: int,
+    ) -> List[Mapping[str, Any]]:
+        """
+        Find the first ready tasks in the queue order
+        :param task_model: Task model class
+        :param collection: Motor collection of the task model
+        :param find_query: Query of the ready tasks
+        :param limit: Max number of the tasks
+        :return: Documents with the ids and the group keys
+        """
+        query = (
+            task_model.find(find_query, fetch_links=True)
+            .sort(task_model.get_sort())
+            .limit(limit)
+        )
+        projection = {"_id": 1, "group_key": 1}
+        if task_model._dependency_fields is None:
+            cursor = collection.find(
+                query.get_filter_query(),
+                projection=projection,
+                sort=query.sort_expressions,
+                limit=limit,
+            )
+        else:
+            # the dependencies are checked after the lookup of the links
+            pipeline = query.build_aggregation_pipeline()
+            pipeline.append({"$project": projection})
+            cursor = collection.aggregate(pipeline)
+        return await cursor.to_list(length=limit)
+
+    @staticmethod
+    async def claim_candidate(
+        task_model: Type[Task], collection, task_id: Any
+    ) -> Optional[Task]:
+        document = await collection.find_one_and_update(
+            {"_id": task_id, "state": State.CREATED.value},
+            {"$set": {"state": State.RUNNING.value}},
+            return_document=ReturnDocument.AFTER,
+        )
+        if document is None:
+            return None
+        return task_model.parse_document(document)
+
+    async def claim_group(
+        self,
+        task_model: Type[Task],
+        collection,
+        find_query: Dict[str, Any],
+        group_key: str,
+    ) -> Optional[Task]:
+        """
+        Lock the group and claim its oldest created task, if it is ready
+        :param task_model: Task model class
+        :param collection: Motor collection of the task model
+        :param find_query: Query of the ready tasks
+        :param group_key: Group of a ready task
+        :return: Claimed task or None if the group is locked
+            or its oldest task is not ready
+        """
+        head_id = await self.find_group_head(collection, group_key)
+        if head_id is None:
+            return None
+        locks = await self.get_group_lock_collection(task_model)
+        lock_id = f"{task_model.get_collection_name()}:{group_key}"
+        try:
+            await locks.insert_one(
+                {
+                    "_id": lock_id,
+                    "collection": task_model.get_collection_name(),
+                    "group": group_key,
+                    "task_id": head_id,
+                    "expire_at": datetime.utcnow()
+                    + timedelta(seconds=task_model.group_lock_ttl),
+                }
+            )
+        except DuplicateKeyError:
+            return None
+        task = None
+        # the head could be put back by a retry before the group was locked
+        if head_id == await self.find_group_head(collection, group_key):
+            ready = await self.find_candidates(
+                task_model,
+                collection,
+                {"$and": find_query["$and"] + [{"_id": head_id}]},
+                1,
+            )
+            if ready:
+                task = await self.claim_candidate(
+                    task_model, collection, head_id
+                )
+        if task is None:
+            await locks.delete_one({"_id": lock_id, "task_id": head_id})
+        return task
+
+    @staticmethod
+    async def find_group_head(collection, group_key: str) -> Optional[Any]:
+        head = await collection.find_one(
+            {"group_key": group_key, "state": State.CREATED.value},
+            projection={"_id": 1},
+            sort=[("created_at", ASCENDING)],
+        )
+        if head is None:
+            return None
+        return head["_id"]
+
+    async def get_group_lock_collection(self, task_model: Type[Task]):
+        collection = task_model.get_motor_collection().database[
+            self.group_lock_collection_name
+        ]
+        if not self.group_lock_indexes_created:
+            await collection.create_index([("collection", ASCENDING)])
+            await collection.create_index(
+                [("expire_at", ASCENDING)], expireAfterSeconds=0
+            )
+            self.group_lock_indexes_created = True
+        return collection
+
+    async def find_locked_groups(self, task_model: Type[Task]) -> List[str]:
+        locks = await self.get_group_lock_collection(task_model)
+        return [
+            lock["group"]
+            async for lock in locks.find(
+                {"collection": task_model.get_collection_name()},
+                projection={"group": 1},
+            )
+        ]
+
+    async def release_group(self, task: Task):
+        locks = await self.get_group_lock_collection(type(task))
+        await locks.delete_one(
+            {
+                "_id": f"{task.get_collection_name()}:{task.group_key}",
+                "task_id": task.id,
+            }
+        )
+
+    async def save(self, task: Task, *args: Any, **kwargs: Any) -> Task:
+        options = task.ack_options
+        if options is None:
+            return await Document.save(task, *args, **kwargs)
+        if task.id is None:
+            task.id = PydanticObjectId()
+        await options.apply(task.get_motor_collection()).replace_one(
+            {"_id": task.id}, get_dict(task, to_db=True), upsert=True
+        )
+        return task
+
+    async def update(
+        self,
+        task: Task,
+        update: Dict[str, Any],
+        expected_state: Optional[State] = None,
+    ) -> bool:
+        query: Dict[str, Any] = {"_id": task.id}
+        if expected_state is not None:
+            query["state"] = expected_state.value
+        result = await self.get_collection(
+            type(task), task.ack_options
+        ).update_one(query, update)
+        # the unacknowledged writes are expected to be applied
+        return not result.acknowledged or result.modified_count > 0
+
+    async def update_many(
+        self,
+        task_model: Type[Task],
+        updates: List[Tuple[Task, Dict[str, Any]]],
+    ):
+        operations = [
+            UpdateOne({"_id": task.id}, update) for task, update in updates
+        ]
+        if operations:
+            await self.get_collection(
+                task_model, task_model.ack_options
+            ).bulk_write(operations, ordered=False)
+
+    async def get(
+        self, task_model: Type[Task], task_id: Any
+    ) -> Optional[Task]:
+        return await task_model.get(task_id)
+
+    async def find_done(
+        self, task_model: Type[Task], task_ids: List[Any]
+    ) -> List[Mapping[str, Any]]:
+        if not task_ids:
+            return []
+        return await (
+            self.get_collection(task_model, task_model.stats_options)
+            .find(
+                {
+                    "_id": {"$in": task_ids},
+                    "state": {"$in": task_model.get_done_states()},
+                },
+                projection={"state": 1, "result": 1},
+            )
+            .to_list(length=None)
+        )
+
+    async def count(self, task_model: Type[Task], state: State) -> int:
+        collection = self.get_collection(task_model, task_model.stats_options)
+        return await collection.count_documents({"state": state.value})
+
+    async def is_empty(self, task_model: Type[Task]) -> bool:
+        collection = self.get_collection(task_model, task_model.stats_options)
+        return (
+            await collection.find_one(
+                {"state": State.CREATED.value}, projection={"_id": 1}
+            )
+            is None
+        )
+
+    async def save_dag(
+        self,
+        task_model: Type[Task],
+        dag_id: Any,
+        nodes: List[Mapping[str, Any]],
+    ):
+        collection = self.get_dag_collection(task_model)
+        if not self.dag_index_created:
+            await collection.create_index(
+                [("created_at", ASCENDING)], expireAfterSeconds=self.dag_ttl
+            )
+            self.dag_index_created = True
+        await collection.update_one(
+            {"_id": dag_id},
+            {
+                "$set": {"nodes": nodes},
+                "$setOnInsert": {
+                    "created_at": datetime.utcnow(),
+                    "failed": [],
+                },
+            },
+            upsert=True,
+        )
+
+    async def add_dag_failure(
+        self, task_model: Type[Task], dag_id: Any, task_id: Any
+    ) -> Optional[Mapping[str, Any]]:
+        return await self.get_dag_collection(task_model).find_one_and_update(
+            {"_id": dag_id},
+            {"$addToSet": {"failed": task_id}},
+            return_document=ReturnDocument.AFTER,
+        )
+
+    async def cancel(
+        self,
+        task_model: Type[Task],
+        collection_name: str,
+        task_ids: List[Any],
+    ) -> int:
+        database = self.get_collection(
+            task_model, task_model.ack_options
+        ).database
+        result = await database[collection_name].update_many(
+            {"_id": {"$in": task_ids}, "state": State.CREATED.value},
+            {
+                "$set": {
+                    "state": State.CANCELLED.value,
+                    "active_dedup_key": None,
+                }
+            },
+        )
+        return result.modified_count
+
+    async def find_ready_dependents(self, task: Task) -> List[str]:
+        collection_names = []
+        for model in type(task).get_dependent_models():
+            # the links are fetched only for the tasks which reference
+            # the finished one. The stored references can use an index
+            referencing = {
+                "state": State.CREATED.value,
+                "$or": [
+                    {f"{field}.$id": task.id}
+                    for field in model._dependency_fields or {}
+                ],
+            }
+            pipeline = model.find(
+                model.make_find_query(), fetch_links=True
+            ).build_aggregation_pipeline()
+            pipeline = (
+                [{"$match": referencing}]
+                + pipeline
+                + [{"$limit": 1}, {"$project": {"_id": 1}}]
+            )
+            cursor = model.get_motor_collection().aggregate(pipeline)
+            if await cursor.to_list(length=1):
+                collection_names.append(model.get_collection_name())
+        return collection_names
+
+    async def get_wakeup_collection(self, task_model: Type[Task]):
+        database = task_model.get_motor_collection().database
+        collection = database[self.wakeup_collection_name]
+        if not self.wakeup_collection_created:
+            try:
+                await database.create_collection(
+                    self.wakeup_collection_name,
+                    capped=True,
+                    size=self.wakeup_collection_size,
+                )
+                # tailable cursors of an empty collection are closed
+                await collection.insert_one(
+                    {"collections": [], "created_at": datetime.utcnow()}
+                )
+            except CollectionInvalid:
+                pass
+            self.wakeup_collection_created = True
+        return collection
+
+    async def publish_wakeup(
+        self, task_model: Type[Task], collection_names: List[str]
+    ):
+        collection = await self.get_wakeup_collection(task_model)
+        await collection.insert_one(
+            {"collections": collection_names, "created_at": datetime.utcnow()}
+        )
+
+    async def watch_wakeups(
+        self, task_model: Type[Task]
+    ) -> AsyncIterator[List[str]]:
+        collection = await self.get_wakeup_collection(task_model)
+        since = datetime.utcnow()
+        while True:
+            cursor = collection.find(
+                {"created_at": {"$gte": since}},
+                cursor_type=CursorType.TAILABLE_AWAIT,
+            )
+            while cursor.alive:
+                async for wakeup in cursor:
+                    since = wakeup["created_at"]
+                    yield wakeup["collections"]
+            await asyncio.sleep(self.wakeup_retry_interval)
+
+
+mongo_backend = MongoBackend()
@@ -0,0 +1,219 @@
+import sys
+from copy import deepcopy
+from datetime import datetime
+from enum import Enum
+from functools import partial
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    List,
+    Mapping,
+    Optional,
+    Tuple,
+    Type,
+    Union,
+)
+
+from beanie import Link
+from beanie.odm.fields import LinkInfo, LinkTypes
+from beanie.odm.utils.pydantic import (
+    IS_PYDANTIC_V2,
+    get_field_type,
+    get_model_fields,
+    parse_object_as,
+)
+from bson import DBRef, ObjectId
+from pydantic import BaseModel
+
+if sys.version_info >= (3, 8):
+    from typing import get_args, get_origin
+else:  # pragma: no cover
+    from typing_extensions import get_args, get_origin
+
+if IS_PYDANTIC_V2:
+    from pydantic import TypeAdapter
+    from pydantic_core import PydanticUndefined
+
+if sys.version_info >= (3, 10):
+    from types import UnionType
+
+    UNION_TYPES: Tuple[Any, ...] = (Union, UnionType)
+else:  # pragma: no cover
+    UNION_TYPES = (Union,)
+
+Converter = Callable[[Any], Any]
+
+# the internal attributes the fast construct sets, like model_construct
+MODEL_SLOTS = (
+    "__dict__",
+    "__pydantic_fields_set__",
+    "__pydantic_extra__",
+    "__pydantic_private__",
+)
+# the pydantic versions without these attributes use model_construct
+FAST_CONSTRUCT = IS_PYDANTIC_V2 and set(MODEL_SLOTS) == set(
+    getattr(BaseModel, "__slots__", ())
+)
+
+# types which MongoDB returns as they are validated
+TRUSTED_TYPES = (str, int, float, bool, bytes, datetime, type(None))
+
+
+def is_trusted_type(annotation: Any) -> bool:
+    """
+    Check if the values of the type need no conversion
+    when they are read from MongoDB
+    :param annotation: Type of the field
+    :return:
+    """
+    if annotation is Any:
+        return True
+    origin = get_origin(annotation)
+    if origin is None:
+        return annotation in TRUSTED_TYPES
+    if origin in UNION_TYPES or origin in (list, List, dict, Dict):
+        return all(is_trusted_type(arg) for arg in get_args(annotation))
+    return False
+
+
+def is_coercible_type(annotation: Any) -> bool:
+    # enums like State and ObjectId subclasses like PydanticObjectId
+    return isinstance(annotation, type) and issubclass(
+        annotation, (Enum, ObjectId)
+    )
+
+
+def make_link_converter(link_info: LinkInfo) -> Optional[Converter]:
+    document_class = link_info.document_class
+
+    def to_link(value: Any) -> Any:
+        if isinstance(value, DBRef):
+            return Link(value, document_class)
+        return value
+
+    if link_info.link_type in (LinkTypes.DIRECT, LinkTypes.OPTIONAL_DIRECT):
+        return to_link
+    if link_info.link_type in (LinkTypes.LIST, LinkTypes.OPTIONAL_LIST):
+        return lambda value: (
+            value if value is None else [to_link(item) for item in value]
+        )
+    return None
+
+
+def make_converter(annotation: Any) -> Optional[Converter]:
+    """
+    Make the function which turns the value read from MongoDB
+    into the value of the field
+    :param annotation: Type of the field
+    :return: None if the value is used as it is
+    """
+    if is_trusted_type(annotation):
+        return None
+    if is_coercible_type(annotation):
+        return annotation
+    if get_origin(annotation) in UNION_TYPES:
+        args = [arg for arg in get_args(annotation) if arg is not type(None)]
+        if len(args) == 1 and is_coercible_type(args[0]):
+            coerce = args[0]
+            return lambda value: value if value is None else coerce(value)
+    # the other types are validated
+    if IS_PYDANTIC_V2:
+        return TypeAdapter(annotation).validate_python
+    return lambda value: parse_object_as(annotation, value)
+
+
+IMMUTABLE_TYPES = (str, int, float, bool, bytes, tuple, type(None))
+
+
+def identity(value: Any) -> Any:
+    return value
+
+
+class Constructor:
+    def __init__(
+        self,
+        document_model: Type[BaseModel],
+        link_fields: Optional[Mapping[str, LinkInfo]] = None,
+    ):
+        """
+        Initialize the Constructor.
+        Creates the models from the MongoDB documents without validating
+        them. The values are converted only where MongoDB returns another
+        type than the validation would, like the enums, the ids
+        and the links.
+
+        :param document_model: Document model class
+        :param link_fields: Link fields of the document model
+        """
+        self.document_model = document_model
+        self.fields = get_model_fields(document_model)
+        self.converters: List[Tuple[str, str, Optional[Converter]]] = []
+        for name, field in self.fields.items():
+            converter = None
+            if link_fields and name in link_fields:
+                converter = make_link_converter(link_fields[name])
+            if converter is None:
+                converter = make_converter(get_field_type(field))
+            self.converters.append((name, field.alias or name, converter))
+        self.private_defaults = self.make_private_defaults()
+
+    def make_private_defaults(
+        self,
+    ) -> Optional[List[Tuple[str, Callable[[], Any]]]]:
+        """
+        Make the factories of the private attributes
+        :return: None if the model has its own model_post_init,
+            which has to be called by model_construct instead,
+            or if the pydantic version has other internal attributes
+        """
+        if not FAST_CONSTRUCT:
+            return None
+        post_init = self.document_model.model_post_init
+        if getattr(post_init, "__name__", "") != "init_private_attributes":
+            return None
+        attributes = self.document_model.__private_attributes__
+        defaults = []
+        for name, attribute in attributes.items():
+            if attribute.default_factory is not None:
+                defaults.append((name, attribute.default_factory))
+            elif attribute.default is PydanticUndefined:
+                continue
+            elif isinstance(attribute.default, IMMUTABLE_TYPES):
+                defaults.append((name, partial(identity, attribute.default)))
+            else:
+                defaults.append((name, partial(deepcopy, attribute.default)))
+        return defaults
+
+    def __call__(self, document: Mapping[str, Any]) -> Any:
+        """
+        Create the model from the MongoDB document
+        :param document: MongoDB document
+        :return: Model instance
+        """
+        values = {}
+        for name, alias, converter in self.converters:
+            if alias in document:
+                value = document[alias]
+                if converter is not None:
+                    value = converter(value)
+                values[name] = value
+        if self.private_defaults is None:
+            if IS_PYDANTIC_V2:
+                return self.document_model.model_construct(**values)
+            return self.document_model.construct(**values)
+        # the same as model_construct, without its per-call overhead
+        fields_set = set(values)
+        for name, field in self.fields.items():
+            if name not in fields_set:
+                values[name] = field.get_default(call_default_factory=True)
+        model = self.document_model.__new__(self.document_model)
+        object.__setattr__(model, "__dict__", values)
+        object.__setattr__(model, "__pydantic_fields_set__", fields_set)
+        object.__setattr__(model, "__pydantic_extra__", None)
+        object.__setattr__(
+            model,
+            "__pydantic_private__",
+            {name: factory() for name, factory in self.private_defaults},
+        )
+        return model
@@ -0,0 +1,169 @@
+from collections import defaultdict
+from typing import Any, Collection, Dict, List, Mapping, Optional, Type
+
+from beanie import PydanticObjectId
+
+from beanie_batteries_queue.results import TaskHandle
+from beanie_batteries_queue.task import DependencyType, Task
+
+
+class CycleError(ValueError):
+    pass
+
+
+class DAG:
+    def __init__(self, tasks: Optional[List[Task]] = None):
+        """
+        Initialize the DAG.
+        Graph of the tasks which are pushed together.
+        The edges are the dependency fields of the tasks.
+
+        :param tasks: Tasks of the graph
+        """
+        self.tasks: List[Task] = []
+        for task in tasks or []:
+            self.add(task)
+
+    def add(self, task: Task) -> Task:
+        """
+        Add the task to the graph
+        :param task: Task, which can depend on the tasks of the graph
+        :return: The added task
+        """
+        if not any(added is task for added in self.tasks):
+            self.tasks.append(task)
+        return task
+
+    def get_levels(self) -> List[List[Task]]:
+        """
+        Sort the tasks topologically. Assigns the ids to the tasks
+        :return: Groups of the tasks, each of them depends only on the tasks
+            of the previous groups or on the tasks outside the graph
+        :raises CycleError: if the dependencies have a cycle
+        """
+        for task in self.tasks:
+            if task.id is None:
+                task.id = PydanticObjectId()
+        tasks_by_id = {task.id: task for task in self.tasks}
+        waiting: Dict[Any, int] = {}
+        dependents: Dict[Any, List[Any]] = defaultdict(list)
+        for task in self.tasks:
+            dependency_ids = {
+                dependency_id
+                for _, ids in task.get_dependencies()
+                for dependency_id in ids
+                if dependency_id in tasks_by_id
+            }
+            waiting[task.id] = len(dependency_ids)
+            for dependency_id in dependency_ids:
+                dependents[dependency_id].append(task.id)
+
+        levels = []
+        level = [task_id for task_id, count in waiting.items() if count == 0]
+        while level:
+            levels.append([tasks_by_id[task_id] for task_id in level])
+            next_level = []
+            for task_id in level:
+                for dependent_id in dependents[task_id]:
+                    waiting[dependent_id] -= 1
+                    if waiting[dependent_id] == 0:
+                        next_level.append(dependent_id)
+            level = next_level
+        if sum(len(level) for level in levels) < len(tasks_by_id):
+            raise CycleError("Dependencies of the tasks have a cycle")
+        return levels
+
+    def get_nodes(self) -> List[Dict[str, Any]]:
+        """
+        Get the tasks with their dependencies to store
+        :return:
+        """
+        return [
+            {
+                "_id": task.id,
+                "collection": task.get_collection_name(),
+                "dependencies": [
+                    {
+                        "any_of": dependency_type == DependencyType.ANY_OF,
+                        "ids": ids,
+                    }
+                    for dependency_type, ids in task.get_dependencies()
+                    if ids
+                ],
+            }
+            for task in self.tasks
+        ]
+
+    async def push(self) -> List[TaskHandle]:
+        """
+        Push the tasks in the topological order,
+        with one bulk insert per level and task class.
+        If a task fails, the tasks of the graph which can not run
+        anymore are cancelled.
+        :return: Handles of the tasks in the order they were added
+        """
+        if not self.tasks:
+            return []
+        levels = self.get_levels()
+        dag_id = PydanticObjectId()
+        for task in self.tasks:
+            task.dag_id = dag_id
+        task_model = type(self.tasks[0])
+        backend = task_model.get_backend()
+        await backend.save_dag(task_model, dag_id, self.get_nodes())
+
+        handles: Dict[int, TaskHandle] = {}
+        deduplicated = False
+        for level in levels:
+            tasks_by_model: Dict[Type[Task], List[Task]] = {}
+            for task in level:
+                tasks_by_model.setdefault(type(task), []).append(task)
+            for model, tasks in tasks_by_model.items():
+                for task, handle in zip(tasks, await model.push_many(tasks)):
+                    if handle.id != task.id:
+                        # the task was enqueued already by the dedup key,
+                        # so the dependents link to the enqueued one
+                        task.id = handle.id
+                        deduplicated = True
+                    handles[id(task)] = handle
+        if deduplicated:
+            await backend.save_dag(task_model, dag_id, self.get_nodes())
+        return [handles[id(task)] for task in self.tasks]
+
+
+def find_unreachable(
+    nodes: List[Mapping[str, Any]], failed_ids: Collection[Any]
+) -> List[Mapping[str, Any]]:
+    """
+    Find the tasks of the DAG which can not run anymore
+    :param nodes: Tasks of the DAG with their dependencies
+    :param failed_ids: Ids of the failed tasks
+    :return: Nodes of the tasks which depend on the failed ones
+    """
+    dead = set(failed_ids)
+    dependents: Dict[Any, List[Mapping[str, Any]]] = defaultdict(list)
+    for node in nodes:
+        for dependency in node["dependencies"]:
+            for dependency_id in dependency["ids"]:
+                dependents[dependency_id].append(node)
+
+    unreachable = []
+    stack = list(dead)
+    while stack:
+        for node in dependents[stack.pop()]:
+            if node["_id"] not in dead and is_unreachable(node, dead):
+                dead.add(node["_id"])
+                unreachable.append(node)
+                stack.append(node["_id"])
+    return unreachable
+
+
+def is_unreachable(node: Mapping[str, Any], dead: Collection[Any]) -> bool:
+    for dependency in node["dependencies"]:
+        ids = dependency["ids"]
+        if dependency["any_of"]:
+            if all(dependency_id in dead for dependency_id in ids):
+                return True
+        elif any(dependency_id in dead for dependency_id in ids):
+            return True
+    return False
@@ -0,0 +1,291 @@
+import asyncio
+from datetime import datetime
+from enum import Enum
+from typing import TYPE_CHECKING, Any, List, Optional, Set, Type
+
+from pymongo import ASCENDING, DESCENDING
+from pymongo.errors import DuplicateKeyError
+
+if TYPE_CHECKING:
+    from beanie_batteries_queue.task import Task
+
+
+class OverflowPolicy(str, Enum):
+    # wait with backoff until the workers claim enough tasks
+    BLOCK = "BLOCK"
+    # raise QueueFull
+    RAISE = "RAISE"
+    # cancel the lowest priority waiting task if it has a lower priority
+    # than the pushed one, otherwise cancel the pushed task
+    DROP_LOWEST = "DROP_LOWEST"
+
+
+class QueueFull(Exception):
+    pass
+
+
+class MaxDepth:
+    def __init__(
+        self,
+        depth: int,
+        overflow: OverflowPolicy = OverflowPolicy.BLOCK,
+        block_timeout: Optional[float] = None,
+        backoff: float = 0.01,
+        multiplier: float = 2.0,
+        max_backoff: float = 1.0,
+        sync_interval: float = 60.0,
+        collection_name: str = "task_depths",
+        evict_candidates: int = 10,
+    ):
+        """
+        Initialize the MaxDepth.
+        Max number of the tasks waiting in the queue, shared by all
+        the processes through a counter document in MongoDB. The counter
+        is incremented on push and decremented on claim, so the push
+        needs no count scan.
+
+        :param depth: Max number of the created tasks
+        :param overflow: What to do when the queue is full
+        :param block_timeout: Max seconds to block for, then QueueFull
+            is raised. Block forever if None
+        :param backoff: Seconds to wait before the first retry of the push
+        :param multiplier: Factor to multiply the wait time by on each retry
+        :param max_backoff: Max seconds to wait before a retry
+        :param sync_interval: Min seconds between the recounts of
+            the created tasks when the queue looks full. The recount fixes
+            the counter after the tasks were removed by the TTL index
+            or a process crashed between the write and the counter update
+        :param collection_name: Collection to store the counters in
+        :param evict_candidates: Max number of the lowest priority tasks
+            checked for the dependents by the DROP_LOWEST policy
+        """
+        self.depth = depth
+        self.overflow = overflow
+        self.block_timeout = block_timeout
+        self.backoff = backoff
+        self.multiplier = multiplier
+        self.max_backoff = max_backoff
+        self.sync_interval = sync_interval
+        self.collection_name = collection_name
+        self.evict_candidates = evict_candidates
+
+    def get_collection(self, task_model: Type["Task"]):
+        return task_model.get_motor_collection().database[self.collection_name]
+
+    async def admit(self, task_model: Type["Task"], tasks: List["Task"]):
+        """
+        Reserve the places in the queue for the tasks to push
+        :param task_model: Task model class
+        :param tasks: Tasks to push
+        :return: Tasks to push, without the ones cancelled
+            by the DROP_LOWEST policy
+        :raises QueueFull: if the queue is full and the policy is RAISE,
+            or the block timeout is over
+        """
+        if len(tasks) > self.depth:
+            raise QueueFull(
+                f"{len(tasks)} tasks do not fit in the queue "
+                f"of max depth {self.depth}"
+            )
+        loop = asyncio.get_running_loop()
+        started_at = loop.time()
+        delay = self.backoff
+        while not await self.reserve(task_model, len(tasks)):
+            task_model.get_stats().increment("overflows")
+            if self.overflow == OverflowPolicy.RAISE:
+                raise QueueFull(f"Queue is full, max depth {self.depth}")
+            if self.overflow == OverflowPolicy.DROP_LOWEST:
+                return await self.drop_lowest(task_model, tasks)
+            if (
+                self.block_timeout is not None
+                and loop.time() - started_at + delay > self.block_timeout
+            ):
+                raise QueueFull(
+                    f"Queue is still full after {self.block_timeout} seconds"
+                )
+            await asyncio.sleep(delay)
+            delay = min(self.max_backoff, delay * self.multiplier)
+        return tasks
+
+    async def reserve(self, task_model: Type["Task"], count: int) -> bool:
+        """
+        Increment the counter if the tasks fit in the queue.
+        Recounts the created tasks if the counter says the queue is full
+        and was not recounted for sync_interval seconds
+
+        :param task_model: Task model class
+        :param count: Number of the tasks to push
+        :return: True if the places are reserved
+        """
+        collection = self.get_collection(task_model)
+        query = {
+            "_id": task_model.get_collection_name(),
+            "depth": {"$lte": self.depth - count},
+        }
+        update = {"$inc": {"depth": count}}
+        if await collection.find_one_and_update(query, update) is not None:
+            return True
+        counter = await collection.find_one(
+            {"_id": task_model.get_collection_name()}
+        )
+        if (
+            counter is not None
+            and (datetime.utcnow() - counter["synced_at"]).total_seconds()
+            < self.sync_interval
+        ):
+            return False
+        await self.sync(task_model)
+        return await collection.find_one_and_update(query, update) is not None
+
+    async def sync(self, task_model: Type["Task"]):
+        """
+        Set the counter to the number of the created tasks
+
+        :param task_model: Task model class
+        """
+        # imported here, as the task module depends on this one
+        from beanie_batteries_queue.task import State
+
+        depth = await task_model.count_tasks(State.CREATED)
+        try:
+            await self.get_collection(task_model).update_one(
+                {"_id": task_model.get_collection_name()},
+                {"$set": {"depth": depth, "synced_at": datetime.utcnow()}},
+                upsert=True,
+            )
+        except DuplicateKeyError:
+            # the counter was created by another process at the same moment
+            pass
+
+    async def add(
+        self,
+        task_model: Type["Task"],
+        count: int,
+        collection_name: Optional[str] = None,
+    ):
+        """
+        Change the counter without the depth check, when the tasks
+        leave the queue or are put back to it
+
+        :param task_model: Task model class of the database
+        :param count: Number of the tasks, negative if they left
+        :param collection_name: Collection of the tasks.
+            Collection of the task model if None
+        """
+        if count == 0:
+            return
+        await self.get_collection(task_model).update_one(
+            {"_id": collection_name or task_model.get_collection_name()},
+            [{"$set": {"depth": {"$max": [0, {"$add": ["$depth", count]}]}}}],
+        )
+
+    async def drop_lowest(
+        self, task_model: Type["Task"], tasks: List["Task"]
+    ) -> List["Task"]:
+        """
+        Make place for the tasks by cancelling the lowest priority
+        waiting tasks. The tasks which have no lower priority tasks
+        to replace are cancelled instead
+
+        :param task_model: Task model class
+        :param tasks: Tasks to push
+        :return: Tasks to push
+        """
+        # imported here, as the task module depends on this one
+        from beanie_batteries_queue.task import State
+
+        admitted = set()
+        for task in sorted(tasks, key=lambda task: -task.priority):
+            if await self.reserve(task_model, 1) or await self.evict(
+                task_model, task.priority
+            ):
+                admitted.add(id(task))
+                continue
+            if task.dag_id is not None:
+                # the other tasks of the DAG would wait for it forever,
+                # so it is admitted over the max depth
+                await self.add(task_model, 1)
+                admitted.add(id(task))
+                continue
+            task.state = State.CANCELLED
+            task.active_dedup_key = None
+            await task.save()
+            task_model.get_stats().increment("drops")
+        return [task for task in tasks if id(task) in admitted]
+
+    async def evict(self, task_model: Type["Task"], priority: int) -> bool:
+        """
+        Cancel the newest of the lowest priority waiting tasks,
+        if its priority is lower than the given one. Its place in the queue
+        is taken by the pushed task, so the counter is not changed.
+        The tasks of DAGs and the tasks other tasks wait for are kept
+
+        :param task_model: Task model class
+        :param priority: Priority of the pushed task
+        :return: True if a task was cancelled
+        """
+        # imported here, as the task module depends on this one
+        from beanie_batteries_queue.task import State
+
+        collection = task_model.get_motor_collection()
+        query = {
+            "state": State.CREATED.value,
+            "priority": {"$lt": priority},
+            # the other tasks of a DAG would wait for it forever
+            "dag_id": None,
+        }
+        candidates = await collection.find(
+            query,
+            projection={"_id": 1},
+            sort=[("priority", ASCENDING), ("created_at", DESCENDING)],
+            limit=self.evict_candidates,
+        ).to_list(length=self.evict_candidates)
+        awaited = await self.find_awaited(
+            task_model, [candidate["_id"] for candidate in candidates]
+        )
+        for candidate in candidates:
+            if candidate["_id"] in awaited:
+                continue
+            evicted = await collection.find_one_and_update(
+                {**query, "_id": candidate["_id"]},
+                {
+                    "$set": {
+                        "state": State.CANCELLED.value,
+                        "active_dedup_key": None,
+                    }
+                },
+                projection={"_id": 1},
+            )
+            if evicted is not None:
+                task_model.get_stats().increment("drops")
+                return True
+        return False
+
+    @staticmethod
+    async def find_awaited(
+        task_model: Type["Task"], task_ids: List[Any]
+    ) -> Set[Any]:
+        """
+        Find the tasks which waiting tasks depend on
+
+        :param task_model: Task model class
+        :param task_ids: Ids of the tasks
+        :return: Ids of the tasks with waiting dependents
+        """
+        # imported here, as the task module depends on this one
+        from beanie_batteries_queue.task import State
+
+        awaited: Set[Any] = set()
+        if not task_ids:
+            return awaited
+        for model in task_model.get_dependent_models():
+            for field in model._dependency_fields or {}:
+                referenced = await model.get_motor_collection().distinct(
+                    f"{field}.$id",
+                    {
+                        f"{field}.$id": {"$in": task_ids},
+                        "state": State.CREATED.value,
+                    },
+                )
+                awaited.update(referenced)
+        return awaited.intersection(task_ids)
@@ -0,0 +1,124 @@
+import hashlib
+import json
+from datetime import datetime, timedelta
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Tuple
+
+from beanie.odm.utils.encoder import Encoder
+from pymongo import ASCENDING
+
+if TYPE_CHECKING:
+    from beanie_batteries_queue.task import Task
+
+
+class Memoize:
+    def __init__(
+        self,
+        fields: List[str],
+        ttl: int = 3600,
+        max_entries: Optional[int] = 10000,
+        eviction_interval: int = 100,
+        collection_name: str = "task_results_cache",
+    ):
+        """
+        Initialize the Memoize.
+        Cache of the task results by the values of the input fields.
+
+        :param fields: Input fields the result depends on
+        :param ttl: Seconds to keep the result for
+        :param max_entries: Max number of results to keep per task class.
+            The oldest results are evicted
+        :param eviction_interval: Number of stored results
+            between the size checks
+        :param collection_name: Collection to store the results in
+        """
+        self.fields = fields
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.eviction_interval = eviction_interval
+        self.collection_name = collection_name
+        self.stored_since_eviction = 0
+        self.index_created = False
+
+    def get_collection(self, task: "Task"):
+        return task.get_motor_collection().database[self.collection_name]
+
+    def make_key(self, task: "Task") -> str:
+        """
+        Hash the values of the input fields of the task
+
+        :param task: Task to hash
+        :return: Cache key
+        """
+        values = {field: getattr(task, field) for field in self.fields}
+        content = json.dumps(values, sort_keys=True, default=str)
+        digest = hashlib.sha256(content.encode()).hexdigest()
+        return f"{task.get_collection_name()}:{digest}"
+
+    async def get(self, task: "Task", key: str) -> Tuple[bool, Any]:
+        """
+        Get the cached result
+
+        :param task: Task to get the result for
+        :param key: Cache key of the task
+        :return: Tuple of the hit flag and the result
+        """
+        cached = await self.get_collection(task).find_one(
+            {"_id": key, "expire_at": {"$gt": datetime.utcnow()}}
+        )
+        if cached is None:
+            return False, None
+        return True, cached["result"]
+
+    async def set(self, task: "Task", key: str, result: Any):
+        """
+        Store the result
+
+        :param task: Task the result belongs to
+        :param key: Cache key of the task
+        :param result: Result to store
+        """
+        collection = self.get_collection(task)
+        if not self.index_created:
+            await collection.create_index(
+                [("expire_at", ASCENDING)], expireAfterSeconds=0
+            )
+            await collection.create_index(
+                [("task_class", ASCENDING), ("created_at", ASCENDING)]
+            )
+            self.index_created = True
+        now = datetime.utcnow()
+        document: Dict[str, Any] = {
+            "task_class": task.get_collection_name(),
+            "result": Encoder().encode(result),
+            "created_at": now,
+            "expire_at": now + timedelta(seconds=self.ttl),
+        }
+        await collection.replace_one({"_id": key}, document, upsert=True)
+        self.stored_since_eviction += 1
+        if self.stored_since_eviction >= self.eviction_interval:
+            self.stored_since_eviction = 0
+            await self.evict(task)
+
+    async def evict(self, task: "Task"):
+        """
+        Delete the oldest results above the max number of entries
+
+        :param task: Task of the class to evict the results of
+        """
+        if self.max_entries is None:
+            return
+        collection = self.get_collection(task)
+        task_class = task.get_collection_name()
+        excess = (
+            await collection.count_documents({"task_class": task_class})
+            - self.max_entries
+        )
+        if excess <= 0:
+            return
+        oldest = (
+            collection.find({"task_class": task_class}, projection={"_id": 1})
+            .sort("created_at", ASCENDING)
+            .limit(excess)
+        )
+        ids = [document["_id"] async for document in oldest]
+        await collection.delete_many({"_id": {"$in": ids}})
@@ -0,0 +1,38 @@
+from typing import Any, Optional
+
+from pymongo.read_concern import ReadConcern
+from pymongo.write_concern import WriteConcern
+
+
+class OperationOptions:
+    def __init__(
+        self,
+        write_concern: Optional[WriteConcern] = None,
+        read_concern: Optional[ReadConcern] = None,
+        read_preference: Optional[Any] = None,
+    ):
+        """
+        Initialize the OperationOptions.
+        MongoDB options of a queue operation.
+        The options which are not set are taken from the client.
+
+        :param write_concern: Write concern of the writes
+        :param read_concern: Read concern of the reads
+        :param read_preference: Read preference of the reads,
+            for example pymongo.ReadPreference.SECONDARY_PREFERRED
+        """
+        self.write_concern = write_concern
+        self.read_concern = read_concern
+        self.read_preference = read_preference
+
+    def apply(self, collection):
+        """
+        Get the collection with the options
+        :param collection: Motor collection
+        :return: Motor collection
+        """
+        return collection.with_options(
+            write_concern=self.write_concern,
+            read_concern=self.read_concern,
+            read_preference=self.read_preference,
+        )
@@ -0,0 +1,48 @@
+from typing import List, Sequence
+
+
+class PartitionAssignment:
+    def __init__(self, slot: int, members: Sequence[int]):
+        """
+        Initialize the PartitionAssignment.
+
+        :param slot: Index of the worker slot this assignment belongs to
+        :param members: Shared flags, one per worker slot, set while the
+            worker of the slot is alive
+        """
+        self.slot = slot
+        self.members = members
+
+    def get_partitions(self, partition_count: int) -> List[int]:
+        """
+        Get the partitions owned by this slot.
+        Partitions are spread over the alive slots, so the result
+        changes as workers start or stop.
+
+        :param partition_count: Number of partitions of the task class
+        :return: List of partition numbers
+        """
+        active = [slot for slot, alive in enumerate(self.members[:]) if alive]
+        if self.slot not in active:
+            active.append(self.slot)
+            active.sort()
+        position = active.index(self.slot)
+        return [
+            partition
+            for partition in range(partition_count)
+            if partition % len(active) == position
+        ]
+
+    def get_other_partitions(self, partition_count: int) -> List[int]:
+        """
+        Get the partitions owned by other slots. Used for work stealing.
+
+        :param partition_count: Number of partitions of the task class
+        :return: List of partition numbers
+        """
+        own = set(self.get_partitions(partition_count))
+        return [
+            partition
+            for partition in range(partition_count)
+            if partition not in own
+        ]
@@ -1,11 +1,19 @@
 import asyncio
+import logging
+from contextlib import ExitStack
 from multiprocessing.synchronize import Event
-from typing import TYPE_CHECKING, Optional
+from typing import TYPE_CHECKING, Optional, List, Any, Awaitable
 from typing import Type
 
+from beanie_batteries_queue.partitioning import PartitionAssignment
+from beanie_batteries_queue.results import TaskTimeout
+from beanie_batteries_queue.wakeup import Wakeup
+
 if TYPE_CHECKING:
     from beanie_batteries_queue.task import Task
 
+logger = logging.getLogger(__name__)
+
 
 class Queue:
     def __init__(
@@ -13,6 +21,7 @@ class Queue:
         task_model: Type["Task"],
         sleep_time: int = 1,
         stop_event: Optional[Event] = None,
+        partition_assignment: Optional[PartitionAssignment] = None,
     ):
         """
         Initialize the Queue.
@@ -20,12 +29,15 @@ class Queue:
         :param task_model: Task model class
         :param sleep_time: Sleep time between iterations
         :param stop_event: Event to stop the queue
+        :param partition_assignment: Partitions to claim tasks from first
         """
         self.task_model = task_model
         self.sleep_time = sleep_time
         self.started = False
         self.running = False
         self.stop_event = stop_event
+        self.partition_assignment = partition_assignment
+        self.wakeup_event: Optional[asyncio.Event] = None
 
     def __aiter__(self):
         return self
@@ -34,20 +46,86 @@ class Queue:
         def check_exit():
             if self.started and not self.running:
                 self.started = False
+                self.unsubscribe()
                 raise StopAsyncIteration
             if self.stop_event and self.stop_event.is_set():
                 self.running = False
                 self.started = False
+                self.unsubscribe()
                 raise StopAsyncIteration
 
         check_exit()
-        task = await self.task_model.pop()
+        task = await self.claim()
         while task is None:
             check_exit()
-            await asyncio.sleep(self.sleep_time)
-            task = await self.task_model.pop()
+            await self.wait()
+            task = await self.claim()
         return task
 
+    async def wait(self):
+        """
+        Sleep until the next poll. Queues of the task classes with
+        dependencies are woken earlier, when the dependencies finish
+        """
+        if self.task_model._dependency_fields is None:
+            await asyncio.sleep(self.sleep_time)
+            return
+        if self.wakeup_event is None:
+            self.wakeup_event = Wakeup.get().subscribe(self.task_model)
+        try:
+            await asyncio.wait_for(
+                self.wakeup_event.wait(), timeout=self.sleep_time
+            )
+        except asyncio.TimeoutError:
+            pass
+        self.wakeup_event.clear()
+
+    def unsubscribe(self):
+        if self.wakeup_event is not None:
+            Wakeup.get().unsubscribe(self.task_model, self.wakeup_event)
+            self.wakeup_event = None
+
+    async def claim(self) -> Optional["Task"]:
+        """
+        Claim a task from the own partitions
+        or steal it from the partitions of the other workers
+        """
+        partition_count = self.task_model.partition_count
+        if self.partition_assignment is None or partition_count <= 1:
+            return await self.task_model.pop()
+        partitions = self.partition_assignment.get_partitions(partition_count)
+        if partitions:
+            task = await self.task_model.pop(partitions=partitions)
+            if task is not None:
+                return task
+        other_partitions = self.partition_assignment.get_other_partitions(
+            partition_count
+        )
+        if not other_partitions:
+            return None
+        return await self.task_model.pop(partitions=other_partitions)
+
+    async def claim_many(self, limit: int) -> List["Task"]:
+        """
+        Claim up to limit tasks with batch claims, from the own partitions
+        first and then from the partitions of the other workers
+        """
+        partition_count = self.task_model.partition_count
+        if self.partition_assignment is None or partition_count <= 1:
+            return await self.task_model.pop_many(limit)
+        tasks: List["Task"] = []
+        partitions = self.partition_assignment.get_partitions(partition_count)
+        if partitions:
+            tasks = await self.task_model.pop_many(limit, partitions)
+        other_partitions = self.partition_assignment.get_other_partitions(
+            partition_count
+        )
+        if len(tasks) < limit and other_partitions:
+            tasks += await self.task_model.pop_many(
+                limit - len(tasks), other_partitions
+            )
+        return tasks
+
     async def start(self):
         """
         Run task
@@ -56,12 +134,151 @@ class Queue:
             raise RuntimeError("Queue is already started")
         self.started = True
         self.running = True
+        stats = self.task_model.get_stats()
         async for task in self:
+            if self.task_model.is_batched():
+                tasks = await self.claim_batch(task)
+                await self.run_batch(tasks)
+                stats.increment("processed", len(tasks))
+            else:
+                await self.run_task(task)
+                stats.increment("processed")
+
+    async def run_task(self, task: "Task"):
+        """
+        Run the task and mark it as finished or failed.
+        Memoized task classes reuse the cached result instead of running.
+        """
+        memoize = self.task_model.memoize
+        stats = self.task_model.get_stats()
+        try:
+            if memoize is not None:
+                key = memoize.make_key(task)
+                hit, result = await memoize.get(task, key)
+                if hit:
+                    stats.increment("memoize_hits")
+                    await task.finish(result)
+                    return
+                stats.increment("memoize_misses")
+            if self.task_model.tracer is None:
+                result = await self.run_with_timeout(
+                    task.run(),
+                    task.get_timeout(),
+                    self.task_model.cancel_grace,
+                )
+            else:
+                with self.task_model.tracer.start_span(
+                    "run", task.traceparent, task.get_trace_attributes()
+                ):
+                    result = await self.run_with_timeout(
+                        task.run(),
+                        task.get_timeout(),
+                        self.task_model.cancel_grace,
+                    )
+            await task.finish(result)
+        except Exception as e:
+            if isinstance(e, TaskTimeout):
+                stats.increment("timeouts")
+            await task.fail(e)
+            return
+        if memoize is not None:
             try:
-                await task.run()
-                await task.finish()
+                await memoize.set(task, key, result)
             except Exception:
-                await task.fail()
+                logger.exception("Failed to store the memoized result")
+
+    async def claim_batch(self, first_task: "Task") -> List["Task"]:
+        """
+        Claim tasks until the batch is full or the batch wait time is over
+        """
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.task_model.batch_wait
+        tasks = [first_task]
+        while len(tasks) < self.task_model.batch_size:
+            claimed = await self.claim_many(
+                self.task_model.batch_size - len(tasks)
+            )
+            if claimed:
+                tasks += claimed
+                continue
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                break
+            await asyncio.sleep(min(remaining, self.sleep_time))
+        return tasks
+
+    async def run_batch(self, tasks: List["Task"]):
+        """
+        Run the batch handler of the task class and record the results.
+        The handler returns the results in the order of the tasks.
+        Exception instances in the results mark the tasks as failed.
+        """
+        results: List[Any]
+        try:
+            with ExitStack() as spans:
+                tracer = self.task_model.tracer
+                if tracer is not None:
+                    # a run span in the trace of every task of the batch
+                    for task in tasks:
+                        attributes = task.get_trace_attributes()
+                        attributes["task.batch_size"] = len(tasks)
+                        spans.enter_context(
+                            tracer.start_span(
+                                "run", task.traceparent, attributes
+                            )
+                        )
+                results = await self.run_with_timeout(
+                    self.task_model.run_batch(tasks),  # type: ignore
+                    self.task_model.run_timeout,
+                    self.task_model.cancel_grace,
+                )
+            if results is None:
+                results = [None] * len(tasks)
+            elif len(results) != len(tasks):
+                raise ValueError(
+                    "run_batch must return a result for every task"
+                )
+        except Exception as e:
+            results = [e] * len(tasks)
+        await self.task_model.record_batch(tasks, results)
+
+    @staticmethod
+    async def run_with_timeout(
+        coroutine: Awaitable[Any],
+        timeout: Optional[float],
+        grace: float = 1.0,
+    ) -> Any:
+        """
+        Await the coroutine, cancelling it after the timeout
+        :param coroutine: Run of the task
+        :param timeout: Seconds to wait. No limit if None
+        :param grace: Seconds to wait for the cancelled coroutine to stop.
+            It is abandoned after that
+        :return: Result of the coroutine
+        :raises TaskTimeout: if the coroutine did not finish in time
+        """
+        if timeout is None:
+            return await coroutine
+        future = asyncio.ensure_future(coroutine)
+        try:
+            done, _ = await asyncio.wait({future}, timeout=timeout)
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        if not done:
+            future.cancel()
+            done, _ = await asyncio.wait({future}, timeout=grace)
+            if not done:
+                logger.warning(
+                    f"Task run did not stop {grace} seconds after "
+                    f"it was cancelled, abandoning it"
+                )
+            # retrieve the error, so it is not reported as unhandled
+            future.add_done_callback(
+                lambda future: future.cancelled() or future.exception()
+            )
+            raise TaskTimeout(timeout)
+        return future.result()
 
     def stop(self):
         """
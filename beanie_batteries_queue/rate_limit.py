@@ -0,0 +1,120 @@
+import math
+from typing import TYPE_CHECKING, Dict, Optional, Type
+
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
+
+if TYPE_CHECKING:
+    from beanie_batteries_queue.task import Task
+
+
+class RateLimit:
+    def __init__(
+        self,
+        rate: float,
+        burst: Optional[int] = None,
+        prefetch: Optional[int] = None,
+        collection_name: str = "task_rate_limits",
+    ):
+        """
+        Initialize the RateLimit.
+        Token bucket shared by all the processes through MongoDB.
+
+        :param rate: Tasks per second
+        :param burst: Max number of tokens the bucket can accumulate.
+            Defaults to one second of the rate
+        :param prefetch: Number of tokens to take from the shared bucket
+            at once and keep in the process. Defaults to burst.
+            Set to 1 to go to the shared bucket for every task
+        :param collection_name: Collection to store the buckets in
+        """
+        self.rate = rate
+        self.burst = burst if burst is not None else max(1, math.ceil(rate))
+        self.prefetch = (
+            min(prefetch, self.burst) if prefetch is not None else self.burst
+        )
+        self.collection_name = collection_name
+        self.local_tokens: Dict[str, int] = {}
+
+    async def reserve(self, task_model: Type["Task"]) -> bool:
+        """
+        Check if there is a token to claim a task with.
+        Takes tokens from the shared bucket if the local ones are spent.
+
+        :param task_model: Task model class
+        :return: True if a task can be claimed
+        """
+        bucket = task_model.get_collection_name()
+        if self.local_tokens.get(bucket, 0) > 0:
+            return True
+        self.local_tokens[bucket] = await self.take_tokens(task_model)
+        return self.local_tokens[bucket] > 0
+
+    def consume(self, task_model: Type["Task"]):
+        """
+        Spend the token reserved for a claimed task
+
+        :param task_model: Task model class
+        """
+        bucket = task_model.get_collection_name()
+        self.local_tokens[bucket] = max(
+            0, self.local_tokens.get(bucket, 0) - 1
+        )
+
+    async def take_tokens(self, task_model: Type["Task"]) -> int:
+        """
+        Refill the shared bucket by the time passed and take
+        up to prefetch tokens from it in one atomic update
+
+        :param task_model: Task model class
+        :return: Number of taken tokens
+        """
+        collection = task_model.get_motor_collection().database[
+            self.collection_name
+        ]
+        elapsed = {
+            "$divide": [
+                {
+                    "$subtract": [
+                        "$$NOW",
+                        {"$ifNull": ["$updated_at", "$$NOW"]},
+                    ]
+                },
+                1000,
+            ]
+        }
+        tokens = {
+            "$min": [
+                self.burst,
+                {
+                    "$add": [
+                        {"$ifNull": ["$tokens", self.burst]},
+                        {"$multiply": [elapsed, self.rate]},
+                    ]
+                },
+            ]
+        }
+        pipeline = [
+            {"$set": {"tokens": tokens, "updated_at": "$$NOW"}},
+            {
+                "$set": {
+                    "taken": {"$min": [self.prefetch, {"$floor": "$tokens"}]}
+                }
+            },
+            {"$set": {"tokens": {"$subtract": ["$tokens", "$taken"]}}},
+        ]
+        try:
+            bucket = await collection.find_one_and_update(
+                {"_id": task_model.get_collection_name()},
+                pipeline,
+                upsert=True,
+                return_document=ReturnDocument.AFTER,
+            )
+        except DuplicateKeyError:
+            # the bucket was created by another process at the same moment
+            bucket = await collection.find_one_and_update(
+                {"_id": task_model.get_collection_name()},
+                pipeline,
+                return_document=ReturnDocument.AFTER,
+            )
+        return int(bucket["taken"])
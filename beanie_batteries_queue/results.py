@@ -0,0 +1,209 @@
+import asyncio
+import logging
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    ClassVar,
+    Dict,
+    List,
+    Mapping,
+    Optional,
+    Set,
+    Type,
+)
+from weakref import WeakKeyDictionary
+
+from beanie import PydanticObjectId
+from pymongo.errors import OperationFailure, PyMongoError
+
+if TYPE_CHECKING:
+    from beanie_batteries_queue.task import Task
+
+logger = logging.getLogger(__name__)
+
+
+class TaskFailed(Exception):
+    def __init__(self, task_id: PydanticObjectId, state: str):
+        super().__init__(f"Task {task_id} is {state}")
+        self.task_id = task_id
+        self.state = state
+
+
+class TaskTimeout(Exception):
+    def __init__(self, timeout: float):
+        super().__init__(f"Task did not finish in {timeout} seconds")
+        self.timeout = timeout
+
+
+class ResultWatcher:
+    # one watcher per event loop and task collection
+    _watchers: ClassVar[
+        "WeakKeyDictionary[asyncio.AbstractEventLoop, Dict[str, ResultWatcher]]"
+    ] = WeakKeyDictionary()
+
+    def __init__(
+        self,
+        task_model: Type["Task"],
+        min_poll_interval: float = 0.05,
+        max_poll_interval: float = 1.0,
+    ):
+        """
+        Initialize the ResultWatcher.
+        Waits for the tasks of a collection to be done, using one change
+        stream for all the waiters or polling if change streams are not
+        supported.
+
+        :param task_model: Task model class
+        :param min_poll_interval: First interval of the polling backoff
+        :param max_poll_interval: Max interval of the polling backoff
+        """
+        self.task_model = task_model
+        self.min_poll_interval = min_poll_interval
+        self.max_poll_interval = max_poll_interval
+        self.futures: Dict[Any, Set[asyncio.Future]] = {}
+        self.runner: Optional[asyncio.Task] = None
+        self.change_streams_supported = (
+            task_model.get_backend().supports_change_streams
+        )
+
+    @classmethod
+    def get(cls, task_model: Type["Task"]) -> "ResultWatcher":
+        """
+        Get the watcher of the task model for the running event loop
+
+        :param task_model: Task model class
+        :return: ResultWatcher
+        """
+        watchers = cls._watchers.setdefault(asyncio.get_running_loop(), {})
+        name = task_model.get_collection_name()
+        if name not in watchers:
+            watchers[name] = cls(task_model)
+        return watchers[name]
+
+    async def wait(self, task_id: Any) -> Mapping[str, Any]:
+        """
+        Wait for the task to be done
+
+        :param task_id: Id of the task
+        :return: Task document with the state and the result
+        """
+        future = asyncio.get_running_loop().create_future()
+        self.futures.setdefault(task_id, set()).add(future)
+        started = self.runner is not None and not self.runner.done()
+        if not started:
+            self.runner = asyncio.create_task(self.run())
+        try:
+            if started:
+                # the running watcher checked the pending tasks before
+                # this one was added, it could be done already
+                await self.check_pending([task_id])
+            return await future
+        finally:
+            futures = self.futures.get(task_id)
+            if futures is not None:
+                futures.discard(future)
+                if not futures:
+                    del self.futures[task_id]
+
+    async def run(self):
+        # waiters can be added while the stream or the polling is closing,
+        # after the loop over the waiters ended
+        while self.futures:
+            if self.change_streams_supported:
+                try:
+                    await self.watch()
+                    continue
+                except OperationFailure:
+                    logger.debug(
+                        "Change streams are not supported, polling instead",
+                        exc_info=True,
+                    )
+                    self.change_streams_supported = False
+                except PyMongoError:
+                    logger.warning(
+                        "Change stream failed, polling instead", exc_info=True
+                    )
+            await self.poll()
+
+    async def watch(self):
+        collection = self.task_model.get_motor_collection()
+        pipeline = [
+            {
+                "$match": {
+                    "operationType": {"$in": ["update", "replace"]},
+                    "fullDocument.state": {
+                        "$in": self.task_model.get_done_states()
+                    },
+                }
+            }
+        ]
+        async with collection.watch(
+            pipeline, full_document="updateLookup", max_await_time_ms=500
+        ) as stream:
+            # tasks could be done before the stream was opened
+            await self.check_pending()
+            while self.futures:
+                change = await stream.try_next()
+                if change is not None:
+                    self.resolve(change["fullDocument"])
+
+    async def poll(self):
+        interval = self.min_poll_interval
+        while self.futures:
+            if await self.check_pending():
+                interval = self.min_poll_interval
+            else:
+                interval = min(interval * 2, self.max_poll_interval)
+            await asyncio.sleep(interval)
+
+    async def check_pending(
+        self, task_ids: Optional[List[Any]] = None
+    ) -> bool:
+        """
+        Resolve the waiters of the tasks which are done already
+
+        :param task_ids: Ids of the tasks to check. All the waited ones
+            if None
+        :return: True if any task was done
+        """
+        if task_ids is None:
+            task_ids = list(self.futures)
+        documents = await self.task_model.find_done_documents(task_ids)
+        for document in documents:
+            self.resolve(document)
+        return len(documents) > 0
+
+    def resolve(self, document: Mapping[str, Any]):
+        for future in self.futures.get(document["_id"], set()):
+            if not future.done():
+                future.set_result(document)
+
+
+class TaskHandle:
+    def __init__(self, task_model: Type["Task"], task_id: PydanticObjectId):
+        """
+        Initialize the TaskHandle.
+
+        :param task_model: Task model class
+        :param task_id: Id of the pushed task
+        """
+        self.task_model = task_model
+        self.id = task_id
+
+    async def result(self, timeout: Optional[float] = None) -> Any:
+        """
+        Wait for the task to be done and get its result
+
+        :param timeout: Seconds to wait. Wait forever if None
+        :return: Result of the task
+        :raises TaskFailed: if the task was not finished successfully
+        :raises asyncio.TimeoutError: if the task is not done in time
+        """
+        watcher = ResultWatcher.get(self.task_model)
+        document = await asyncio.wait_for(watcher.wait(self.id), timeout)
+        if not self.task_model.is_successful_state(document["state"]):
+            raise TaskFailed(self.id, document["state"])
+        return document.get("result")
+
+    def __repr__(self):
+        return f"TaskHandle({self.task_model.__name__}, {self.id})"
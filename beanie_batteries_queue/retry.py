@@ -0,0 +1,49 @@
+from typing import Tuple, Type
+
+
+class RetryPolicy:
+    def __init__(
+        self,
+        max_attempts: int = 3,
+        backoff: float = 1.0,
+        multiplier: float = 2.0,
+        max_backoff: float = 300.0,
+        retry_on: Tuple[Type[BaseException], ...] = (Exception,),
+    ):
+        """
+        Initialize the RetryPolicy.
+
+        :param max_attempts: Max number of runs of a task, including the first
+        :param backoff: Seconds to wait before the first retry
+        :param multiplier: Factor to multiply the wait time by on each retry
+        :param max_backoff: Max seconds to wait before a retry
+        :param retry_on: Exception types to retry on
+        """
+        self.max_attempts = max_attempts
+        self.backoff = backoff
+        self.multiplier = multiplier
+        self.max_backoff = max_backoff
+        self.retry_on = retry_on
+
+    def should_retry(self, attempts: int, error: BaseException) -> bool:
+        """
+        Check if the task should be run again
+
+        :param attempts: Number of the failed runs of the task
+        :param error: Error of the last run
+        :return: True if the task should be retried
+        """
+        return attempts < self.max_attempts and isinstance(
+            error, self.retry_on
+        )
+
+    def get_delay(self, attempts: int) -> float:
+        """
+        Get the seconds to wait before the next run
+
+        :param attempts: Number of the failed runs of the task
+        :return: Delay in seconds
+        """
+        return min(
+            self.max_backoff, self.backoff * self.multiplier ** (attempts - 1)
+        )
@@ -1,14 +1,21 @@
 import asyncio
 import logging
 import multiprocessing
+import os
 from multiprocessing import Process
 from multiprocessing.synchronize import Event
-from time import sleep
-from typing import List, Type
+from time import monotonic, sleep
+from typing import Any, Dict, List, Type, Optional
 
+from beanie_batteries_queue.partitioning import PartitionAssignment
 from beanie_batteries_queue.task import Task
 from beanie_batteries_queue.worker import Worker
 
+try:
+    import uvloop
+except ImportError:  # pragma: no cover
+    uvloop = None  # type: ignore
+
 logger = logging.getLogger(__name__)
 
 
@@ -18,6 +25,13 @@ class Runner:
         task_classes: List[Type[Task]],
         worker_count: int = 1,
         sleep_time: int = 1,
+        restart: bool = False,
+        restart_backoff: float = 1.0,
+        restart_multiplier: float = 2.0,
+        max_restart_backoff: float = 60.0,
+        pin_cpus: bool = False,
+        use_uvloop: bool = False,
+        report_interval: Optional[float] = None,
     ):
         """
         Initialize the Runner.
@@ -25,12 +39,48 @@ class Runner:
         :param task_classes: List of Task classes to run tasks from.
         :param worker_count: Number of concurrent workers.
         :param sleep_time: Time to sleep between iterations.
+        :param restart: Restart the worker processes which died
+            without being stopped.
+        :param restart_backoff: Seconds to wait before the first restart
+            of a worker.
+        :param restart_multiplier: Factor to multiply the wait time by
+            on each restart of a worker which crashed again.
+        :param max_restart_backoff: Max seconds to wait before a restart.
+            A worker which ran for longer is restarted after
+            restart_backoff again.
+        :param pin_cpus: Pin each worker process to its own CPU core.
+        :param use_uvloop: Run the workers on the uvloop event loop.
+        :param report_interval: Seconds between the logged reports
+            of the workers. Not logged if None.
         """
+        if use_uvloop and uvloop is None:
+            raise ImportError("uvloop is required for use_uvloop")
         self.task_classes = task_classes
         self.worker_count = worker_count
         self.sleep_time = sleep_time
+        self.restart = restart
+        self.restart_backoff = restart_backoff
+        self.restart_multiplier = restart_multiplier
+        self.max_restart_backoff = max_restart_backoff
+        self.pin_cpus = pin_cpus
+        self.use_uvloop = use_uvloop
+        self.report_interval = report_interval
         self.processes: List[Process] = []
         self.stop_events: List[Event] = []
+        # alive flags of the worker slots, shared with the workers
+        # to rebalance the partitions when workers start or stop
+        self.members = multiprocessing.Array("b", worker_count)
+        # numbers of the tasks processed by the workers of the slots,
+        # updated by the workers
+        self.processed = multiprocessing.Array("q", worker_count)
+        self.restarts = [0] * worker_count
+        self.started_at = [0.0] * worker_count
+        self.restart_at: List[Optional[float]] = [None] * worker_count
+        self.restart_delays = [restart_backoff] * worker_count
+        self.reported_at = monotonic()
+        self.reported_processed = [0] * worker_count
+        # set while every worker waits for its restart
+        self.all_dead = False
 
     def start(self, run_indefinitely: bool = True):
         """
@@ -38,44 +88,162 @@ class Runner:
 
         :param run_indefinitely: Run the runner while all tasks are alive.
         """
-        for _ in range(self.worker_count):
-            stop_event = multiprocessing.Event()
-            process = multiprocessing.Process(
-                target=self.run_worker, args=(stop_event,)
-            )
-            process.start()
-            logger.info(f"Started worker process {process.pid}")
-            self.processes.append(process)
-            self.stop_events.append(stop_event)
+        for slot in range(self.worker_count):
+            self.stop_events.append(multiprocessing.Event())
+            self.processes.append(self.start_worker(slot))
+        self.reported_at = monotonic()
         if run_indefinitely:
             self.infinite_status_check()
 
+    def start_worker(self, slot: int) -> Process:
+        """
+        Start the worker process of the slot.
+
+        :param slot: Index of the worker slot.
+        :return: Started process.
+        """
+        self.members[slot] = 1
+        process = multiprocessing.Process(
+            target=self.run_worker,
+            args=(
+                self.stop_events[slot],
+                PartitionAssignment(slot, self.members),
+            ),
+        )
+        process.start()
+        self.started_at[slot] = monotonic()
+        logger.info(f"Started worker process {process.pid}")
+        return process
+
     def check_status(self):
         """
         Check the status of the task runner.
+        Restarts the dead workers if restart is set.
+        """
+        for slot, process in enumerate(self.processes):
+            alive = process.is_alive()
+            if (
+                not alive
+                and self.restart
+                and not self.stop_events[slot].is_set()
+            ):
+                alive = self.restart_worker(slot)
+            self.members[slot] = alive
+        alive = any(self.members[:])
+        if not self.restart:
+            return alive
+        stopped = all(event.is_set() for event in self.stop_events)
+        if not alive and not stopped and not self.all_dead:
+            logger.error("All the workers are dead, waiting to restart them")
+        self.all_dead = not alive and not stopped
+        # the runner is alive while its workers are not stopped
+        return not stopped
+
+    def restart_worker(self, slot: int) -> bool:
         """
-        return any([process.is_alive() for process in self.processes])
+        Schedule the restart of the dead worker of the slot,
+        or restart it if its backoff is over.
+
+        :param slot: Index of the worker slot.
+        :return: True if the worker was restarted.
+        """
+        now = monotonic()
+        process = self.processes[slot]
+        restart_at = self.restart_at[slot]
+        if restart_at is None:
+            if now - self.started_at[slot] > self.max_restart_backoff:
+                # the worker did not crash in a loop
+                self.restart_delays[slot] = self.restart_backoff
+            delay = self.restart_delays[slot]
+            logger.warning(
+                f"Worker process {process.pid} exited with code "
+                f"{process.exitcode}, restarting in {delay} seconds"
+            )
+            self.restart_at[slot] = now + delay
+            return False
+        if now < restart_at:
+            return False
+        process.join()
+        self.restart_at[slot] = None
+        self.restart_delays[slot] = min(
+            self.max_restart_backoff,
+            self.restart_delays[slot] * self.restart_multiplier,
+        )
+        self.restarts[slot] += 1
+        self.processes[slot] = self.start_worker(slot)
+        return True
 
     def infinite_status_check(self):
         """
         Check the status of the task runner.
         """
+        reported_at = monotonic()
         while True:
             try:
                 status = self.check_status()
                 if not status:
                     break
+                if (
+                    self.report_interval is not None
+                    and monotonic() - reported_at >= self.report_interval
+                ):
+                    reported_at = monotonic()
+                    for worker in self.report():
+                        logger.info(f"Worker report: {worker}")
                 sleep(1)
             except KeyboardInterrupt:
                 logger.info("Keyboard interrupt detected")
                 self.stop()
                 break
 
-    def run_worker(self, stop_event):
+    def report(self) -> List[Dict[str, Any]]:
+        """
+        Report the state of the worker slots.
+        The throughput is the number of the processed tasks per second
+        since the previous report.
+
+        :return: Pid, alive flag, number of the restarts, number of the
+            processed tasks and throughput of every slot.
+            All the workers are dead if no slot is alive.
+        """
+        now = monotonic()
+        elapsed = now - self.reported_at
+        report = []
+        for slot, process in enumerate(self.processes):
+            processed = self.processed[slot]
+            throughput = 0.0
+            if elapsed > 0:
+                throughput = (
+                    processed - self.reported_processed[slot]
+                ) / elapsed
+            report.append(
+                {
+                    "slot": slot,
+                    "pid": process.pid,
+                    "alive": process.is_alive(),
+                    "restarts": self.restarts[slot],
+                    "processed": processed,
+                    "throughput": throughput,
+                }
+            )
+            self.reported_processed[slot] = processed
+        self.reported_at = now
+        return report
+
+    def run_worker(
+        self,
+        stop_event: Event,
+        partition_assignment: Optional[PartitionAssignment] = None,
+    ):
         """
         Set up an asyncio event loop and run the worker.
         """
-        loop = asyncio.new_event_loop()
+        if self.pin_cpus and partition_assignment is not None:
+            self.pin_cpu(partition_assignment.slot)
+        if self.use_uvloop:
+            loop = uvloop.new_event_loop()
+        else:
+            loop = asyncio.new_event_loop()
         loop.custom_id = multiprocessing.current_process().pid
         asyncio.set_event_loop(loop)
 
@@ -83,9 +251,63 @@ class Runner:
             self.task_classes,
             sleep_time=self.sleep_time,
             stop_event=stop_event,
+            partition_assignment=partition_assignment,
         )
-        loop.run_until_complete(worker.start())
-        loop.close()
+        try:
+            if partition_assignment is None:
+                loop.run_until_complete(worker.start())
+            else:
+                loop.run_until_complete(
+                    self.run_and_report(worker, partition_assignment.slot)
+                )
+        finally:
+            if partition_assignment is not None:
+                # hand the partitions over to the alive workers
+                partition_assignment.members[partition_assignment.slot] = 0
+            loop.close()
+
+    async def run_and_report(self, worker: Worker, slot: int):
+        """
+        Run the worker, updating the number of the tasks processed
+        by the slot every second.
+
+        :param worker: Worker to run.
+        :param slot: Index of the worker slot.
+        """
+
+        def count_processed() -> int:
+            return sum(
+                task_class.get_stats().get("processed")
+                for task_class in self.task_classes
+            )
+
+        # the stats of a forked process start from the ones of the runner
+        base = self.processed[slot] - count_processed()
+
+        async def report():
+            while True:
+                await asyncio.sleep(1)
+                self.processed[slot] = base + count_processed()
+
+        reporter = asyncio.ensure_future(report())
+        try:
+            await worker.start()
+        finally:
+            reporter.cancel()
+            self.processed[slot] = base + count_processed()
+
+    @staticmethod
+    def pin_cpu(slot: int):
+        """
+        Pin the current process to a CPU core, one per slot.
+
+        :param slot: Index of the worker slot.
+        """
+        if not hasattr(os, "sched_setaffinity"):
+            logger.warning("CPU affinity is not supported on this platform")
+            return
+        cpus = sorted(os.sched_getaffinity(0))
+        os.sched_setaffinity(0, {cpus[slot % len(cpus)]})
 
     def stop(self):
         """
@@ -99,3 +321,5 @@ class Runner:
         # Wait for all processes to finish
         for process in self.processes:
             process.join()
+        for slot in range(len(self.processes)):
+            self.members[slot] = 0
@@ -1,12 +1,11 @@
 from datetime import datetime, timedelta
-from typing import Optional
+from typing import Optional, List, Tuple
 
-from beanie import UpdateResponse
 from beanie.odm.enums import SortDirection
 from beanie.odm.utils.pydantic import get_model_dump
 from pydantic import Field
 
-from beanie_batteries_queue import Task, State
+from beanie_batteries_queue import Task
 
 
 class ScheduledTask(Task):
@@ -14,46 +13,47 @@ class ScheduledTask(Task):
     interval: Optional[int] = None
 
     @classmethod
-    async def pop(cls) -> Optional["ScheduledTask"]:
+    async def after_claim(cls, tasks: List[Task]):
         """
-        Get the first scheduled task from the queue that is due to run and reschedule it if needed
+        Reschedule the claimed tasks which have an interval
+        :param tasks: Claimed tasks
         :return:
         """
-        task = None
-        find_query = cls.make_find_query()
-        find_query["$and"].append(
-            {"run_at": {"$lte": datetime.utcnow()}}
-        )  # Only select tasks that are due
-        found_task = (
-            await cls.find(find_query, fetch_links=True)
-            .sort(
-                [
-                    ("run_at", SortDirection.ASCENDING),
-                    ("priority", SortDirection.DESCENDING),
-                    ("created_at", SortDirection.ASCENDING),
-                ]
-            )
-            .first_or_none()
-        )
-
-        if found_task is not None:
-            task = await cls.find_one(
-                {"_id": found_task.id, "state": State.CREATED}
-            ).update(
-                {"$set": {"state": State.RUNNING}},
-                response_type=UpdateResponse.NEW_DOCUMENT,
-            )
-
-            # Reschedule task if it has an interval
-            if task and task.interval is not None:
-                new_time = task.run_at + timedelta(seconds=task.interval)
-                new_task = cls(
-                    **get_model_dump(task, exclude={"id", "run_at", "state"}),
+        await super().after_claim(tasks)
+        rescheduled = []
+        for task in tasks:
+            if not isinstance(task, ScheduledTask) or task.interval is None:
+                continue
+            new_time = task.run_at + timedelta(seconds=task.interval)
+            rescheduled.append(
+                cls(
+                    **get_model_dump(
+                        task,
+                        exclude={*cls.runtime_fields, "run_at", "dedup_key"},
+                    ),
                     run_at=new_time,
                 )
-                await new_task.push()
+            )
+        if rescheduled:
+            await cls.push_many(rescheduled)
 
-            if task is None:
-                task = await cls.pop()
+    @classmethod
+    def make_find_query(cls):
+        find_query = super().make_find_query()
+        find_query["$and"].append(
+            {"run_at": {"$lte": datetime.utcnow()}}
+        )  # Only select tasks that are due
+        return find_query
 
-        return task
+    @classmethod
+    def get_sort(cls) -> List[Tuple[str, SortDirection]]:
+        return [
+            ("run_at", SortDirection.ASCENDING),
+            ("priority", SortDirection.DESCENDING),
+            ("created_at", SortDirection.ASCENDING),
+        ]
+
+    def get_ready_time(self) -> Optional[datetime]:
+        if self.not_before is not None and self.not_before > self.run_at:
+            return self.not_before
+        return self.run_at
@@ -0,0 +1,49 @@
+from collections import defaultdict
+from typing import Dict
+
+
+class Stats:
+    def __init__(self):
+        """
+        Initialize the Stats.
+        Counters of the queue operations of one task class in the current
+        process.
+        """
+        self.counters: Dict[str, int] = defaultdict(int)
+
+    def increment(self, name: str, value: int = 1):
+        """
+        Increment the counter
+
+        :param name: Name of the counter
+        :param value: Value to add
+        """
+        self.counters[name] += value
+
+    def get(self, name: str) -> int:
+        """
+        Get the value of the counter
+
+        :param name: Name of the counter
+        :return: Value of the counter
+        """
+        return self.counters.get(name, 0)
+
+    def ratio(self, numerator: str, denominator: str) -> float:
+        """
+        Get the ratio of two counters
+
+        :param numerator: Name of the numerator counter
+        :param denominator: Name of the denominator counter
+        :return: Ratio or 0 if the denominator is 0
+        """
+        value = self.get(denominator)
+        if value == 0:
+            return 0.0
+        return self.get(numerator) / value
+
+    def as_dict(self) -> Dict[str, int]:
+        return dict(self.counters)
+
+    def reset(self):
+        self.counters.clear()
@@ -1,16 +1,49 @@
-from datetime import datetime
-from enum import Enum
+import logging
+import zlib
+from datetime import datetime, timedelta
+from enum import Enum, IntEnum
+from itertools import count
 from multiprocessing.synchronize import Event
-from typing import Optional, Dict, ClassVar
+from random import randrange, choice
+from typing import (
+    TYPE_CHECKING,
+    Optional,
+    Dict,
+    ClassVar,
+    Iterator,
+    List,
+    Tuple,
+    Any,
+    Mapping,
+    Type,
+)
 
-from beanie import Document
+from beanie import Document, Link, PydanticObjectId
 from beanie.odm.enums import SortDirection
-from beanie.odm.queries.update import UpdateResponse
 from beanie.odm.utils.pydantic import get_model_fields, get_extra_field_info
 from pydantic import Field
-from pymongo import DESCENDING, ASCENDING
+from beanie.odm.utils.encoder import Encoder
+from beanie.odm.utils.parsing import parse_obj, save_state
+from bson import DBRef, encode
+from pymongo import DESCENDING, ASCENDING, IndexModel
 
+from beanie_batteries_queue.construct import Constructor
+from beanie_batteries_queue.max_depth import MaxDepth
+from beanie_batteries_queue.memoize import Memoize
+from beanie_batteries_queue.options import OperationOptions
+from beanie_batteries_queue.partitioning import PartitionAssignment
 from beanie_batteries_queue.queue import Queue
+from beanie_batteries_queue.rate_limit import RateLimit
+from beanie_batteries_queue.results import TaskHandle, TaskTimeout
+from beanie_batteries_queue.retry import RetryPolicy
+from beanie_batteries_queue.stats import Stats
+from beanie_batteries_queue.tracing import Tracer
+from beanie_batteries_queue.wakeup import Wakeup
+
+if TYPE_CHECKING:
+    from beanie_batteries_queue.backends.base import Backend
+
+logger = logging.getLogger(__name__)
 
 
 class State(str, Enum):
@@ -18,9 +51,13 @@ class State(str, Enum):
     RUNNING = "RUNNING"
     FINISHED = "FINISHED"
     FAILED = "FAILED"
+    # can not run, as a task of its DAG failed
+    CANCELLED = "CANCELLED"
+    # did not finish in time
+    TIMED_OUT = "TIMED_OUT"
 
 
-class Priority(Enum):
+class Priority(IntEnum):
     LOW = 1
     MEDIUM = 2
     HIGH = 3
@@ -32,11 +69,136 @@ class DependencyType(str, Enum):
     DIRECT = "DIRECT"
 
 
+class ClaimStrategy(str, Enum):
+    # always claim the first task in the queue order
+    STRICT = "STRICT"
+    # claim a random task of the first claim_candidates ones
+    RELAXED = "RELAXED"
+
+
+def get_link_id(value: Any) -> Any:
+    """
+    Get the id of the linked document
+    :param value: Link, DBRef or the document itself
+    :return:
+    """
+    if isinstance(value, Link):
+        return value.ref.id
+    if isinstance(value, (Document, DBRef)):
+        return value.id
+    return value
+
+
 class Task(Document):
     state: State = State.CREATED
-    priority: Priority = Priority.MEDIUM
+    # any integer, higher is popped first
+    priority: int = Priority.MEDIUM
     created_at: datetime = Field(default_factory=datetime.utcnow)
+    # created_at shifted back by priority_aging seconds per priority level
+    virtual_created_at: Optional[datetime] = None
+    partition: int = 0
+    # tasks with the same key are enqueued only once
+    # while one of them is created or running
+    dedup_key: Optional[str] = None
+    # copy of the dedup key, which is unset when the task is done
+    active_dedup_key: Optional[str] = None
+    result: Optional[Any] = None
+    # number of failed runs
+    attempts: int = 0
+    # last errors, the oldest first
+    errors: List[str] = Field(default_factory=list)
+    # the task is not claimed before this time
+    not_before: Optional[datetime] = None
+    # DAG the task was pushed with
+    dag_id: Optional[PydanticObjectId] = None
+    # seconds the run can take. Overrides run_timeout of the class
+    timeout: Optional[float] = None
+    # W3C trace context of the producer
+    traceparent: Optional[str] = None
+    # tasks with the same key run one at a time, the oldest first
+    group_key: Optional[str] = None
+    # id of the batch claim which took the task
+    claim_id: Optional[PydanticObjectId] = None
+    # fields set by the queue while the task is processed,
+    # which the copies of the task do not inherit
+    runtime_fields: ClassVar[Tuple[str, ...]] = (
+        "id",
+        "state",
+        "active_dedup_key",
+        "result",
+        "attempts",
+        "errors",
+        "not_before",
+        "dag_id",
+        "traceparent",
+        "claim_id",
+    )
     _dependency_fields: ClassVar[Optional[Dict[str, DependencyType]]] = None
+    _dependent_models: ClassVar[Optional[List[Type["Task"]]]] = None
+
+    # number of partitions to spread the tasks over
+    partition_count: ClassVar[int] = 1
+    # field to hash into a partition. Round-robin if not set
+    partition_key: ClassVar[Optional[str]] = None
+    _partition_counter: ClassVar[Optional[Iterator[int]]] = None
+
+    # seconds of waiting worth one priority level.
+    # If set, tasks are popped by virtual_created_at,
+    # so low priority tasks are not starved by the high priority ones
+    priority_aging: ClassVar[Optional[float]] = None
+
+    claim_strategy: ClassVar[ClaimStrategy] = ClaimStrategy.STRICT
+    # number of first tasks to choose from with the relaxed strategy
+    claim_candidates: ClassVar[int] = 8
+    _stats: ClassVar[Optional[Stats]] = None
+
+    # limit of claimed tasks per second, shared by all the processes
+    rate_limit: ClassVar[Optional[RateLimit]] = None
+    # reuse the results of the tasks with the same inputs
+    memoize: ClassVar[Optional[Memoize]] = None
+
+    # max number of the tasks waiting in the queue. No limit if not set
+    max_depth: ClassVar[Optional[MaxDepth]] = None
+
+    # seconds after which the group of a running task is unlocked,
+    # in case its worker died
+    group_lock_ttl: ClassVar[float] = 3600
+
+    # max number of tasks passed to run_batch at once
+    batch_size: ClassVar[int] = 100
+    # seconds to wait for the batch to fill up
+    batch_wait: ClassVar[float] = 0.05
+
+    # put failed tasks back to the queue
+    retry_policy: ClassVar[Optional[RetryPolicy]] = None
+    # number of the last errors to keep
+    error_history_size: ClassVar[int] = 5
+    error_max_length: ClassVar[int] = 200
+
+    # seconds the run can take, after that it is cancelled.
+    # No limit if None
+    run_timeout: ClassVar[Optional[float]] = None
+    # seconds to wait for the cancelled run to clean up. The task times
+    # out after that even if the run is still going
+    cancel_grace: ClassVar[float] = 1.0
+
+    # propagates the trace context from push to run. No tracing if not set
+    tracer: ClassVar[Optional[Tracer]] = None
+
+    # storage of the tasks. MongoDB if not set
+    backend: ClassVar[Optional["Backend"]] = None
+
+    # MongoDB options of the claims, the acks (finish, fail and cancel),
+    # the pushes and the stats reads. Client defaults if not set
+    claim_options: ClassVar[Optional[OperationOptions]] = None
+    ack_options: ClassVar[Optional[OperationOptions]] = None
+    push_options: ClassVar[Optional[OperationOptions]] = None
+    stats_options: ClassVar[Optional[OperationOptions]] = None
+
+    # build the claimed tasks without the validation, as the queue
+    # wrote their documents itself. Enums, ids and links are still coerced
+    trusted_construct: ClassVar[bool] = False
+    _constructor: ClassVar[Optional[Constructor]] = None
 
     class Settings:
         indexes = [
@@ -47,6 +209,23 @@ class Task(Document):
             ],
             # expire after 1 day
             [("created_at", ASCENDING), ("expireAfterSeconds", 86400)],
+            IndexModel(
+                [
+                    ("group_key", ASCENDING),
+                    ("state", ASCENDING),
+                    ("created_at", ASCENDING),
+                ],
+                name="group_key_state_created_at",
+                partialFilterExpression={"group_key": {"$type": "string"}},
+            ),
+            IndexModel(
+                [("active_dedup_key", ASCENDING)],
+                name="active_dedup_key_unique",
+                unique=True,
+                partialFilterExpression={
+                    "active_dedup_key": {"$type": "string"}
+                },
+            ),
         ]
 
     @classmethod
@@ -58,44 +237,411 @@ class Task(Document):
                 cls._dependency_fields[name] = get_extra_field_info(
                     field, "dependency_type"
                 )
-
-    async def push(self):
-        await self.save()
+                link_info = (cls._link_fields or {}).get(name)
+                if link_info is not None and issubclass(
+                    link_info.document_class, Task
+                ):
+                    dependent_models = (
+                        link_info.document_class.get_dependent_models()
+                    )
+                    if cls not in dependent_models:
+                        dependent_models.append(cls)
+        await cls.get_backend().init_model(cls)
 
     @classmethod
-    async def pop(cls) -> Optional["Task"]:
+    def get_claim_indexes(cls) -> List[IndexModel]:
         """
-        Get the first task from the queue
+        Get the indexes of the claim orders the class opts in to.
+        They are created on the init by the backend, so the other classes
+        do not update them on every write
         :return:
         """
-        task = None
-        find_query = cls.make_find_query()
-        found_task = (
-            await cls.find(find_query, fetch_links=True)
-            .sort(
-                [
-                    ("priority", SortDirection.DESCENDING),
-                    ("created_at", SortDirection.ASCENDING),
-                ]
+        indexes = []
+        if cls.partition_count > 1:
+            indexes.append(
+                IndexModel(
+                    [
+                        ("state", ASCENDING),
+                        ("partition", ASCENDING),
+                        ("priority", DESCENDING),
+                        ("created_at", ASCENDING),
+                    ]
+                )
             )
-            .first_or_none()
+        if cls.priority_aging is not None:
+            indexes.append(
+                IndexModel(
+                    [
+                        ("state", ASCENDING),
+                        ("virtual_created_at", ASCENDING),
+                        ("created_at", ASCENDING),
+                    ]
+                )
+            )
+        return indexes
+
+    @classmethod
+    def get_dependent_models(cls) -> List[Type["Task"]]:
+        """
+        Get the task classes which depend on this one
+        :return:
+        """
+        if (
+            "_dependent_models" not in cls.__dict__
+            or cls._dependent_models is None
+        ):
+            cls._dependent_models = []
+        return cls._dependent_models
+
+    async def push(self) -> TaskHandle:
+        """
+        Push the task to the queue.
+        If a task with the same dedup key is already enqueued,
+        the task is not saved.
+        :return: handle of the pushed task or of the already enqueued one
+        :raises QueueFull: if the queue is at its max depth
+            and the overflow policy does not drop tasks
+        """
+        self.prepare_push()
+        if self.max_depth is None:
+            task_id = await self.get_backend().push(self)
+            return TaskHandle(type(self), task_id)
+        if not await self.max_depth.admit(type(self), [self]):
+            # cancelled to make place for the higher priority tasks
+            return TaskHandle(type(self), self.id)
+        try:
+            task_id = await self.get_backend().push(self)
+        except BaseException:
+            await self.max_depth.add(type(self), -1)
+            raise
+        if task_id != self.id:
+            # deduplicated, so it takes no place in the queue
+            await self.max_depth.add(type(self), -1)
+        return TaskHandle(type(self), task_id)
+
+    async def push_and_wait(self, timeout: Optional[float] = None) -> Any:
+        """
+        Push the task to the queue and wait for its result
+        :param timeout: Seconds to wait. Wait forever if None
+        :return: Result of the task
+        """
+        handle = await self.push()
+        return await handle.result(timeout=timeout)
+
+    @classmethod
+    async def push_many(cls, tasks: List["Task"]) -> List[TaskHandle]:
+        """
+        Push multiple tasks to the queue with one bulk insert.
+        Tasks with dedup keys of already enqueued tasks are not saved.
+        :param tasks: Tasks to push
+        :return: handles of the pushed tasks or of the already enqueued ones
+        :raises QueueFull: if the tasks do not fit in the queue
+            and the overflow policy does not drop tasks
+        """
+        if not tasks:
+            return []
+        for task in tasks:
+            task.prepare_push()
+            if task.id is None:
+                task.id = PydanticObjectId()
+        if cls.max_depth is None:
+            task_ids = await cls.get_backend().push_many(cls, tasks)
+            return [TaskHandle(cls, task_id) for task_id in task_ids]
+
+        admitted = await cls.max_depth.admit(cls, tasks)
+        if not admitted:
+            # all cancelled to make place for the higher priority tasks
+            return [TaskHandle(cls, task.id) for task in tasks]
+        # the ids of the deduplicated tasks are changed by the backend
+        admitted_ids = [task.id for task in admitted]
+        try:
+            task_ids = await cls.get_backend().push_many(cls, admitted)
+        except BaseException:
+            await cls.max_depth.add(cls, -len(admitted))
+            raise
+        deduplicated = sum(
+            task_id != admitted_id
+            for task_id, admitted_id in zip(task_ids, admitted_ids)
         )
+        await cls.max_depth.add(cls, -deduplicated)
+        pushed_ids = dict(zip(admitted_ids, task_ids))
+        return [
+            TaskHandle(cls, pushed_ids.get(task.id, task.id)) for task in tasks
+        ]
 
-        if found_task is not None:
-            task = await cls.find_one(
-                {"_id": found_task.id, "state": State.CREATED}
-            ).update(
-                {"$set": {"state": State.RUNNING}},
-                response_type=UpdateResponse.NEW_DOCUMENT,
+    def prepare_push(self):
+        """
+        Set the fields which are calculated on push
+        :return:
+        """
+        self.assign_partition()
+        self.active_dedup_key = self.dedup_key
+        if self.priority_aging is not None:
+            self.virtual_created_at = self.created_at - timedelta(
+                seconds=self.priority * self.priority_aging
+            )
+        if self.tracer is not None and self.traceparent is None:
+            self.traceparent = self.tracer.get_traceparent()
+
+    def assign_partition(self):
+        """
+        Set the partition of the task, by the hash of the partition key
+        field or round-robin if there is no key
+        :return:
+        """
+        if self.partition_count <= 1:
+            return
+        if self.partition_key is not None:
+            key = str(getattr(self, self.partition_key)).encode()
+            self.partition = zlib.crc32(key) % self.partition_count
+        else:
+            self.partition = (
+                next(self.get_partition_counter()) % self.partition_count
             )
-            # check if this task was not taken by another worker
-            if task is None:
-                task = await cls.pop()
+
+    @classmethod
+    def get_partition_counter(cls) -> Iterator[int]:
+        if (
+            "_partition_counter" not in cls.__dict__
+            or cls._partition_counter is None
+        ):
+            # start from a random partition to not overload
+            # the first one with tasks of all the producers
+            cls._partition_counter = count(randrange(cls.partition_count))
+        return cls._partition_counter
+
+    @classmethod
+    async def pop(
+        cls, partitions: Optional[List[int]] = None
+    ) -> Optional["Task"]:
+        """
+        Get the first task from the queue
+        :param partitions: Claim only from these partitions
+        :return:
+        """
+        if cls.rate_limit is not None and not await cls.rate_limit.reserve(
+            cls
+        ):
+            return None
+        started_at = datetime.utcnow()
+        task = await cls.get_backend().claim(cls, partitions)
+        if task is not None:
+            if cls.rate_limit is not None:
+                cls.rate_limit.consume(cls)
+            if cls.max_depth is not None:
+                await cls.max_depth.add(cls, -1)
+            cls.get_stats().increment("claims")
+            if cls.tracer is not None:
+                task.record_claim_spans(started_at, datetime.utcnow())
+            await cls.after_claim([task])
         return task
 
+    @classmethod
+    async def pop_many(
+        cls, limit: int, partitions: Optional[List[int]] = None
+    ) -> List["Task"]:
+        """
+        Get up to limit tasks from the queue with one batch claim
+        :param limit: Max number of the tasks
+        :param partitions: Claim only from these partitions
+        :return:
+        """
+        if cls.rate_limit is not None:
+            # the rate limit is reserved task by task
+            tasks = []
+            for _ in range(limit):
+                task = await cls.pop(partitions)
+                if task is None:
+                    break
+                tasks.append(task)
+            return tasks
+        started_at = datetime.utcnow()
+        tasks = await cls.get_backend().claim_many(cls, partitions, limit)
+        if not tasks:
+            return tasks
+        if cls.max_depth is not None:
+            await cls.max_depth.add(cls, -len(tasks))
+        cls.get_stats().increment("claims", len(tasks))
+        if cls.tracer is not None:
+            claimed_at = datetime.utcnow()
+            for task in tasks:
+                task.record_claim_spans(started_at, claimed_at)
+        await cls.after_claim(tasks)
+        return tasks
+
+    @classmethod
+    async def after_claim(cls, tasks: List["Task"]):
+        """
+        Called with the tasks claimed by pop or pop_many
+        :param tasks: Claimed tasks
+        :return:
+        """
+        return None
+
+    def record_claim_spans(self, started_at: datetime, claimed_at: datetime):
+        """
+        Record the spans of the wait in the queue and of the claim
+        :param started_at: Start time of the claim
+        :param claimed_at: End time of the claim
+        :return:
+        """
+        if self.tracer is None:
+            return
+        ready_at = self.created_at
+        ready_time = self.get_ready_time()
+        if ready_time is not None and ready_time > ready_at:
+            ready_at = ready_time
+        attributes = self.get_trace_attributes()
+        self.tracer.record_span(
+            "queue wait", self.traceparent, ready_at, claimed_at, attributes
+        )
+        self.tracer.record_span(
+            "claim", self.traceparent, started_at, claimed_at, attributes
+        )
+
+    def get_trace_attributes(self) -> Dict[str, Any]:
+        return {
+            "task.class": type(self).__name__,
+            "task.id": str(self.id),
+            "task.attempts": self.attempts,
+        }
+
+    @classmethod
+    def choose_candidate(cls, candidates: List[Any]) -> Any:
+        """
+        Choose the task to claim from the first tasks of the queue.
+        Random choice spreads the concurrent workers over different tasks,
+        but only if the queue is deep enough, as otherwise the order matters
+        more than the conflicts.
+        :param candidates: First tasks of the queue in the queue order,
+            as the documents with the ids only
+        :return:
+        """
+        if (
+            cls.claim_strategy == ClaimStrategy.RELAXED
+            and len(candidates) >= cls.claim_candidates
+        ):
+            return choice(candidates)
+        return candidates[0]
+
+    @classmethod
+    def get_stats(cls) -> Stats:
+        """
+        Get the queue stats of the task class in the current process
+        :return:
+        """
+        if "_stats" not in cls.__dict__ or cls._stats is None:
+            cls._stats = Stats()
+        return cls._stats
+
+    @classmethod
+    def parse_document(cls, document: Mapping[str, Any]) -> "Task":
+        """
+        Create the task from its MongoDB document.
+        Skips the validation if trusted_construct is set
+        :param document: MongoDB document
+        :return:
+        """
+        if not cls.trusted_construct or cls._inheritance_inited:
+            return parse_obj(cls, document)  # type: ignore
+        if "_constructor" not in cls.__dict__ or cls._constructor is None:
+            cls._constructor = Constructor(cls, cls.get_link_fields())
+        task = cls._constructor(document)
+        save_state(task)
+        return task
+
+    @classmethod
+    def get_backend(cls) -> "Backend":
+        """
+        Get the storage of the tasks
+        :return:
+        """
+        if cls.backend is None:
+            # imported here, as the backends depend on this module
+            from beanie_batteries_queue.backends.mongo import mongo_backend
+
+            return mongo_backend
+        return cls.backend
+
+    async def save(  # type: ignore[override]
+        self, *args: Any, **kwargs: Any
+    ) -> "Task":
+        """
+        Save the whole task to the backend
+        :return:
+        """
+        return await self.get_backend().save(self, *args, **kwargs)
+
+    @classmethod
+    def get_sort(cls) -> List[Tuple[str, SortDirection]]:
+        """
+        Get the order in which tasks are popped from the queue
+        :return:
+        """
+        if cls.priority_aging is not None:
+            return [
+                ("virtual_created_at", SortDirection.ASCENDING),
+                ("created_at", SortDirection.ASCENDING),
+            ]
+        return [
+            ("priority", SortDirection.DESCENDING),
+            ("created_at", SortDirection.ASCENDING),
+        ]
+
+    def get_sort_key(self) -> Tuple[Any, ...]:
+        """
+        Get the position of the task in the order of get_sort,
+        for the backends which sort the tasks themselves
+        :return:
+        """
+        key = []
+        for field, direction in self.get_sort():
+            value = getattr(self, field)
+            if value is None:
+                # nulls go first in the ascending order, as in MongoDB
+                value = float("-inf")
+            elif isinstance(value, datetime):
+                value = value.timestamp()
+            if direction == SortDirection.DESCENDING:
+                value = -value
+            key.append(value)
+        return tuple(key)
+
+    def get_dependencies(self) -> List[Tuple[DependencyType, List[Any]]]:
+        """
+        Get the ids of the tasks this task depends on
+        :return: Dependency type and ids of each dependency field
+        """
+        dependencies = []
+        for field, dependency_type in (self._dependency_fields or {}).items():
+            value = getattr(self, field)
+            if not value:
+                ids = []
+            elif isinstance(value, list):
+                ids = [get_link_id(item) for item in value]
+            else:
+                ids = [get_link_id(value)]
+            dependencies.append((dependency_type, ids))
+        return dependencies
+
+    def get_ready_time(self) -> Optional[datetime]:
+        """
+        Get the time from which the task can be claimed
+        :return: None if the task can be claimed right away
+        """
+        return self.not_before
+
     @classmethod
     def make_find_query(cls):
-        queries = [{"state": State.CREATED}]
+        queries = [
+            {"state": State.CREATED},
+            {
+                "$or": [
+                    {"not_before": None},
+                    {"not_before": {"$lte": datetime.utcnow()}},
+                ]
+            },
+        ]
         if cls._dependency_fields is not None:
             for (
                 dependency_field,
@@ -138,43 +684,276 @@ class Task(Document):
                 ]
             }
 
+    @classmethod
+    def get_done_states(cls) -> List[str]:
+        """
+        Get the states of the tasks which will not run anymore
+        :return:
+        """
+        return [
+            State.FINISHED.value,
+            State.FAILED.value,
+            State.CANCELLED.value,
+            State.TIMED_OUT.value,
+        ]
+
+    @classmethod
+    def is_successful_state(cls, state: str) -> bool:
+        return state == State.FINISHED
+
+    @classmethod
+    async def find_done_documents(
+        cls, task_ids: List[Any]
+    ) -> List[Mapping[str, Any]]:
+        """
+        Get the raw documents of the tasks which are done
+        :param task_ids: Ids of the tasks to check
+        :return: Documents with the state and the result
+        """
+        return await cls.get_backend().find_done(cls, task_ids)
+
     @classmethod
     async def is_empty(cls) -> bool:
         """
         Check if there are no tasks in the queue
         :return:
         """
-        return await cls.find_one({"state": State.CREATED}) is None
+        return await cls.get_backend().is_empty(cls)
+
+    @classmethod
+    async def count_tasks(cls, state: State = State.CREATED) -> int:
+        """
+        Count the tasks in the state
+        :param state:
+        :return:
+        """
+        return await cls.get_backend().count(cls, state)
 
     @classmethod
     def queue(
         cls,
         sleep_time: int = 1,
         stop_event: Optional[Event] = None,
+        partition_assignment: Optional[PartitionAssignment] = None,
     ):
         """
         Get queue iterator
         :param sleep_time:
         :param stop_event:
+        :param partition_assignment:
         :return:
         """
-        return Queue(cls, sleep_time=sleep_time, stop_event=stop_event)
+        return Queue(
+            cls,
+            sleep_time=sleep_time,
+            stop_event=stop_event,
+            partition_assignment=partition_assignment,
+        )
 
-    async def finish(self):
+    async def finish(self, result: Any = None):
         """
         Mark task as finished
+        :param result: Result of the task
         :return:
         """
         self.state = State.FINISHED
+        if result is not None:
+            self.set_result(result)
+        self.active_dedup_key = None
         await self.save()
+        await self.release_group()
+        await self.wake_dependents()
+
+    def set_result(self, result: Any) -> Any:
+        """
+        Set the result of the run if MongoDB can store it.
+        Otherwise the result is dropped with a warning,
+        as the run succeeded anyway
+        :param result: Result of the run
+        :return: Encoded result
+        """
+        try:
+            encoded = Encoder().encode(result)
+            encode({"result": encoded})
+        except Exception:
+            logger.warning(
+                f"Result of the task {self.id} can not be stored",
+                exc_info=True,
+            )
+            self.result = None
+            return None
+        self.result = result
+        return encoded
 
-    async def fail(self):
+    async def release_group(self):
         """
-        Mark task as failed
+        Let the next task of the group be claimed
         :return:
         """
-        self.state = State.FAILED
-        await self.save()
+        if self.group_key is not None:
+            await self.get_backend().release_group(self)
+
+    async def wake_dependents(self):
+        """
+        Wake the queues of the dependents of the finished task
+        which can run now, instead of waiting for their next poll
+        :return:
+        """
+        if self.state != State.FINISHED or not self.get_dependent_models():
+            return
+        collection_names = await self.get_backend().find_ready_dependents(self)
+        if collection_names:
+            await Wakeup.get().notify(type(self), collection_names)
+
+    async def fail(self, error: Optional[BaseException] = None):
+        """
+        Mark task as failed or put it back to the queue
+        if the retry policy allows it
+        :param error: Error of the run
+        :return:
+        """
+        update = self.apply_failure(error)
+        if self.state == State.CREATED:
+            updated = await self.get_backend().update(
+                self, update, expected_state=State.RUNNING
+            )
+            # the task could be cancelled or claimed again meanwhile
+            if updated and self.max_depth is not None:
+                await self.max_depth.add(type(self), 1)
+            await self.release_group()
+        else:
+            await self.save()
+            await self.release_group()
+            await self.cancel_unreachable()
+
+    async def cancel_unreachable(self):
+        """
+        Cancel the tasks of the DAG which can not run anymore
+        after this task failed
+        :return:
+        """
+        if self.dag_id is None or self.state not in (
+            State.FAILED,
+            State.TIMED_OUT,
+        ):
+            return
+        # imported here, as the DAG module depends on this one
+        from beanie_batteries_queue.dag import find_unreachable
+
+        backend = self.get_backend()
+        dag = await backend.add_dag_failure(type(self), self.dag_id, self.id)
+        if dag is None:
+            return
+        unreachable: Dict[str, List[Any]] = {}
+        for node in find_unreachable(dag["nodes"], dag["failed"]):
+            unreachable.setdefault(node["collection"], []).append(node["_id"])
+        for collection_name, task_ids in unreachable.items():
+            cancelled = await backend.cancel(
+                type(self), collection_name, task_ids
+            )
+            if self.max_depth is not None:
+                # the counters of the other task classes
+                # are fixed by their recounts
+                await self.max_depth.add(
+                    type(self), -cancelled, collection_name
+                )
+
+    def apply_failure(
+        self, error: Optional[BaseException] = None
+    ) -> Dict[str, Any]:
+        """
+        Set the fields of the failed task
+        :param error: Error of the run
+        :return: Update of the task document
+        """
+        self.attempts += 1
+        update: Dict[str, Any] = {"$inc": {"attempts": 1}}
+        if error is not None:
+            record = f"{type(error).__name__}: {error}"[
+                : self.error_max_length
+            ]
+            self.errors = (self.errors + [record])[-self.error_history_size :]
+            update["$push"] = {
+                "errors": {
+                    "$each": [record],
+                    "$slice": -self.error_history_size,
+                }
+            }
+        policy = self.retry_policy
+        if (
+            error is not None
+            and policy is not None
+            and policy.should_retry(self.attempts, error)
+        ):
+            self.state = State.CREATED
+            self.not_before = datetime.utcnow() + timedelta(
+                seconds=policy.get_delay(self.attempts)
+            )
+            update["$set"] = {
+                "state": State.CREATED.value,
+                "not_before": self.not_before,
+            }
+        else:
+            if isinstance(error, TaskTimeout):
+                self.state = State.TIMED_OUT
+            else:
+                self.state = State.FAILED
+            self.active_dedup_key = None
+            update["$set"] = {
+                "state": self.state.value,
+                "active_dedup_key": None,
+            }
+        return update
+
+    @classmethod
+    async def record_batch(cls, tasks: List["Task"], results: List[Any]):
+        """
+        Mark tasks as finished or failed with one bulk write
+        :param tasks: Tasks of the batch
+        :param results: Results of the tasks. Exception instances
+            mark the tasks as failed or put them back to the queue
+        :return:
+        """
+        updates = []
+        for task, result in zip(tasks, results):
+            if isinstance(result, Exception):
+                update = task.apply_failure(result)
+            else:
+                task.state = State.FINISHED
+                task.active_dedup_key = None
+                update = {
+                    "$set": {
+                        "state": State.FINISHED.value,
+                        "result": task.set_result(result),
+                        "active_dedup_key": None,
+                    }
+                }
+            updates.append((task, update))
+        await cls.get_backend().update_many(cls, updates)
+        if cls.max_depth is not None:
+            retried = sum(task.state == State.CREATED for task in tasks)
+            await cls.max_depth.add(cls, retried)
+        for task in tasks:
+            await task.release_group()
+            await task.wake_dependents()
+            await task.cancel_unreachable()
+
+    @classmethod
+    def is_batched(cls) -> bool:
+        """
+        Check if the task class processes tasks in batches
+        :return:
+        """
+        return callable(getattr(cls, "run_batch", None))
+
+    def get_timeout(self) -> Optional[float]:
+        """
+        Get the seconds the run of the task can take
+        :return: None if there is no limit
+        """
+        if self.timeout is not None:
+            return self.timeout
+        return self.run_timeout
 
     async def run(self):
         """
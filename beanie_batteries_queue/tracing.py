@@ -0,0 +1,159 @@
+import os
+import re
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterator, Optional
+
+try:
+    from opentelemetry import trace
+    from opentelemetry.trace.propagation.tracecontext import (
+        TraceContextTextMapPropagator,
+    )
+except ImportError:  # pragma: no cover
+    trace = None  # type: ignore
+
+# W3C traceparent of the current context
+current_traceparent: ContextVar[Optional[str]] = ContextVar(
+    "current_traceparent", default=None
+)
+
+TRACEPARENT_RE = re.compile(
+    r"^00-(?P<trace_id>[0-9a-f]{32})-(?P<span_id>[0-9a-f]{16})"
+    r"-(?P<flags>[0-9a-f]{2})$"
+)
+
+
+def make_traceparent(parent: Optional[str] = None) -> str:
+    """
+    Make the traceparent of a new span
+    :param parent: Traceparent of the parent span.
+        The span starts a new trace if it is not set or not valid
+    :return:
+    """
+    match = TRACEPARENT_RE.match(parent or "")
+    if match is None:
+        trace_id, flags = os.urandom(16).hex(), "01"
+    else:
+        trace_id, flags = match["trace_id"], match["flags"]
+    return f"00-{trace_id}-{os.urandom(8).hex()}-{flags}"
+
+
+@contextmanager
+def trace_context(traceparent: Optional[str]) -> Iterator[None]:
+    """
+    Set the traceparent of the current context,
+    for example from the header of an incoming request
+    :param traceparent: W3C traceparent
+    :return:
+    """
+    token = current_traceparent.set(traceparent)
+    try:
+        yield
+    finally:
+        current_traceparent.reset(token)
+
+
+class Tracer:
+    """
+    Propagates the W3C trace context from push() to run(), without
+    recording the spans. Subclasses can send the spans to a tracing system.
+    """
+
+    def get_traceparent(self) -> Optional[str]:
+        """
+        Get the traceparent of the current context to store with the task
+        :return:
+        """
+        return current_traceparent.get()
+
+    def record_span(
+        self,
+        name: str,
+        parent: Optional[str],
+        start_time: datetime,
+        end_time: datetime,
+        attributes: Dict[str, Any],
+    ):
+        """
+        Record the span which is over already
+        :param name: Name of the span
+        :param parent: Traceparent of the task
+        :param start_time: UTC start time
+        :param end_time: UTC end time
+        :param attributes: Attributes of the span
+        :return:
+        """
+
+    @contextmanager
+    def start_span(
+        self, name: str, parent: Optional[str], attributes: Dict[str, Any]
+    ) -> Iterator[None]:
+        """
+        Run the code in the span, which is the current context
+        :param name: Name of the span
+        :param parent: Traceparent of the task
+        :param attributes: Attributes of the span
+        :return:
+        """
+        with trace_context(make_traceparent(parent)):
+            yield
+
+
+def to_nanoseconds(value: datetime) -> int:
+    return int(value.replace(tzinfo=timezone.utc).timestamp() * 1e9)
+
+
+class OpenTelemetryTracer(Tracer):
+    def __init__(self, name: str = "beanie_batteries_queue"):
+        """
+        Initialize the OpenTelemetryTracer.
+        Records the spans with the OpenTelemetry API
+        and takes the trace context from it.
+
+        :param name: Name of the tracer
+        """
+        if trace is None:
+            raise ImportError(
+                "opentelemetry-api is required for OpenTelemetryTracer"
+            )
+        self.tracer = trace.get_tracer(name)
+        self.propagator = TraceContextTextMapPropagator()
+
+    def get_context(self, parent: Optional[str]):
+        if parent is None:
+            return None
+        return self.propagator.extract({"traceparent": parent})
+
+    def get_traceparent(self) -> Optional[str]:
+        carrier: Dict[str, str] = {}
+        self.propagator.inject(carrier)
+        return carrier.get("traceparent") or super().get_traceparent()
+
+    def record_span(
+        self,
+        name: str,
+        parent: Optional[str],
+        start_time: datetime,
+        end_time: datetime,
+        attributes: Dict[str, Any],
+    ):
+        span = self.tracer.start_span(
+            name,
+            context=self.get_context(parent),
+            start_time=to_nanoseconds(start_time),
+            attributes=attributes,
+        )
+        span.end(end_time=to_nanoseconds(end_time))
+
+    @contextmanager
+    def start_span(
+        self, name: str, parent: Optional[str], attributes: Dict[str, Any]
+    ) -> Iterator[None]:
+        with self.tracer.start_as_current_span(
+            name, context=self.get_context(parent), attributes=attributes
+        ):
+            carrier: Dict[str, str] = {}
+            self.propagator.inject(carrier)
+            with trace_context(carrier.get("traceparent")):
+                yield
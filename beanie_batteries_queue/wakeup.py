@@ -0,0 +1,115 @@
+import asyncio
+import logging
+from typing import (
+    TYPE_CHECKING,
+    ClassVar,
+    Dict,
+    Iterable,
+    Set,
+    Type,
+)
+from weakref import WeakKeyDictionary
+
+if TYPE_CHECKING:
+    from beanie_batteries_queue.backends.base import Backend
+    from beanie_batteries_queue.task import Task
+
+logger = logging.getLogger(__name__)
+
+
+class Wakeup:
+    # one instance per event loop
+    _instances: ClassVar[
+        "WeakKeyDictionary[asyncio.AbstractEventLoop, Wakeup]"
+    ] = WeakKeyDictionary()
+
+    def __init__(self):
+        """
+        Initialize the Wakeup.
+        Wakes the idle queues of the task classes when their tasks
+        become ready, in this process and, if the backend supports it,
+        in the other processes.
+        """
+        self.events: Dict[str, Set[asyncio.Event]] = {}
+        self.listeners: Dict["Backend", asyncio.Task] = {}
+
+    @classmethod
+    def get(cls) -> "Wakeup":
+        """
+        Get the instance for the running event loop
+        :return: Wakeup
+        """
+        loop = asyncio.get_running_loop()
+        if loop not in cls._instances:
+            cls._instances[loop] = cls()
+        return cls._instances[loop]
+
+    def subscribe(self, task_model: Type["Task"]) -> asyncio.Event:
+        """
+        Get the event which is set when the tasks of the class
+        become ready
+        :param task_model: Task model class
+        :return: Event to wait for
+        """
+        event = asyncio.Event()
+        name = task_model.get_collection_name()
+        self.events.setdefault(name, set()).add(event)
+        backend = task_model.get_backend()
+        if backend.supports_wakeups and backend not in self.listeners:
+            self.listeners[backend] = asyncio.create_task(
+                self.listen(task_model)
+            )
+        return event
+
+    def unsubscribe(self, task_model: Type["Task"], event: asyncio.Event):
+        name = task_model.get_collection_name()
+        events = self.events.get(name, set())
+        events.discard(event)
+        if not events:
+            self.events.pop(name, None)
+        if not self.events:
+            for listener in self.listeners.values():
+                listener.cancel()
+            self.listeners = {}
+
+    def wake(self, collection_names: Iterable[str]):
+        """
+        Wake the queues of this process
+        :param collection_names: Collections with the ready tasks
+        :return:
+        """
+        for name in collection_names:
+            for event in self.events.get(name, set()):
+                event.set()
+
+    async def notify(
+        self, task_model: Type["Task"], collection_names: Iterable[str]
+    ):
+        """
+        Wake the queues of all the processes
+        :param task_model: Task model class of the backend to notify through
+        :param collection_names: Collections with the ready tasks
+        :return:
+        """
+        collection_names = list(collection_names)
+        self.wake(collection_names)
+        backend = task_model.get_backend()
+        if not backend.supports_wakeups:
+            return
+        try:
+            await backend.publish_wakeup(task_model, collection_names)
+        except Exception:
+            # the queues find the tasks on the next poll anyway
+            logger.warning("Failed to publish the wakeup", exc_info=True)
+
+    async def listen(self, task_model: Type["Task"]):
+        backend = task_model.get_backend()
+        try:
+            async for collection_names in backend.watch_wakeups(task_model):
+                self.wake(collection_names)
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            logger.warning(
+                "Wakeup listener failed, polling only", exc_info=True
+            )
@@ -5,6 +5,8 @@ from typing import List, Type, Optional
 
 from typing import TYPE_CHECKING
 
+from beanie_batteries_queue.partitioning import PartitionAssignment
+
 if TYPE_CHECKING:
     from beanie_batteries_queue import Task
 
@@ -17,6 +19,7 @@ class Worker:
         task_classes: List[Type["Task"]],
         sleep_time: int = 1,
         stop_event: Optional[Event] = None,
+        partition_assignment: Optional[PartitionAssignment] = None,
     ):
         """
         Initialize the Worker.
@@ -24,10 +27,15 @@ class Worker:
         :param task_classes: List of Task classes to run tasks from.
         :param sleep_time: Time to sleep between iterations.
         :param stop_event: Event to stop the worker.
+        :param partition_assignment: Partitions to claim tasks from first.
         """
         self.task_classes = task_classes
         self.queues = [
-            task.queue(sleep_time=sleep_time, stop_event=stop_event)
+            task.queue(
+                sleep_time=sleep_time,
+                stop_event=stop_event,
+                partition_assignment=partition_assignment,
+            )
             for task in self.task_classes
         ]
         self.stop_event = stop_event
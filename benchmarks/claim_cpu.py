@@ -0,0 +1,118 @@
+"""
+CPU cost per claimed task with and without trusted_construct.
+
+Without a database, only the creation of the task from its document is
+measured, which is the part of the claim trusted_construct changes. With
+--mongodb-dsn the whole claim, pop() with the database round trip, is
+measured as well, as the CPU time of the process per task.
+
+Usage:
+    python benchmarks/claim_cpu.py
+    python benchmarks/claim_cpu.py --mongodb-dsn mongodb://localhost:27017
+"""
+
+import argparse
+import asyncio
+import time
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Type
+
+from beanie import PydanticObjectId, init_beanie
+from beanie.odm.utils.parsing import parse_obj
+from motor.motor_asyncio import AsyncIOMotorClient
+
+from beanie_batteries_queue import Task, init_memory_backend
+
+
+class ValidatedBenchmarkTask(Task):
+    url: str
+    attempt_limit: int = 3
+    tags: List[str] = []
+    headers: Dict[str, str] = {}
+    deadline: Optional[datetime] = None
+
+
+class TrustedBenchmarkTask(ValidatedBenchmarkTask):
+    trusted_construct = True
+
+
+TASK_MODELS: List[Type[Task]] = [ValidatedBenchmarkTask, TrustedBenchmarkTask]
+
+
+def make_document() -> Dict[str, Any]:
+    return {
+        "_id": PydanticObjectId(),
+        "state": "RUNNING",
+        "priority": 2,
+        "created_at": datetime.utcnow(),
+        "virtual_created_at": None,
+        "partition": 0,
+        "dedup_key": None,
+        "active_dedup_key": None,
+        "result": None,
+        "attempts": 0,
+        "errors": [],
+        "not_before": None,
+        "dag_id": None,
+        "timeout": None,
+        "traceparent": None,
+        "url": "https://example.com/page",
+        "attempt_limit": 3,
+        "tags": ["crawl", "html"],
+        "headers": {"accept": "text/html"},
+        "deadline": datetime.utcnow(),
+    }
+
+
+def measure_parse(count: int):
+    documents = [make_document() for _ in range(count)]
+    print(f"{'task class':>24} {'us per task':>12}")
+    for task_model in TASK_MODELS:
+        start = time.process_time()
+        for document in documents:
+            if task_model.trusted_construct:
+                task_model.parse_document(document)
+            else:
+                parse_obj(task_model, document)
+        elapsed = time.process_time() - start
+        print(f"{task_model.__name__:>24} {elapsed / count * 1e6:>12.1f}")
+
+
+async def measure_claim(count: int):
+    print(f"{'task class':>24} {'us CPU per claim':>17}")
+    for task_model in TASK_MODELS:
+        await task_model.get_motor_collection().delete_many({})
+        await task_model.push_many(
+            [task_model(url="https://example.com") for _ in range(count)]
+        )
+        start = time.process_time()
+        for _ in range(count):
+            await task_model.pop()
+        elapsed = time.process_time() - start
+        print(f"{task_model.__name__:>24} {elapsed / count * 1e6:>17.1f}")
+        await task_model.get_motor_collection().drop()
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--mongodb-dsn", default=None)
+    parser.add_argument("--db-name", default="beanie_queue_benchmark")
+    parser.add_argument("--count", type=int, default=20000)
+    parser.add_argument("--claim-count", type=int, default=2000)
+    args = parser.parse_args()
+
+    if args.mongodb_dsn is None:
+        await init_memory_backend(TASK_MODELS)
+        measure_parse(args.count)
+        return
+
+    client = AsyncIOMotorClient(args.mongodb_dsn)
+    await init_beanie(
+        database=client[args.db_name], document_models=TASK_MODELS
+    )
+    measure_parse(args.count)
+    await measure_claim(args.claim_count)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,78 @@
+"""
+Claim throughput and lost races per claim with the strict and the relaxed
+claim strategies.
+
+Many concurrent workers claim from the same queue at the same moment over
+a shared connection pool, so the claims race like the ones of separate
+processes. With the strict strategy all the workers go for the first task,
+and all but one of them retry. With the relaxed strategy they spread over
+the first claim_candidates tasks.
+
+Usage:
+    python benchmarks/claim_strategy.py --mongodb-dsn mongodb://localhost:27017
+"""
+
+import argparse
+import asyncio
+from typing import List, Type
+
+from beanie import init_beanie
+from motor.motor_asyncio import AsyncIOMotorClient
+
+from beanie_batteries_queue import ClaimStrategy, Task
+
+
+class StrictBenchmarkTask(Task):
+    pass
+
+
+class RelaxedBenchmarkTask(Task):
+    claim_strategy = ClaimStrategy.RELAXED
+    claim_candidates = 16
+
+
+TASK_MODELS: List[Type[Task]] = [StrictBenchmarkTask, RelaxedBenchmarkTask]
+
+
+async def work(task_model: Type[Task]):
+    while await task_model.pop() is not None:
+        pass
+
+
+async def run(task_model: Type[Task], args):
+    await task_model.get_motor_collection().delete_many({})
+    await task_model.push_many([task_model() for _ in range(args.count)])
+    task_model.get_stats().reset()
+    loop = asyncio.get_running_loop()
+    start = loop.time()
+    await asyncio.gather(*[work(task_model) for _ in range(args.workers)])
+    elapsed = loop.time() - start
+    stats = task_model.get_stats()
+    print(
+        f"{task_model.__name__:>24} {stats.get('claims') / elapsed:>10.0f} "
+        f"{stats.ratio('claim_conflicts', 'claims'):>20.2f}"
+    )
+    await task_model.get_motor_collection().drop()
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "--mongodb-dsn", default="mongodb://localhost:27017/beanie_db"
+    )
+    parser.add_argument("--db-name", default="beanie_queue_benchmark")
+    parser.add_argument("--count", type=int, default=5000)
+    parser.add_argument("--workers", type=int, default=32)
+    args = parser.parse_args()
+
+    client = AsyncIOMotorClient(args.mongodb_dsn, maxPoolSize=args.workers)
+    await init_beanie(
+        database=client[args.db_name], document_models=TASK_MODELS
+    )
+    print(f"{'task class':>24} {'claims/s':>10} {'conflicts per claim':>20}")
+    for task_model in TASK_MODELS:
+        await run(task_model, args)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,162 @@
+"""
+Push, claim and ack latency and throughput per write concern and read
+preference.
+
+Each configuration pushes, claims and finishes the same number of tasks
+one by one and then counts them with the stats reads. Stronger write
+concerns wait for more members of the replica set, so the difference
+between them is only visible against a replica set, ideally with the
+members on different hosts.
+
+The environment the numbers were measured on is printed first, so it can
+be documented with them.
+
+Usage:
+    python benchmarks/operation_options.py \
+        --mongodb-dsn "mongodb://localhost:27017/?replicaSet=rs0"
+"""
+
+import argparse
+import asyncio
+import os
+import platform
+from typing import Callable, List, Type
+
+import motor
+import pymongo
+from beanie import init_beanie
+from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import ReadPreference
+from pymongo.write_concern import WriteConcern
+
+from beanie_batteries_queue import OperationOptions, State, Task
+
+
+class DefaultBenchmarkTask(Task):
+    pass
+
+
+class W1BenchmarkTask(Task):
+    claim_options = OperationOptions(write_concern=WriteConcern(w=1))
+    ack_options = OperationOptions(write_concern=WriteConcern(w=1))
+    push_options = OperationOptions(write_concern=WriteConcern(w=1))
+
+
+class MajorityBenchmarkTask(Task):
+    claim_options = OperationOptions(write_concern=WriteConcern(w="majority"))
+    ack_options = OperationOptions(write_concern=WriteConcern(w="majority"))
+    push_options = OperationOptions(write_concern=WriteConcern(w="majority"))
+
+
+class JournaledBenchmarkTask(Task):
+    claim_options = OperationOptions(write_concern=WriteConcern(w=1, j=True))
+    ack_options = OperationOptions(write_concern=WriteConcern(w=1, j=True))
+    push_options = OperationOptions(write_concern=WriteConcern(w=1, j=True))
+
+
+class SecondaryStatsBenchmarkTask(Task):
+    stats_options = OperationOptions(
+        read_preference=ReadPreference.SECONDARY_PREFERRED
+    )
+
+
+TASK_MODELS: List[Type[Task]] = [
+    DefaultBenchmarkTask,
+    W1BenchmarkTask,
+    MajorityBenchmarkTask,
+    JournaledBenchmarkTask,
+    SecondaryStatsBenchmarkTask,
+]
+
+
+def percentile(values: List[float], share: float) -> float:
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * share))]
+
+
+async def measure(count: int, operation: Callable) -> List[float]:
+    loop = asyncio.get_running_loop()
+    latencies = []
+    for _ in range(count):
+        start = loop.time()
+        await operation()
+        latencies.append(loop.time() - start)
+    return latencies
+
+
+async def describe_environment(client: AsyncIOMotorClient):
+    build_info = await client.admin.command("buildInfo")
+    hello = await client.admin.command("hello")
+    members = hello.get("hosts", [])
+    print(f"MongoDB {build_info['version']}", end="")
+    if "setName" in hello:
+        print(f", replica set {hello['setName']} of {len(members)} members")
+    else:
+        print(", standalone")
+    print(
+        f"Python {platform.python_version()}, pymongo {pymongo.version}, "
+        f"motor {motor.version}"
+    )
+    print(
+        f"{platform.platform()}, {platform.processor() or platform.machine()}"
+        f", {os.cpu_count()} CPUs"
+    )
+    print()
+
+
+async def run(task_model: Type[Task], args):
+    await task_model.get_motor_collection().delete_many({})
+    claimed: List[Task] = []
+
+    async def push():
+        await task_model().push()
+
+    async def claim():
+        claimed.append(await task_model.pop())
+
+    async def ack():
+        await claimed.pop().finish()
+
+    async def stats():
+        await task_model.count_tasks(State.FINISHED)
+
+    print(task_model.__name__)
+    print(f"{'operation':>10} {'ops/s':>10} {'p50 ms':>10} {'p99 ms':>10}")
+    for name, operation, count in [
+        ("push", push, args.count),
+        ("claim", claim, args.count),
+        ("ack", ack, args.count),
+        ("stats", stats, args.stats_count),
+    ]:
+        latencies = await measure(count, operation)
+        print(
+            f"{name:>10} {len(latencies) / sum(latencies):>10.0f} "
+            f"{percentile(latencies, 0.5) * 1000:>10.2f} "
+            f"{percentile(latencies, 0.99) * 1000:>10.2f}"
+        )
+    await task_model.get_motor_collection().drop()
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "--mongodb-dsn", default="mongodb://localhost:27017/beanie_db"
+    )
+    parser.add_argument("--db-name", default="beanie_queue_benchmark")
+    parser.add_argument("--count", type=int, default=1000)
+    parser.add_argument("--stats-count", type=int, default=100)
+    args = parser.parse_args()
+
+    client = AsyncIOMotorClient(args.mongodb_dsn)
+    await describe_environment(client)
+    await init_beanie(
+        database=client[args.db_name], document_models=TASK_MODELS
+    )
+    for task_model in TASK_MODELS:
+        await run(task_model, args)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,163 @@
+"""
+Max wait time per priority under mixed-priority saturation.
+
+High priority tasks arrive as fast as the consumer can process them and low
+priority tasks arrive on top of that. With the strict priority order the low
+priority tasks starve, so their wait grows with the duration of the run.
+With priority aging it is bounded by the wait of the high priority tasks plus
+priority_aging seconds per priority level.
+
+Without --mongodb-dsn the queue is kept in memory, which measures the
+scheduling alone.
+
+Usage:
+    python benchmarks/priority_aging.py
+    python benchmarks/priority_aging.py --mongodb-dsn mongodb://localhost:27017
+"""
+
+import argparse
+import asyncio
+from collections import defaultdict
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple, Type
+
+from beanie import init_beanie
+from motor.motor_asyncio import AsyncIOMotorClient
+
+from beanie_batteries_queue import Priority, Task, init_memory_backend
+
+
+class StrictBenchmarkTask(Task):
+    pass
+
+
+class SlowAgingBenchmarkTask(Task):
+    priority_aging = 5.0
+
+
+class AgingBenchmarkTask(Task):
+    priority_aging = 1.0
+
+
+class FastAgingBenchmarkTask(Task):
+    priority_aging = 0.2
+
+
+TASK_MODELS: List[Type[Task]] = [
+    StrictBenchmarkTask,
+    SlowAgingBenchmarkTask,
+    AgingBenchmarkTask,
+    FastAgingBenchmarkTask,
+]
+
+
+async def produce(
+    task_model: Type[Task], duration: float, high_rate: float, low_rate: float
+) -> List[Task]:
+    pushed: List[Task] = []
+    loop = asyncio.get_running_loop()
+    start = loop.time()
+    pushed_low = 0
+    pushed_high = 0
+    while loop.time() - start < duration:
+        elapsed = loop.time() - start
+        if pushed_low < elapsed * low_rate:
+            task = task_model(priority=Priority.LOW)
+            await task.push()
+            pushed.append(task)
+            pushed_low += 1
+        if pushed_high < elapsed * high_rate:
+            task = task_model(priority=Priority.HIGH)
+            await task.push()
+            pushed.append(task)
+            pushed_high += 1
+        await asyncio.sleep(1 / (high_rate + low_rate))
+    return pushed
+
+
+async def consume(
+    task_model: Type[Task], duration: float, rate: float
+) -> Tuple[Dict[int, List[float]], set]:
+    served = set()
+    waits: Dict[int, List[float]] = defaultdict(list)
+    loop = asyncio.get_running_loop()
+    start = loop.time()
+    while loop.time() - start < duration:
+        task = await task_model.pop()
+        if task is not None:
+            wait = (datetime.utcnow() - task.created_at).total_seconds()
+            waits[task.priority].append(wait)
+            served.add(task.id)
+            await task.finish()
+        await asyncio.sleep(1 / rate)
+    return waits, served
+
+
+def oldest_waiting(pushed: List[Task], served: set, priority: int) -> float:
+    created_at: Optional[datetime] = min(
+        (
+            task.created_at
+            for task in pushed
+            if task.priority == priority and task.id not in served
+        ),
+        default=None,
+    )
+    if created_at is None:
+        return 0.0
+    return (datetime.utcnow() - created_at).total_seconds()
+
+
+def percentile(values: List[float], share: float) -> float:
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * share))]
+
+
+async def run(task_model: Type[Task], args):
+    if args.mongodb_dsn is not None:
+        await task_model.get_motor_collection().delete_many({})
+    pushed, (waits, served) = await asyncio.gather(
+        produce(task_model, args.duration, args.high_rate, args.low_rate),
+        consume(task_model, args.duration, args.consume_rate),
+    )
+    print(f"{task_model.__name__}, priority_aging={task_model.priority_aging}")
+    print(
+        f"{'priority':>10} {'served':>8} {'p99 wait':>10} "
+        f"{'max wait':>10} {'oldest waiting':>15}"
+    )
+    for priority in [Priority.HIGH, Priority.LOW]:
+        priority_waits = waits[priority]
+        oldest = oldest_waiting(pushed, served, priority)
+        print(
+            f"{priority.name:>10} {len(priority_waits):>8} "
+            f"{percentile(priority_waits, 0.99):>10.2f} "
+            f"{max(priority_waits + [oldest]):>10.2f} {oldest:>15.2f}"
+        )
+    if args.mongodb_dsn is not None:
+        await task_model.get_motor_collection().drop()
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--mongodb-dsn", default=None)
+    parser.add_argument("--db-name", default="beanie_queue_benchmark")
+    parser.add_argument("--duration", type=float, default=20)
+    parser.add_argument("--consume-rate", type=float, default=100)
+    parser.add_argument("--high-rate", type=float, default=100)
+    parser.add_argument("--low-rate", type=float, default=10)
+    args = parser.parse_args()
+
+    if args.mongodb_dsn is None:
+        await init_memory_backend(TASK_MODELS)
+    else:
+        client = AsyncIOMotorClient(args.mongodb_dsn)
+        await init_beanie(
+            database=client[args.db_name], document_models=TASK_MODELS
+        )
+    for task_model in TASK_MODELS:
+        await run(task_model, args)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -16,6 +16,27 @@ from tests.tasks import (
     AnotherSimpleTask,
     SimpleTaskWithLongProcessingTime,
     ScheduledTaskWithInterval,
+    PartitionedTask,
+    RelaxedTask,
+    RateLimitedTask,
+    MemoizedTask,
+    FailingTask,
+    BatchTask,
+    FlakyTask,
+    NotRetryableTask,
+    AgingTask,
+    ChainTask,
+    SlowTask,
+    TracedTask,
+    TracedBatchTask,
+    OptionsTask,
+    TrustedTask,
+    BoundedTask,
+    BlockingBoundedTask,
+    DroppingBoundedTask,
+    DroppingDependentTask,
+    GroupedTask,
+    StubbornTask,
 )
 
 from beanie.odm.utils.pydantic import IS_PYDANTIC_V2
@@ -62,6 +83,27 @@ async def init(db):
         AnotherSimpleTask,
         SimpleTaskWithLongProcessingTime,
         ScheduledTaskWithInterval,
+        PartitionedTask,
+        RelaxedTask,
+        RateLimitedTask,
+        MemoizedTask,
+        FailingTask,
+        BatchTask,
+        FlakyTask,
+        NotRetryableTask,
+        AgingTask,
+        ChainTask,
+        SlowTask,
+        TracedTask,
+        TracedBatchTask,
+        OptionsTask,
+        TrustedTask,
+        BoundedTask,
+        BlockingBoundedTask,
+        DroppingBoundedTask,
+        DroppingDependentTask,
+        GroupedTask,
+        StubbornTask,
     ]
     await init_beanie(
         database=db,
@@ -73,3 +115,8 @@ async def init(db):
     for model in models:
         await model.get_motor_collection().drop()
         await model.get_motor_collection().drop_indexes()
+    await db[RateLimitedTask.rate_limit.collection_name].drop()
+    await db[MemoizedTask.memoize.collection_name].drop()
+    await db["task_dags"].drop()
+    await db[BoundedTask.max_depth.collection_name].drop()
+    await db["task_group_locks"].drop()
@@ -1,12 +1,28 @@
+import asyncio
 from time import sleep
-from typing import List, Optional
+from typing import Dict, List, Optional, ClassVar
 
 from beanie import Link
 from beanie.odm.registry import DocsRegistry
 from pydantic import Field
+from pymongo import ReadPreference
+from pymongo.read_concern import ReadConcern
+from pymongo.write_concern import WriteConcern
 
-from beanie_batteries_queue import Task, DependencyType
+from beanie_batteries_queue import (
+    Task,
+    Tracer,
+    DependencyType,
+    ClaimStrategy,
+    RateLimit,
+    Memoize,
+    RetryPolicy,
+    OperationOptions,
+    MaxDepth,
+    OverflowPolicy,
+)
 from beanie_batteries_queue.scheduled_task import ScheduledTask
+from beanie_batteries_queue.tracing import current_traceparent
 
 
 class SimpleTask(Task):
@@ -85,6 +101,108 @@ class TaskWithOptionalAnyOfDependency(Task):
     )
 
 
+class PartitionedTask(Task):
+    s: str
+    partition_count = 4
+    partition_key = "s"
+
+    async def run(self):
+        self.s = self.s.upper()
+        await self.save()
+
+
+class RelaxedTask(Task):
+    s: str
+    claim_strategy = ClaimStrategy.RELAXED
+    claim_candidates = 3
+
+
+class RateLimitedTask(Task):
+    s: str
+    rate_limit = RateLimit(rate=1, burst=2)
+
+
+class MemoizedTask(Task):
+    x: int
+    memoize = Memoize(fields=["x"], ttl=60)
+    runs: ClassVar[int] = 0
+
+    async def run(self):
+        MemoizedTask.runs += 1
+        return self.x * 2
+
+
+class BatchTask(Task):
+    x: int
+    batch_size = 10
+    batch_sizes: ClassVar[List[int]] = []
+
+    @classmethod
+    async def run_batch(cls, tasks):
+        cls.batch_sizes.append(len(tasks))
+        return [
+            ValueError("negative") if task.x < 0 else task.x * 2
+            for task in tasks
+        ]
+
+
+class FlakyTask(Task):
+    s: str
+    fail_times: int = 2
+    retry_policy = RetryPolicy(
+        max_attempts=3, backoff=0.1, retry_on=(ValueError,)
+    )
+
+    async def run(self):
+        if self.attempts < self.fail_times:
+            raise ValueError(f"attempt {self.attempts}")
+        return self.s.upper()
+
+
+class NotRetryableTask(Task):
+    s: str
+    retry_policy = RetryPolicy(max_attempts=3, retry_on=(ValueError,))
+
+    async def run(self):
+        raise TypeError("not retryable")
+
+
+class AgingTask(Task):
+    s: str
+    priority_aging = 10
+
+
+class MemoryTask(Task):
+    s: str
+    should_fail: bool = False
+    retry_policy = RetryPolicy(
+        max_attempts=2, backoff=0.1, retry_on=(ValueError,)
+    )
+
+    async def run(self):
+        if self.should_fail:
+            raise ValueError("fail")
+        return self.s.upper()
+
+
+class MemoryTaskWithDependency(Task):
+    s: str
+    dependencies: List[Link[MemoryTask]] = Field(
+        dependency_type=DependencyType.ALL_OF
+    )
+
+
+class MemoryScheduledTask(ScheduledTask):
+    s: str
+
+
+class ChainTask(Task):
+    s: str
+    previous: Optional[Link["ChainTask"]] = Field(
+        default=None, dependency_type=DependencyType.DIRECT
+    )
+
+
 class SimpleScheduledTask(ScheduledTask):
     s: str
 
@@ -92,3 +210,121 @@ class SimpleScheduledTask(ScheduledTask):
 class ScheduledTaskWithInterval(ScheduledTask):
     s: str
     interval: int = 5
+
+
+class SlowTask(Task):
+    s: str
+    delay: float = 1
+    run_timeout = 0.2
+
+    async def run(self):
+        await asyncio.sleep(self.delay)
+        return self.s.upper()
+
+
+class RecordingTracer(Tracer):
+    def __init__(self):
+        self.spans = []
+
+    def record_span(self, name, parent, start_time, end_time, attributes):
+        self.spans.append((name, parent))
+
+    def start_span(self, name, parent, attributes):
+        self.spans.append((name, parent))
+        return super().start_span(name, parent, attributes)
+
+
+class TracedTask(Task):
+    s: str
+    tracer = RecordingTracer()
+
+    async def run(self):
+        return current_traceparent.get()
+
+
+class TracedBatchTask(Task):
+    s: str
+    tracer = RecordingTracer()
+    batch_size = 5
+    batch_wait = 0.2
+
+    @classmethod
+    async def run_batch(cls, tasks):
+        return [task.s.upper() for task in tasks]
+
+
+class OptionsTask(Task):
+    s: str
+    claim_options = OperationOptions(
+        write_concern=WriteConcern(w="majority"),
+        read_concern=ReadConcern("majority"),
+    )
+    ack_options = OperationOptions(write_concern=WriteConcern(w=1, j=True))
+    push_options = OperationOptions(write_concern=WriteConcern(w=1))
+    stats_options = OperationOptions(
+        read_preference=ReadPreference.SECONDARY_PREFERRED
+    )
+
+    async def run(self):
+        return self.s.upper()
+
+
+class TrustedTask(Task):
+    s: str
+    scores: Dict[str, float] = Field(default_factory=dict)
+    parent: Optional[Link["TrustedTask"]] = Field(
+        default=None, dependency_type=DependencyType.DIRECT
+    )
+    trusted_construct = True
+
+    async def run(self):
+        return self.s.upper()
+
+
+class BoundedTask(Task):
+    s: str
+    max_depth = MaxDepth(2, overflow=OverflowPolicy.RAISE)
+    retry_policy = RetryPolicy(max_attempts=2, backoff=0)
+
+    async def run(self):
+        return self.s.upper()
+
+
+class BlockingBoundedTask(Task):
+    s: str
+    max_depth = MaxDepth(1, block_timeout=0.5)
+
+
+class DroppingBoundedTask(Task):
+    s: str
+    max_depth = MaxDepth(2, overflow=OverflowPolicy.DROP_LOWEST)
+
+
+class DroppingDependentTask(Task):
+    s: str
+    dependency: Link[DroppingBoundedTask] = Field(
+        dependency_type=DependencyType.DIRECT
+    )
+
+
+class GroupedTask(Task):
+    s: str
+    retry_policy = RetryPolicy(max_attempts=2, backoff=0)
+    group_lock_ttl = 60
+
+    async def run(self):
+        return self.s.upper()
+
+
+class StubbornTask(Task):
+    s: str
+    run_timeout = 0.2
+    cancel_grace = 0.1
+
+    async def run(self):
+        try:
+            await asyncio.sleep(1)
+        except asyncio.CancelledError:
+            # ignores the cancellation and keeps running
+            await asyncio.sleep(1)
+        return self.s.upper()
@@ -0,0 +1,52 @@
+import asyncio
+
+from beanie_batteries_queue import State
+from tests.tasks import BatchTask, SimpleTask
+
+
+class TestBatch:
+    async def test_tasks_are_processed_in_batches(self):
+        BatchTask.batch_sizes.clear()
+        await BatchTask.push_many([BatchTask(x=i) for i in range(25)])
+
+        queue = BatchTask.queue()
+        task = asyncio.create_task(queue.start())
+        await asyncio.sleep(1)
+        queue.stop()
+        await task
+
+        assert BatchTask.batch_sizes[:3] == [10, 10, 5]
+        tasks = await BatchTask.find_all().to_list()
+        assert all(task.state == State.FINISHED for task in tasks)
+        assert {task.result for task in tasks} == {i * 2 for i in range(25)}
+
+    async def test_per_task_failures(self):
+        handles = await BatchTask.push_many(
+            [BatchTask(x=1), BatchTask(x=-1), BatchTask(x=2)]
+        )
+
+        queue = BatchTask.queue()
+        task = asyncio.create_task(queue.start())
+        await asyncio.sleep(1)
+        queue.stop()
+        await task
+
+        states = [(await BatchTask.get(h.id)).state for h in handles]
+        assert states == [State.FINISHED, State.FAILED, State.FINISHED]
+
+    async def test_is_batched(self):
+        assert BatchTask.is_batched()
+        assert not SimpleTask.is_batched()
+
+    async def test_pop_many(self):
+        await BatchTask.push_many([BatchTask(x=i) for i in range(5)])
+        claims = BatchTask.get_stats().get("claims")
+
+        tasks = await BatchTask.pop_many(3)
+        assert [task.x for task in tasks] == [0, 1, 2]
+        assert all(task.state == State.RUNNING for task in tasks)
+        assert len({task.claim_id for task in tasks}) == 1
+        assert BatchTask.get_stats().get("claims") == claims + 3
+
+        assert len(await BatchTask.pop_many(3)) == 2
+        assert await BatchTask.pop_many(3) == []
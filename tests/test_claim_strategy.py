@@ -0,0 +1,71 @@
+import asyncio
+
+from beanie_batteries_queue import State, Priority
+from tests.tasks import RelaxedTask, SimpleTask
+
+
+class TestClaimStrategy:
+    async def test_shallow_queue_keeps_strict_order(self):
+        await RelaxedTask(s="test1", priority=Priority.LOW).push()
+        await RelaxedTask(s="test2", priority=Priority.HIGH).push()
+
+        found_task = await RelaxedTask.pop()
+        assert found_task.s == "test2"
+
+    async def test_deep_queue_claims_from_candidates(self):
+        for i in range(6):
+            await RelaxedTask(s=f"test{i}").push()
+
+        found_task = await RelaxedTask.pop()
+        assert found_task.s in {"test0", "test1", "test2"}
+        assert found_task.state == State.RUNNING
+
+    async def test_concurrent_claims(self):
+        for i in range(10):
+            await RelaxedTask(s=f"test{i}").push()
+        RelaxedTask.get_stats().reset()
+
+        found_tasks = await asyncio.gather(
+            *[RelaxedTask.pop() for _ in range(10)]
+        )
+
+        assert len({task.id for task in found_tasks}) == 10
+        stats = RelaxedTask.get_stats()
+        assert stats.get("claims") == 10
+
+    async def test_lost_race_is_counted(self, monkeypatch):
+        for i in range(4):
+            await RelaxedTask(s=f"test{i}").push()
+        taken = await RelaxedTask.pop()
+        RelaxedTask.get_stats().reset()
+        choose = RelaxedTask.choose_candidate
+        calls = []
+
+        def choose_taken(cls, candidates):
+            calls.append(candidates)
+            if len(calls) == 1:
+                # another worker claimed the chosen task first
+                return {"_id": taken.id, "group_key": None}
+            return choose(candidates)
+
+        monkeypatch.setattr(
+            RelaxedTask, "choose_candidate", classmethod(choose_taken)
+        )
+        found_task = await RelaxedTask.pop()
+
+        assert found_task.id != taken.id
+        assert len(calls) == 2
+        stats = RelaxedTask.get_stats()
+        assert stats.get("claims") == 1
+        assert stats.get("claim_conflicts") == 1
+        assert stats.ratio("claim_conflicts", "claims") == 1.0
+
+    async def test_stats_are_per_class(self):
+        await SimpleTask(s="test").push()
+        SimpleTask.get_stats().reset()
+        RelaxedTask.get_stats().reset()
+
+        await SimpleTask.pop()
+
+        assert SimpleTask.get_stats().get("claims") == 1
+        assert RelaxedTask.get_stats().get("claims") == 0
@@ -0,0 +1,82 @@
+import pytest
+
+from beanie_batteries_queue import DAG, CycleError, State
+from tests.tasks import (
+    ChainTask,
+    SimpleTask,
+    TaskWithAllOfDependency,
+    TaskWithAnyOfDependency,
+)
+
+
+class TestDAG:
+    async def test_topological_push(self):
+        task_1 = SimpleTask(s="test1")
+        task_2 = SimpleTask(s="test2")
+        dependent = TaskWithAllOfDependency(
+            s="dependent", all_of_dependency=[task_1, task_2]
+        )
+        handles = await DAG([dependent, task_1, task_2]).push()
+        assert [handle.id for handle in handles] == [
+            dependent.id,
+            task_1.id,
+            task_2.id,
+        ]
+
+        stored = await TaskWithAllOfDependency.get(dependent.id)
+        assert stored.dag_id is not None
+        assert stored.dag_id == (await SimpleTask.get(task_1.id)).dag_id
+        assert await TaskWithAllOfDependency.pop() is None
+
+        for _ in range(2):
+            await (await SimpleTask.pop()).finish()
+        task = await TaskWithAllOfDependency.pop()
+        assert task is not None
+        assert task.id == dependent.id
+
+    async def test_cycle(self):
+        task_1 = ChainTask(s="test1")
+        task_2 = ChainTask(s="test2", previous=task_1)
+        task_1.previous = task_2
+        with pytest.raises(CycleError):
+            await DAG([task_1, task_2]).push()
+        assert await ChainTask.is_empty()
+
+    async def test_failure_cancels_descendants(self):
+        first = ChainTask(s="first")
+        second = ChainTask(s="second", previous=first)
+        third = ChainTask(s="third", previous=second)
+        await DAG([first, second, third]).push()
+
+        task = await ChainTask.pop()
+        assert task.id == first.id
+        await task.fail(ValueError("error"))
+
+        for task_id in [second.id, third.id]:
+            task = await ChainTask.get(task_id)
+            assert task.state == State.CANCELLED
+        assert await ChainTask.pop() is None
+
+    async def test_any_of_cancelled_when_all_failed(self):
+        task_1 = SimpleTask(s="test1")
+        task_2 = SimpleTask(s="test2")
+        all_of = TaskWithAllOfDependency(
+            s="all_of", all_of_dependency=[task_1, task_2]
+        )
+        any_of = TaskWithAnyOfDependency(
+            s="any_of", any_of_dependency=[task_1, task_2]
+        )
+        await DAG([task_1, task_2, all_of, any_of]).push()
+
+        await (await SimpleTask.pop()).fail(ValueError("error"))
+        assert (
+            await TaskWithAllOfDependency.get(all_of.id)
+        ).state == State.CANCELLED
+        assert (
+            await TaskWithAnyOfDependency.get(any_of.id)
+        ).state == State.CREATED
+
+        await (await SimpleTask.pop()).fail(ValueError("error"))
+        assert (
+            await TaskWithAnyOfDependency.get(any_of.id)
+        ).state == State.CANCELLED
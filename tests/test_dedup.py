@@ -0,0 +1,53 @@
+from beanie_batteries_queue import State
+from tests.tasks import SimpleTask
+
+
+class TestDedup:
+    async def test_push_returns_existing_id(self):
+        task_id = (await SimpleTask(s="test1", dedup_key="key").push()).id
+        duplicate_id = (await SimpleTask(s="test2", dedup_key="key").push()).id
+
+        assert duplicate_id == task_id
+        assert await SimpleTask.find_all().count() == 1
+
+    async def test_running_task_is_deduplicated(self):
+        task_id = (await SimpleTask(s="test", dedup_key="key").push()).id
+        found_task = await SimpleTask.pop()
+        assert found_task.state == State.RUNNING
+
+        assert (
+            await SimpleTask(s="test", dedup_key="key").push()
+        ).id == task_id
+
+    async def test_push_after_finish(self):
+        task_id = (await SimpleTask(s="test", dedup_key="key").push()).id
+        found_task = await SimpleTask.pop()
+        await found_task.finish()
+
+        new_id = (await SimpleTask(s="test", dedup_key="key").push()).id
+        assert new_id != task_id
+        assert await SimpleTask.find_all().count() == 2
+
+    async def test_tasks_without_key(self):
+        await SimpleTask(s="test").push()
+        await SimpleTask(s="test").push()
+
+        assert await SimpleTask.find_all().count() == 2
+
+    async def test_push_many(self):
+        task_id = (await SimpleTask(s="test", dedup_key="key1").push()).id
+
+        handles = await SimpleTask.push_many(
+            [
+                SimpleTask(s="test", dedup_key="key1"),
+                SimpleTask(s="test", dedup_key="key2"),
+                SimpleTask(s="test", dedup_key="key2"),
+                SimpleTask(s="test"),
+            ]
+        )
+        ids = [handle.id for handle in handles]
+
+        assert ids[0] == task_id
+        assert ids[1] == ids[2]
+        assert len(set(ids)) == 3
+        assert await SimpleTask.find_all().count() == 3
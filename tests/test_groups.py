@@ -0,0 +1,87 @@
+import asyncio
+
+from beanie_batteries_queue import Priority, State
+from tests.tasks import GroupedTask
+
+
+def get_lock_collection():
+    return GroupedTask.get_motor_collection().database["task_group_locks"]
+
+
+class TestGroups:
+    async def test_fifo_within_group(self):
+        await GroupedTask(s="a1", group_key="a", priority=Priority.LOW).push()
+        await GroupedTask(s="b1", group_key="b").push()
+        await GroupedTask(s="a2", group_key="a", priority=Priority.HIGH).push()
+
+        # a2 waits for a1, the oldest task of its group
+        first = await GroupedTask.pop()
+        second = await GroupedTask.pop()
+        assert {first.s, second.s} == {"b1", "a1"}
+        assert await GroupedTask.pop() is None
+
+    async def test_group_is_locked_while_running(self):
+        await GroupedTask(s="a1", group_key="a").push()
+        await GroupedTask(s="a2", group_key="a").push()
+        await GroupedTask(s="b1", group_key="b").push()
+        await GroupedTask(s="free").push()
+
+        first = await GroupedTask.pop()
+        assert first.s == "a1"
+        lock = await get_lock_collection().find_one(
+            {"_id": f"{GroupedTask.get_collection_name()}:a"}
+        )
+        assert lock["task_id"] == first.id
+
+        popped = {(await GroupedTask.pop()).s for _ in range(2)}
+        assert popped == {"b1", "free"}
+        assert await GroupedTask.pop() is None
+
+        await first.finish()
+        assert await get_lock_collection().count_documents({"group": "a"}) == 0
+        assert (await GroupedTask.pop()).s == "a2"
+
+    async def test_retry_keeps_order(self):
+        await GroupedTask(s="a1", group_key="a").push()
+        await GroupedTask(s="a2", group_key="a").push()
+
+        task = await GroupedTask.pop()
+        await task.fail(ValueError("fail"))
+        assert task.state == State.CREATED
+
+        task = await GroupedTask.pop()
+        assert task.s == "a1"
+        await task.fail(ValueError("fail"))
+        assert task.state == State.FAILED
+        assert (await GroupedTask.pop()).s == "a2"
+
+    async def test_workers_run_groups_in_parallel(self):
+        for i in range(3):
+            for group in ["a", "b", "c"]:
+                await GroupedTask(s=f"{group}{i}", group_key=group).push()
+
+        order = []
+        running = set()
+
+        async def work():
+            while len(order) < 9:
+                task = await GroupedTask.pop()
+                if task is None:
+                    await asyncio.sleep(0.01)
+                    continue
+                assert task.group_key not in running
+                running.add(task.group_key)
+                order.append(task.s)
+                await asyncio.sleep(0.01)
+                running.discard(task.group_key)
+                await task.finish()
+
+        await asyncio.wait_for(
+            asyncio.gather(*[work() for _ in range(3)]), timeout=5
+        )
+        for group in ["a", "b", "c"]:
+            assert [s for s in order if s[0] == group] == [
+                f"{group}0",
+                f"{group}1",
+                f"{group}2",
+            ]
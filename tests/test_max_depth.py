@@ -0,0 +1,166 @@
+import asyncio
+
+import pytest
+
+from beanie_batteries_queue import DAG, Priority, QueueFull, State
+from tests.tasks import (
+    BlockingBoundedTask,
+    BoundedTask,
+    DroppingBoundedTask,
+    DroppingDependentTask,
+)
+
+
+async def get_depth(task_model):
+    collection = task_model.max_depth.get_collection(task_model)
+    counter = await collection.find_one(
+        {"_id": task_model.get_collection_name()}
+    )
+    return counter["depth"]
+
+
+class TestMaxDepth:
+    async def test_raise(self):
+        await BoundedTask(s="a").push()
+        await BoundedTask(s="b").push()
+        with pytest.raises(QueueFull):
+            await BoundedTask(s="c").push()
+        assert await BoundedTask.count_tasks() == 2
+        assert BoundedTask.get_stats().get("overflows") >= 1
+
+    async def test_claim_makes_place(self):
+        await BoundedTask(s="a").push()
+        await BoundedTask(s="b").push()
+        assert await get_depth(BoundedTask) == 2
+
+        task = await BoundedTask.pop()
+        assert await get_depth(BoundedTask) == 1
+        await BoundedTask(s="c").push()
+        await task.finish()
+        assert await BoundedTask.count_tasks() == 2
+
+    async def test_push_many(self):
+        with pytest.raises(QueueFull):
+            await BoundedTask.push_many(
+                [BoundedTask(s="a"), BoundedTask(s="b"), BoundedTask(s="c")]
+            )
+        await BoundedTask.push_many([BoundedTask(s="a"), BoundedTask(s="b")])
+        assert await get_depth(BoundedTask) == 2
+
+    async def test_dedup_takes_no_place(self):
+        await BoundedTask(s="a", dedup_key="a").push()
+        await BoundedTask(s="a", dedup_key="a").push()
+        assert await get_depth(BoundedTask) == 1
+
+    async def test_retry_puts_back(self):
+        await BoundedTask(s="a").push()
+        task = await BoundedTask.pop()
+        assert await get_depth(BoundedTask) == 0
+        await task.fail(ValueError("error"))
+        assert task.state == State.CREATED
+        assert await get_depth(BoundedTask) == 1
+
+        task = await BoundedTask.pop()
+        await task.fail(ValueError("error"))
+        assert task.state == State.FAILED
+        assert await get_depth(BoundedTask) == 0
+
+    async def test_fail_of_cancelled_task(self):
+        await BoundedTask(s="a").push()
+        task = await BoundedTask.pop()
+        # cancelled while it was running
+        await BoundedTask.get_motor_collection().update_one(
+            {"_id": task.id}, {"$set": {"state": State.CANCELLED.value}}
+        )
+
+        await task.fail(ValueError("error"))
+        assert await get_depth(BoundedTask) == 0
+
+    async def test_sync(self):
+        await BoundedTask(s="a").push()
+        await BoundedTask(s="b").push()
+        # tasks removed without the counter, like by the TTL index
+        await BoundedTask.get_motor_collection().delete_many({})
+        BoundedTask.max_depth.sync_interval = 0
+        try:
+            await BoundedTask(s="c").push()
+        finally:
+            BoundedTask.max_depth.sync_interval = 60
+        assert await get_depth(BoundedTask) == 1
+
+    async def test_block_until_claimed(self):
+        await BlockingBoundedTask(s="a").push()
+
+        async def claim():
+            await asyncio.sleep(0.1)
+            await BlockingBoundedTask.pop()
+
+        await asyncio.gather(BlockingBoundedTask(s="b").push(), claim())
+        assert await BlockingBoundedTask.count_tasks() == 1
+
+    async def test_block_timeout(self):
+        await BlockingBoundedTask(s="a").push()
+        with pytest.raises(QueueFull):
+            await BlockingBoundedTask(s="b").push()
+
+    async def test_drop_lowest(self):
+        low = await DroppingBoundedTask(s="low", priority=Priority.LOW).push()
+        await DroppingBoundedTask(s="medium").push()
+
+        high = await DroppingBoundedTask(
+            s="high", priority=Priority.HIGH
+        ).push()
+        assert (await DroppingBoundedTask.get(low.id)).state == (
+            State.CANCELLED
+        )
+
+        dropped = await DroppingBoundedTask(
+            s="low", priority=Priority.LOW
+        ).push()
+        assert (await DroppingBoundedTask.get(dropped.id)).state == (
+            State.CANCELLED
+        )
+        assert (await DroppingBoundedTask.get(high.id)).state == State.CREATED
+        assert await DroppingBoundedTask.count_tasks() == 2
+        assert await get_depth(DroppingBoundedTask) == 2
+        assert DroppingBoundedTask.get_stats().get("drops") == 2
+
+    async def test_drop_lowest_push_many(self):
+        await DroppingBoundedTask(s="a", priority=Priority.HIGH).push()
+        await DroppingBoundedTask(s="b", priority=Priority.HIGH).push()
+
+        handles = await DroppingBoundedTask.push_many(
+            [
+                DroppingBoundedTask(s="c", priority=Priority.LOW),
+                DroppingBoundedTask(s="d", priority=Priority.LOW),
+            ]
+        )
+        assert len(handles) == 2
+        for handle in handles:
+            task = await DroppingBoundedTask.get(handle.id)
+            assert task.state == State.CANCELLED
+        assert await DroppingBoundedTask.count_tasks() == 2
+        assert await get_depth(DroppingBoundedTask) == 2
+
+    async def test_drop_lowest_keeps_awaited_tasks(self):
+        low = DroppingBoundedTask(s="low", priority=Priority.LOW)
+        await low.push()
+        await DroppingDependentTask(s="dependent", dependency=low).push()
+        medium = await DroppingBoundedTask(s="medium").push()
+
+        await DroppingBoundedTask(s="high", priority=Priority.HIGH).push()
+        assert (await DroppingBoundedTask.get(low.id)).state == (State.CREATED)
+        assert (await DroppingBoundedTask.get(medium.id)).state == (
+            State.CANCELLED
+        )
+
+    async def test_drop_lowest_admits_dag_tasks(self):
+        await DroppingBoundedTask(s="a", priority=Priority.HIGH).push()
+        await DroppingBoundedTask(s="b", priority=Priority.HIGH).push()
+
+        handles = await DAG(
+            [DroppingBoundedTask(s="dag", priority=Priority.LOW)]
+        ).push()
+        task = await DroppingBoundedTask.get(handles[0].id)
+        assert task.state == State.CREATED
+        assert await get_depth(DroppingBoundedTask) == 3
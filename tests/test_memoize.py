@@ -0,0 +1,34 @@
+from beanie_batteries_queue import State
+from tests.tasks import MemoizedTask
+from tests.utils import process_queue
+
+
+class TestMemoize:
+    async def test_result_is_reused(self):
+        MemoizedTask.runs = 0
+        MemoizedTask.get_stats().reset()
+        task1_id = (await MemoizedTask(x=2).push()).id
+        await process_queue(MemoizedTask)
+        task2_id = (await MemoizedTask(x=2).push()).id
+        await process_queue(MemoizedTask)
+
+        for task_id in [task1_id, task2_id]:
+            task = await MemoizedTask.get(task_id)
+            assert task.state == State.FINISHED
+            assert task.result == 4
+        assert MemoizedTask.runs == 1
+        stats = MemoizedTask.get_stats()
+        assert stats.get("memoize_hits") == 1
+        assert stats.get("memoize_misses") == 1
+
+    async def test_different_inputs(self):
+        MemoizedTask.runs = 0
+        await MemoizedTask(x=2).push()
+        await MemoizedTask(x=3).push()
+        await process_queue(MemoizedTask)
+
+        assert MemoizedTask.runs == 2
+        results = {
+            task.result for task in await MemoizedTask.find_all().to_list()
+        }
+        assert results == {4, 6}
@@ -0,0 +1,315 @@
+import asyncio
+from datetime import datetime, timedelta
+
+import pytest
+from beanie import PydanticObjectId
+
+from beanie_batteries_queue import (
+    DAG,
+    MaxDepth,
+    Memoize,
+    MemoryBackend,
+    Priority,
+    RateLimit,
+    State,
+    init_memory_backend,
+)
+from beanie_batteries_queue.results import ResultWatcher
+from tests.tasks import (
+    MemoryScheduledTask,
+    MemoryTask,
+    MemoryTaskWithDependency,
+)
+
+
+# replaces the MongoDB initialization of the conftest
+@pytest.fixture(autouse=True)
+async def init():
+    return await init_memory_backend(
+        [MemoryTask, MemoryTaskWithDependency, MemoryScheduledTask]
+    )
+
+
+class TestMemoryBackend:
+    async def test_backend(self, init):
+        assert isinstance(init, MemoryBackend)
+        assert MemoryTask.get_backend() is init
+
+    async def test_push_and_pop(self):
+        await MemoryTask(s="low", priority=Priority.LOW).push()
+        await MemoryTask(s="first").push()
+        await MemoryTask(s="high", priority=Priority.HIGH).push()
+        await MemoryTask(s="second").push()
+        assert await MemoryTask.count_tasks() == 4
+
+        popped = [(await MemoryTask.pop()).s for _ in range(4)]
+        assert popped == ["high", "first", "second", "low"]
+        assert await MemoryTask.pop() is None
+        assert await MemoryTask.is_empty()
+        assert await MemoryTask.count_tasks(State.RUNNING) == 4
+
+    async def test_popped_task_is_a_copy(self, init):
+        handle = await MemoryTask(s="test").push()
+        task = await MemoryTask.pop()
+        task.s = "changed"
+
+        stored = await init.get(MemoryTask, handle.id)
+        assert stored.s == "test"
+        assert stored.state == State.RUNNING
+
+        await task.save()
+        stored = await init.get(MemoryTask, handle.id)
+        assert stored.s == "changed"
+
+    async def test_partitions(self):
+        await MemoryTask(s="first", partition=0).push()
+        await MemoryTask(s="second", partition=1).push()
+
+        task = await MemoryTask.pop(partitions=[1])
+        assert task.s == "second"
+        assert await MemoryTask.pop(partitions=[1]) is None
+        assert (await MemoryTask.pop()).s == "first"
+
+    async def test_dedup(self):
+        first = await MemoryTask(s="first", dedup_key="key").push()
+        second = await MemoryTask(s="second", dedup_key="key").push()
+        assert second.id == first.id
+        assert await MemoryTask.count_tasks() == 1
+
+        task = await MemoryTask.pop()
+        await task.finish()
+        third = await MemoryTask(s="third", dedup_key="key").push()
+        assert third.id != first.id
+
+    async def test_dependencies(self):
+        first = MemoryTask(s="first")
+        await first.push()
+        second = MemoryTask(s="second")
+        await second.push()
+        await MemoryTaskWithDependency(
+            s="dependent", dependencies=[first, second]
+        ).push()
+        assert await MemoryTaskWithDependency.pop() is None
+
+        await (await MemoryTask.pop()).finish()
+        assert await MemoryTaskWithDependency.pop() is None
+
+        await (await MemoryTask.pop()).finish()
+        task = await MemoryTaskWithDependency.pop()
+        assert task is not None
+        assert task.s == "dependent"
+
+    async def test_retry_delay(self, init):
+        await MemoryTask(s="test", should_fail=True).push()
+        task = await MemoryTask.pop()
+        await task.fail(ValueError("fail"))
+        assert await MemoryTask.pop() is None
+
+        await asyncio.sleep(0.2)
+        task = await MemoryTask.pop()
+        assert task is not None
+        await task.fail(ValueError("fail"))
+
+        stored = await init.get(MemoryTask, task.id)
+        assert stored.state == State.FAILED
+        assert stored.attempts == 2
+
+    async def test_scheduled_task(self):
+        await MemoryScheduledTask(
+            s="later", run_at=datetime.utcnow() + timedelta(seconds=0.2)
+        ).push()
+        await MemoryScheduledTask(s="now").push()
+
+        assert (await MemoryScheduledTask.pop()).s == "now"
+        assert await MemoryScheduledTask.pop() is None
+        await asyncio.sleep(0.3)
+        assert (await MemoryScheduledTask.pop()).s == "later"
+
+    async def test_pop_many_reschedules(self):
+        run_at = datetime.utcnow()
+        await MemoryScheduledTask(s="a", run_at=run_at, interval=0).push()
+        await MemoryScheduledTask(s="b", run_at=run_at, interval=0).push()
+
+        tasks = await MemoryScheduledTask.pop_many(10)
+        assert sorted(task.s for task in tasks) == ["a", "b"]
+        assert await MemoryScheduledTask.count_tasks(State.CREATED) == 2
+
+    async def test_rescheduled_task_is_not_claimed(self, init):
+        await MemoryScheduledTask(s="a", interval=60).push()
+        task = await MemoryScheduledTask.pop()
+        # like a task claimed in a batch
+        task.claim_id = PydanticObjectId()
+        await MemoryScheduledTask.after_claim([task])
+
+        tasks = init.get_collection(MemoryScheduledTask).tasks.values()
+        copies = [copy for copy in tasks if copy.state == State.CREATED]
+        # one copy pushed by the pop and one by the call
+        assert len(copies) == 2
+        for copy in copies:
+            assert copy.claim_id is None
+            assert copy.run_at == task.run_at + timedelta(seconds=60)
+
+    async def test_queue(self):
+        handle = await MemoryTask(s="test").push()
+        queue = MemoryTask.queue(sleep_time=0.1)
+        task = asyncio.create_task(queue.start())
+        assert await handle.result(timeout=2) == "TEST"
+        queue.stop()
+        await task
+
+    async def test_dag_failure(self, init):
+        first = MemoryTask(s="first")
+        second = MemoryTask(s="second")
+        dependent = MemoryTaskWithDependency(
+            s="dependent", dependencies=[first, second]
+        )
+        await DAG([dependent, first, second]).push()
+
+        task = await MemoryTask.pop()
+        await task.fail(TypeError("error"))
+        stored = await init.get(MemoryTaskWithDependency, dependent.id)
+        assert stored.state == State.CANCELLED
+        assert await MemoryTaskWithDependency.count_tasks() == 0
+
+    async def test_dependents_woken(self):
+        first = MemoryTask(s="first")
+        await first.push()
+        await MemoryTaskWithDependency(
+            s="dependent", dependencies=[first]
+        ).push()
+
+        queue = MemoryTaskWithDependency.queue(sleep_time=10)
+        claim = asyncio.create_task(queue.__anext__())
+        await asyncio.sleep(0.1)
+        assert not claim.done()
+
+        await (await MemoryTask.pop()).finish()
+        task = await asyncio.wait_for(claim, timeout=1)
+        assert task.s == "dependent"
+        queue.unsubscribe()
+
+    async def test_groups(self):
+        await MemoryTask(s="a1", group_key="a", priority=Priority.LOW).push()
+        await MemoryTask(s="b1", group_key="b").push()
+        await MemoryTask(s="a2", group_key="a", priority=Priority.HIGH).push()
+        await MemoryTask(s="free").push()
+
+        # a2 waits for a1, the oldest task of its group
+        popped = [(await MemoryTask.pop()).s for _ in range(3)]
+        assert popped == ["b1", "free", "a1"]
+        assert await MemoryTask.pop() is None
+
+    async def test_group_is_locked_while_running(self):
+        await MemoryTask(s="a1", group_key="a").push()
+        await MemoryTask(s="a2", group_key="a").push()
+        await MemoryTask(s="b1", group_key="b").push()
+
+        first = await MemoryTask.pop()
+        assert first.s == "a1"
+        assert (await MemoryTask.pop()).s == "b1"
+        assert await MemoryTask.pop() is None
+
+        await first.finish()
+        assert (await MemoryTask.pop()).s == "a2"
+
+    async def test_group_retry_keeps_order(self):
+        await MemoryTask(s="a1", group_key="a", should_fail=True).push()
+        await MemoryTask(s="a2", group_key="a").push()
+
+        task = await MemoryTask.pop()
+        await task.fail(ValueError("fail"))
+        assert await MemoryTask.pop() is None
+
+        await asyncio.sleep(0.2)
+        task = await MemoryTask.pop()
+        assert task.s == "a1"
+        await task.fail(ValueError("fail"))
+        assert (await MemoryTask.pop()).s == "a2"
+
+    async def test_waiter_added_while_watcher_closes(self):
+        watcher = ResultWatcher(MemoryTask)
+        poll = watcher.poll
+        closing = asyncio.Event()
+
+        async def slow_poll():
+            await poll()
+            closing.set()
+            # like the change stream, which takes time to close
+            await asyncio.sleep(0.2)
+
+        watcher.poll = slow_poll
+        first = await MemoryTask(s="first").push()
+        second = await MemoryTask(s="second").push()
+        waiter = asyncio.ensure_future(watcher.wait(first.id))
+        await (await MemoryTask.pop()).finish()
+        await asyncio.wait_for(waiter, timeout=1)
+
+        await closing.wait()
+        late = asyncio.ensure_future(watcher.wait(second.id))
+        await (await MemoryTask.pop()).finish()
+        document = await asyncio.wait_for(late, timeout=1)
+        assert document["_id"] == second.id
+
+    async def test_waiter_added_while_watching(self):
+        watcher = ResultWatcher(MemoryTask)
+        watcher.change_streams_supported = True
+        watching = asyncio.Event()
+
+        async def watch():
+            # like the change stream, which checks the pending tasks
+            # only when it is opened
+            await watcher.check_pending()
+            watching.set()
+            while watcher.futures:
+                await asyncio.sleep(0.05)
+
+        watcher.watch = watch
+        first = await MemoryTask(s="first").push()
+        second = await MemoryTask(s="second").push()
+        waiter = asyncio.ensure_future(watcher.wait(first.id))
+        await watching.wait()
+
+        await (await MemoryTask.pop()).finish()
+        await (await MemoryTask.pop()).finish()
+        document = await asyncio.wait_for(watcher.wait(second.id), timeout=1)
+        assert document["_id"] == second.id
+        waiter.cancel()
+
+    async def test_max_depth_is_not_supported(self):
+        class BoundedMemoryTask(MemoryTask):
+            max_depth = MaxDepth(10)
+
+        with pytest.raises(ValueError):
+            await init_memory_backend([BoundedMemoryTask])
+
+    async def test_rate_limit_is_not_supported(self):
+        class LimitedMemoryTask(MemoryTask):
+            rate_limit = RateLimit(rate=10)
+
+        with pytest.raises(ValueError):
+            await init_memory_backend([LimitedMemoryTask])
+
+    async def test_memoize_is_not_supported(self):
+        class MemoizedMemoryTask(MemoryTask):
+            memoize = Memoize(fields=["s"])
+
+        with pytest.raises(ValueError):
+            await init_memory_backend([MemoizedMemoryTask])
+
+    async def test_result_which_can_not_be_stored(self, init):
+        handle = await MemoryTask(s="test").push()
+        task = await MemoryTask.pop()
+        await task.finish(object())
+
+        stored = await init.get(MemoryTask, handle.id)
+        assert stored.state == State.FINISHED
+        assert stored.result is None
+
+    async def test_pop_many(self):
+        for i in range(3):
+            await MemoryTask(s=f"task{i}").push()
+
+        tasks = await MemoryTask.pop_many(2)
+        assert [task.s for task in tasks] == ["task0", "task1"]
+        assert [task.s for task in await MemoryTask.pop_many(2)] == ["task2"]
+        assert await MemoryTask.pop_many(2) == []
@@ -0,0 +1,46 @@
+from pymongo.write_concern import WriteConcern
+
+from beanie_batteries_queue import OperationOptions, State
+from tests.tasks import OptionsTask
+from tests.utils import process_queue
+
+
+class TestOperationOptions:
+    def test_apply(self):
+        options = OperationOptions(write_concern=WriteConcern(w=1))
+        collection = options.apply(OptionsTask.get_motor_collection())
+        assert collection.write_concern == WriteConcern(w=1)
+
+    async def test_push_claim_ack(self):
+        handle = await OptionsTask(s="test").push()
+        assert await OptionsTask.count_tasks() == 1
+
+        task = await OptionsTask.pop()
+        assert task.id == handle.id
+        assert task.state == State.RUNNING
+        await task.finish()
+
+        task = await OptionsTask.get(handle.id)
+        assert task.state == State.FINISHED
+        assert await OptionsTask.is_empty()
+        assert await OptionsTask.count_tasks(State.FINISHED) == 1
+
+    async def test_push_many(self):
+        handles = await OptionsTask.push_many(
+            [OptionsTask(s="a"), OptionsTask(s="b")]
+        )
+        assert await OptionsTask.count_tasks() == 2
+
+        await process_queue(OptionsTask)
+        assert [await handle.result(timeout=1) for handle in handles] == [
+            "A",
+            "B",
+        ]
+
+    async def test_fail(self):
+        await OptionsTask(s="test").push()
+        task = await OptionsTask.pop()
+        await task.fail(ValueError("error"))
+
+        task = await OptionsTask.get(task.id)
+        assert task.state == State.FAILED
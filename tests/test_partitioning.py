@@ -0,0 +1,88 @@
+import asyncio
+import multiprocessing
+
+from beanie_batteries_queue import State, Task
+from beanie_batteries_queue.partitioning import PartitionAssignment
+from tests.tasks import PartitionedTask, SimpleTask
+
+
+class TestPartitioning:
+    async def test_push_assigns_partition_by_key(self):
+        task1 = PartitionedTask(s="key")
+        await task1.push()
+        task2 = PartitionedTask(s="key")
+        await task2.push()
+
+        assert 0 <= task1.partition < PartitionedTask.partition_count
+        assert task1.partition == task2.partition
+
+    async def test_partition_index_only_for_partitioned_classes(self):
+        key = [
+            ("state", 1),
+            ("partition", 1),
+            ("priority", -1),
+            ("created_at", 1),
+        ]
+        indexes = (
+            await PartitionedTask.get_motor_collection().index_information()
+        )
+        assert key in [index["key"] for index in indexes.values()]
+        indexes = await SimpleTask.get_motor_collection().index_information()
+        assert key not in [index["key"] for index in indexes.values()]
+
+    async def test_round_robin_is_per_class(self):
+        Task.get_partition_counter()
+        counters = {
+            id(Task.get_partition_counter()),
+            id(PartitionedTask.get_partition_counter()),
+            id(SimpleTask.get_partition_counter()),
+        }
+        assert len(counters) == 3
+
+    async def test_pop_from_partitions(self):
+        task = PartitionedTask(s="key")
+        await task.push()
+        other_partitions = [
+            partition
+            for partition in range(PartitionedTask.partition_count)
+            if partition != task.partition
+        ]
+
+        assert await PartitionedTask.pop(partitions=other_partitions) is None
+
+        found_task = await PartitionedTask.pop(partitions=[task.partition])
+        assert found_task is not None
+        assert found_task.state == State.RUNNING
+
+    async def test_assignment_rebalances(self):
+        members = multiprocessing.Array("b", [1, 1])
+        first = PartitionAssignment(0, members)
+        second = PartitionAssignment(1, members)
+
+        assert first.get_partitions(4) == [0, 2]
+        assert second.get_partitions(4) == [1, 3]
+        assert first.get_other_partitions(4) == [1, 3]
+
+        # the second worker has stopped
+        members[1] = 0
+        assert first.get_partitions(4) == [0, 1, 2, 3]
+        assert first.get_other_partitions(4) == []
+
+    async def test_queue_steals_from_other_partitions(self):
+        for i in range(8):
+            await PartitionedTask(s=f"task{i}").push()
+
+        # the second worker is not running, its partitions are stolen
+        members = multiprocessing.Array("b", [1, 1])
+        queue = PartitionedTask.queue(
+            partition_assignment=PartitionAssignment(0, members)
+        )
+
+        task = asyncio.create_task(queue.start())
+        await asyncio.sleep(1)
+        queue.stop()
+        await task
+
+        assert (
+            await PartitionedTask.find({"state": State.FINISHED}).count() == 8
+        )
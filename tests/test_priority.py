@@ -0,0 +1,42 @@
+from datetime import datetime, timedelta
+
+from beanie_batteries_queue import Priority
+from tests.tasks import SimpleTask, AgingTask
+
+
+class TestPriority:
+    async def test_integer_priorities(self):
+        await SimpleTask(s="test1", priority=5).push()
+        await SimpleTask(s="test2", priority=100).push()
+        await SimpleTask(s="test3", priority=Priority.HIGH).push()
+
+        assert (await SimpleTask.pop()).s == "test2"
+        assert (await SimpleTask.pop()).s == "test1"
+        task = await SimpleTask.pop()
+        assert task.s == "test3"
+        assert task.priority == Priority.HIGH
+
+    async def test_aging_index_only_for_aging_classes(self):
+        key = [("state", 1), ("virtual_created_at", 1), ("created_at", 1)]
+        indexes = await AgingTask.get_motor_collection().index_information()
+        assert key in [index["key"] for index in indexes.values()]
+        indexes = await SimpleTask.get_motor_collection().index_information()
+        assert key not in [index["key"] for index in indexes.values()]
+
+    async def test_aging_keeps_priority_order(self):
+        await AgingTask(s="test1", priority=Priority.LOW).push()
+        await AgingTask(s="test2", priority=Priority.HIGH).push()
+
+        assert (await AgingTask.pop()).s == "test2"
+
+    async def test_aged_task_goes_first(self):
+        # waited longer than two priority levels are worth
+        await AgingTask(
+            s="old",
+            priority=Priority.LOW,
+            created_at=datetime.utcnow() - timedelta(seconds=30),
+        ).push()
+        await AgingTask(s="new", priority=Priority.HIGH).push()
+
+        assert (await AgingTask.pop()).s == "old"
+        assert (await AgingTask.pop()).s == "new"
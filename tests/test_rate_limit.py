@@ -0,0 +1,38 @@
+import asyncio
+
+from beanie_batteries_queue import RateLimit, State
+from tests.tasks import RateLimitedTask
+
+
+class TestRateLimit:
+    async def test_prefetch_defaults_to_burst(self):
+        assert RateLimit(rate=10).prefetch == 10
+        assert RateLimit(rate=10, burst=20).prefetch == 20
+        assert RateLimit(rate=10, burst=20, prefetch=1).prefetch == 1
+        assert RateLimit(rate=10, burst=20, prefetch=50).prefetch == 20
+
+    async def test_burst_then_throttle(self):
+        RateLimitedTask.rate_limit.local_tokens.clear()
+        for i in range(3):
+            await RateLimitedTask(s=f"test{i}").push()
+
+        assert await RateLimitedTask.pop() is not None
+        assert await RateLimitedTask.pop() is not None
+        assert await RateLimitedTask.pop() is None
+
+        await asyncio.sleep(1.1)
+
+        found_task = await RateLimitedTask.pop()
+        assert found_task is not None
+        assert found_task.state == State.RUNNING
+
+    async def test_empty_queue_keeps_token(self):
+        RateLimitedTask.rate_limit.local_tokens.clear()
+        assert await RateLimitedTask.pop() is None
+        assert await RateLimitedTask.pop() is None
+
+        await RateLimitedTask(s="test").push()
+        await RateLimitedTask(s="test").push()
+
+        assert await RateLimitedTask.pop() is not None
+        assert await RateLimitedTask.pop() is not None
@@ -0,0 +1,53 @@
+import asyncio
+
+import pytest
+
+from beanie_batteries_queue import TaskFailed
+from tests.tasks import MemoizedTask, FailingTask
+from tests.utils import process_queue
+
+
+class TestResults:
+    async def test_handle_result(self):
+        handle = await MemoizedTask(x=3).push()
+
+        consumer = asyncio.create_task(process_queue(MemoizedTask))
+        assert await handle.result(timeout=5) == 6
+        await consumer
+
+    async def test_push_and_wait(self):
+        consumer = asyncio.create_task(process_queue(MemoizedTask))
+        assert await MemoizedTask(x=4).push_and_wait(timeout=5) == 8
+        await consumer
+
+    async def test_multiple_handles(self):
+        handles = await MemoizedTask.push_many(
+            [MemoizedTask(x=i) for i in range(5)]
+        )
+
+        consumer = asyncio.create_task(process_queue(MemoizedTask))
+        results = await asyncio.gather(
+            *[handle.result(timeout=5) for handle in handles]
+        )
+        assert results == [i * 2 for i in range(5)]
+        await consumer
+
+    async def test_result_of_done_task(self):
+        handle = await MemoizedTask(x=5).push()
+        await process_queue(MemoizedTask)
+
+        assert await handle.result(timeout=1) == 10
+
+    async def test_failed_task(self):
+        handle = await FailingTask(s="fail").push()
+
+        consumer = asyncio.create_task(process_queue(FailingTask))
+        with pytest.raises(TaskFailed):
+            await handle.result(timeout=5)
+        await consumer
+
+    async def test_timeout(self):
+        handle = await MemoizedTask(x=1).push()
+
+        with pytest.raises(asyncio.TimeoutError):
+            await handle.result(timeout=0.5)
@@ -0,0 +1,50 @@
+import asyncio
+
+from beanie_batteries_queue import State
+from tests.tasks import FlakyTask, NotRetryableTask
+from tests.utils import process_queue
+
+
+class TestRetry:
+    async def test_retried_until_success(self):
+        handle = await FlakyTask(s="test").push()
+        await process_queue(FlakyTask, 2, sleep_time=0.1)
+
+        task = await FlakyTask.get(handle.id)
+        assert task.state == State.FINISHED
+        assert task.result == "TEST"
+        assert task.attempts == 2
+        assert task.errors == [
+            "ValueError: attempt 0",
+            "ValueError: attempt 1",
+        ]
+
+    async def test_max_attempts(self):
+        handle = await FlakyTask(s="test", fail_times=5).push()
+        await process_queue(FlakyTask, 2, sleep_time=0.1)
+
+        task = await FlakyTask.get(handle.id)
+        assert task.state == State.FAILED
+        assert task.attempts == 3
+        assert len(task.errors) == 3
+
+    async def test_not_claimed_before_delay(self):
+        await FlakyTask(s="test").push()
+        task = await FlakyTask.pop()
+        await task.fail(ValueError("error"))
+
+        task = await FlakyTask.get(task.id)
+        assert task.state == State.CREATED
+        assert task.not_before is not None
+        assert await FlakyTask.pop() is None
+
+        await asyncio.sleep(0.2)
+        assert await FlakyTask.pop() is not None
+
+    async def test_not_retryable_error(self):
+        handle = await NotRetryableTask(s="test").push()
+        await process_queue(NotRetryableTask, 1, sleep_time=0.1)
+
+        task = await NotRetryableTask.get(handle.id)
+        assert task.state == State.FAILED
+        assert task.attempts == 1
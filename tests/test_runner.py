@@ -1,3 +1,5 @@
+import os
+
 import pytest
 import asyncio
 
@@ -85,3 +87,71 @@ class TestRunner:
 
         status = runner.check_status()
         assert status is False
+
+    async def test_dead_worker_is_restarted(self):
+        runner = Runner(
+            [SimpleTask], worker_count=2, restart=True, restart_backoff=0.1
+        )
+        runner.start(run_indefinitely=False)
+        await asyncio.sleep(1)
+
+        pid = runner.processes[0].pid
+        runner.processes[0].kill()
+        runner.processes[0].join()
+        deadline = asyncio.get_running_loop().time() + 10
+        while runner.restarts[0] == 0:
+            assert asyncio.get_running_loop().time() < deadline
+            assert runner.check_status() is True
+            await asyncio.sleep(0.05)
+        assert runner.restarts == [1, 0]
+        assert runner.processes[0].pid != pid
+        assert runner.processes[0].is_alive()
+
+        task = SimpleTask(s="task1")
+        await task.push()
+        await asyncio.sleep(2)
+        runner.stop()
+
+        assert runner.check_status() is False
+        assert (
+            await SimpleTask.find_one({"s": "task1".upper()})
+        ).state == State.FINISHED
+
+    async def test_all_dead_workers_are_reported(self):
+        runner = Runner(
+            [SimpleTask], worker_count=1, restart=True, restart_backoff=60
+        )
+        runner.start(run_indefinitely=False)
+        await asyncio.sleep(1)
+        assert runner.check_status() is True
+        assert runner.all_dead is False
+
+        runner.processes[0].kill()
+        runner.processes[0].join()
+        # still supervised, waiting for the restart
+        assert runner.check_status() is True
+        assert runner.all_dead is True
+        assert [worker["alive"] for worker in runner.report()] == [False]
+
+        runner.stop()
+        assert runner.check_status() is False
+        assert runner.all_dead is False
+
+    @pytest.mark.skipif(
+        not hasattr(os, "sched_setaffinity"),
+        reason="CPU affinity is not supported on this platform",
+    )
+    async def test_report(self):
+        for i in range(4):
+            await SimpleTask(s=f"task{i}").push()
+
+        runner = Runner([SimpleTask], worker_count=2, pin_cpus=True)
+        runner.start(run_indefinitely=False)
+        await asyncio.sleep(2)
+        runner.stop()
+
+        report = runner.report()
+        assert [worker["slot"] for worker in report] == [0, 1]
+        assert sum(worker["processed"] for worker in report) == 4
+        assert all(worker["restarts"] == 0 for worker in report)
+        assert all(worker["throughput"] >= 0 for worker in report)
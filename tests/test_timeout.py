@@ -0,0 +1,39 @@
+import pytest
+
+from beanie_batteries_queue import State, TaskFailed
+from tests.tasks import SlowTask, StubbornTask
+from tests.utils import process_queue
+
+
+class TestTimeout:
+    async def test_class_timeout(self):
+        handle = await SlowTask(s="test").push()
+        await process_queue(SlowTask, 1, sleep_time=0.1)
+
+        task = await SlowTask.get(handle.id)
+        assert task.state == State.TIMED_OUT
+        assert task.errors == [
+            "TaskTimeout: Task did not finish in 0.2 seconds"
+        ]
+        assert SlowTask.get_stats().get("timeouts") >= 1
+        with pytest.raises(TaskFailed):
+            await handle.result(timeout=1)
+
+    async def test_finished_in_time(self):
+        handle = await SlowTask(s="test", delay=0).push()
+        await process_queue(SlowTask, 0.5, sleep_time=0.1)
+
+        assert await handle.result(timeout=1) == "TEST"
+
+    async def test_task_timeout(self):
+        handle = await SlowTask(s="test", delay=0.5, timeout=2).push()
+        await process_queue(SlowTask, 1, sleep_time=0.1)
+
+        assert await handle.result(timeout=1) == "TEST"
+
+    async def test_run_ignoring_cancellation(self):
+        handle = await StubbornTask(s="test").push()
+        await process_queue(StubbornTask, 1, sleep_time=0.1)
+
+        task = await StubbornTask.get(handle.id)
+        assert task.state == State.TIMED_OUT
@@ -0,0 +1,66 @@
+import asyncio
+
+from beanie_batteries_queue import trace_context
+from beanie_batteries_queue.tracing import make_traceparent
+from tests.tasks import TracedBatchTask, TracedTask
+
+TRACEPARENT = "00-0af7651916cd43dd8448eb211c80319c-b7ad6b7169203331-01"
+
+
+class TestTracing:
+    def test_make_traceparent(self):
+        child = make_traceparent(TRACEPARENT)
+        assert child.startswith("00-0af7651916cd43dd8448eb211c80319c-")
+        assert child.endswith("-01")
+        assert child != TRACEPARENT
+
+        root = make_traceparent("invalid")
+        assert len(root.split("-")[1]) == 32
+        assert root.split("-")[1] != "0af7651916cd43dd8448eb211c80319c"
+
+    async def test_push_stores_context(self):
+        with trace_context(TRACEPARENT):
+            handle = await TracedTask(s="test").push()
+        task = await TracedTask.get(handle.id)
+        assert task.traceparent == TRACEPARENT
+
+        handle = await TracedTask(s="test").push()
+        task = await TracedTask.get(handle.id)
+        assert task.traceparent is None
+
+    async def test_context_restored_in_run(self):
+        TracedTask.tracer.spans.clear()
+        with trace_context(TRACEPARENT):
+            handle = await TracedTask(s="test").push()
+
+        queue = TracedTask.queue(sleep_time=0.1)
+        runner = asyncio.create_task(queue.start())
+        run_traceparent = await handle.result(timeout=2)
+        queue.stop()
+        await runner
+
+        assert run_traceparent.startswith(
+            "00-0af7651916cd43dd8448eb211c80319c-"
+        )
+        assert run_traceparent != TRACEPARENT
+        assert TracedTask.tracer.spans == [
+            ("queue wait", TRACEPARENT),
+            ("claim", TRACEPARENT),
+            ("run", TRACEPARENT),
+        ]
+
+    async def test_batch_run_spans(self):
+        TracedBatchTask.tracer.spans.clear()
+        with trace_context(TRACEPARENT):
+            handles = await TracedBatchTask.push_many(
+                [TracedBatchTask(s=f"test{i}") for i in range(3)]
+            )
+
+        queue = TracedBatchTask.queue(sleep_time=0.1)
+        runner = asyncio.create_task(queue.start())
+        for handle in handles:
+            await handle.result(timeout=2)
+        queue.stop()
+        await runner
+
+        assert TracedBatchTask.tracer.spans.count(("run", TRACEPARENT)) == 3
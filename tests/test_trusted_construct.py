@@ -0,0 +1,103 @@
+from datetime import datetime
+
+import pytest
+from beanie import Link, PydanticObjectId
+from beanie.odm.utils.parsing import parse_obj
+from beanie.odm.utils.pydantic import IS_PYDANTIC_V2, get_model_dump
+
+from beanie_batteries_queue import State
+from beanie_batteries_queue import construct
+from beanie_batteries_queue.construct import Constructor
+from tests.tasks import TrustedTask
+
+
+class TestTrustedConstruct:
+    async def test_claim(self):
+        parent = TrustedTask(s="parent")
+        await parent.push()
+        await (await TrustedTask.pop()).finish()
+        handle = await TrustedTask(
+            s="child", scores={"a": 1.5}, parent=parent
+        ).push()
+
+        task = await TrustedTask.pop()
+        assert task.id == handle.id
+        assert isinstance(task.id, PydanticObjectId)
+        assert task.state is State.RUNNING
+        assert task.scores == {"a": 1.5}
+        assert isinstance(task.parent, Link)
+        assert task.parent.ref.id == parent.id
+        await task.finish()
+
+        task = await TrustedTask.get(handle.id)
+        assert task.state == State.FINISHED
+
+    async def test_same_as_validated(self):
+        parent = TrustedTask(s="parent")
+        await parent.push()
+        task = TrustedTask(s="child", scores={"a": 1.5}, parent=parent)
+        await task.push()
+        document = await TrustedTask.get_motor_collection().find_one(
+            {"_id": task.id}
+        )
+
+        trusted = TrustedTask.parse_document(document)
+        validated = parse_obj(TrustedTask, document)
+        exclude = {"parent"}
+        assert get_model_dump(trusted, exclude=exclude) == get_model_dump(
+            validated, exclude=exclude
+        )
+        assert trusted.parent.ref == validated.parent.ref
+
+    async def test_missing_fields_get_defaults(self):
+        task_id = PydanticObjectId()
+        task = TrustedTask.parse_document(
+            {"_id": task_id, "s": "test", "state": "RUNNING"}
+        )
+        assert task.id == task_id
+        assert task.state is State.RUNNING
+        assert task.scores == {}
+        assert task.parent is None
+
+    @pytest.mark.skipif(not IS_PYDANTIC_V2, reason="pydantic v2 internals")
+    async def test_same_as_model_construct(self):
+        # the constructor sets the internals of pydantic directly,
+        # this fails if a pydantic release changes them
+        task_id = PydanticObjectId()
+        created_at = datetime.utcnow()
+        document = {
+            "_id": task_id,
+            "s": "test",
+            "state": "RUNNING",
+            "created_at": created_at,
+            "scores": {"a": 1.5},
+        }
+        trusted = Constructor(TrustedTask, TrustedTask.get_link_fields())(
+            document
+        )
+        constructed = TrustedTask.model_construct(
+            id=task_id,
+            s="test",
+            state=State.RUNNING,
+            created_at=created_at,
+            scores={"a": 1.5},
+        )
+
+        for name in TrustedTask.model_fields:
+            assert getattr(trusted, name) == getattr(constructed, name), name
+        assert trusted.__dict__ == constructed.__dict__
+        assert trusted.model_fields_set == constructed.model_fields_set
+        assert trusted.__pydantic_extra__ == constructed.__pydantic_extra__
+        assert trusted.__pydantic_private__ == constructed.__pydantic_private__
+
+    async def test_model_construct_fallback(self, monkeypatch):
+        # pydantic versions with other internals use model_construct
+        monkeypatch.setattr(construct, "FAST_CONSTRUCT", False)
+        constructor = Constructor(TrustedTask, TrustedTask.get_link_fields())
+        assert constructor.private_defaults is None
+
+        task_id = PydanticObjectId()
+        task = constructor({"_id": task_id, "s": "test", "state": "RUNNING"})
+        assert task.id == task_id
+        assert task.state is State.RUNNING
+        assert task.scores == {}
@@ -0,0 +1,41 @@
+import asyncio
+
+from beanie_batteries_queue.backends.mongo import mongo_backend
+from beanie_batteries_queue.wakeup import Wakeup
+from tests.tasks import SimpleTask, TaskWithDirectDependency
+
+
+class TestWakeup:
+    async def test_dependents_woken(self):
+        task = SimpleTask(s="test")
+        await task.push()
+        await TaskWithDirectDependency(
+            s="dependent", direct_dependency=task
+        ).push()
+
+        queue = TaskWithDirectDependency.queue(sleep_time=10)
+        claim = asyncio.create_task(queue.__anext__())
+        await asyncio.sleep(0.5)
+        assert not claim.done()
+
+        await (await SimpleTask.pop()).finish()
+        dependent = await asyncio.wait_for(claim, timeout=2)
+        assert dependent.s == "dependent"
+        queue.unsubscribe()
+
+    async def test_not_ready_dependents(self):
+        task = SimpleTask(s="test")
+        await task.push()
+        assert await mongo_backend.find_ready_dependents(task) == []
+
+    async def test_wakeup_from_other_process(self):
+        wakeup = Wakeup.get()
+        event = wakeup.subscribe(TaskWithDirectDependency)
+        # let the listener open the cursor
+        await asyncio.sleep(0.5)
+
+        await mongo_backend.publish_wakeup(
+            SimpleTask, [TaskWithDirectDependency.get_collection_name()]
+        )
+        await asyncio.wait_for(event.wait(), timeout=5)
+        wakeup.unsubscribe(TaskWithDirectDependency, event)
@@ -0,0 +1,9 @@
+import asyncio
+
+
+async def process_queue(task_model, seconds=1, sleep_time=1):
+    queue = task_model.queue(sleep_time=sleep_time)
+    task = asyncio.create_task(queue.start())
+    await asyncio.sleep(seconds)
+    queue.stop()
+    await task